@@ -0,0 +1,147 @@
+'''
+Micro-benchmark of the best-quote selection in calculate_spread: the pandas version it
+replaced (four DataFrames, idxmin/idxmax, printed frames) against reduce_quotes.
+
+    python -m benchmarks.calculate_spread_bench [rounds]
+'''
+import contextlib
+import io
+import random
+import subprocess
+import sys
+import time
+
+from find_spread.quote_reducer import reduce_quotes
+
+EXCHANGES = ["Binance", "Bybit", "Okx", "Gateio", "Kucoin", "Mexc", "Htx", "Bitget", "Bingx", "Bitmart",
+             "Bitfinex", "Gemini", "Coinex", "Coinw", "Xt", "Lbank", "Poloniex", "Probit", "Digifinex",
+             "Cexio", "Crypto.com", "Bitmex", "Kraken", "Ascendex", "Whitebit", "Bitrue"]
+AGGREGATORS = ["Oneinch", "Paraswap", "Kyberswap", "Openocean", "Dexscreener"]
+NETWORKS = ["Ethereum", "BinanceSmartChain", "Arbitrum", "Optimism", "Polygon", "Avalanche", "Base", "Fantom"]
+
+
+def sample_quotes(seed: int = 0) -> tuple:
+    '''One token against one stablecoin, shaped like cex_prices()/dex_prices() results'''
+    rnd = random.Random(seed)
+    exchanges = []
+    for name in EXCHANGES:
+        mid = rnd.uniform(0.98, 1.02)
+        exchanges.append({"exchange": name, "data": {
+            "exchange": name, "pair": "TOKENUSDT",
+            "max_bids_price": mid * 0.999, "bids_volumes": rnd.uniform(10, 5000),
+            "min_asks_price": mid * 1.001, "asks_volumes": rnd.uniform(10, 5000),
+            "bids_fill_price": mid * 0.998, "asks_fill_price": mid * 1.002
+        }})
+    aggregators = []
+    for aggregator in AGGREGATORS:
+        for network in NETWORKS:
+            aggregators.append({"aggregator_sell": aggregator, "network_sell": network,
+                                "price_sell": rnd.uniform(0.97, 1.03), "dex_sell": "", "data_sell": "",
+                                "src_sell_address": "0x0", "dest_sell_address": "0x1"})
+            aggregators.append({"aggregator_buy": aggregator, "network_buy": network,
+                                "price_buy": rnd.uniform(0.97, 1.03), "dex_buy": "", "data_buy": "",
+                                "src_buy_address": "0x1", "dest_buy_address": "0x0"})
+    return exchanges, aggregators
+
+
+def pandas_best_quotes(exchanges, aggregators) -> tuple:
+    '''The selection calculate_spread did before reduce_quotes'''
+    import pandas as pd
+
+    df_cex_min = pd.DataFrame([
+        {
+            'exchange': d['exchange'],
+            'pair': d['data'].get('pair', ''),
+            'min_asks_price': d['data'].get('asks_fill_price'),
+            'asks_volumes': d['data'].get('asks_volumes', '')
+        } for d in exchanges if d.get('data')
+    ])
+    print(f"\n{df_cex_min}\n")
+    min_ask_row = df_cex_min.dropna(subset=['min_asks_price']).loc[df_cex_min['min_asks_price'].idxmin()]
+
+    df_cex_max = pd.DataFrame([
+        {
+            'exchange': d['exchange'],
+            'pair': d['data'].get('pair', ''),
+            'max_bids_price': d['data'].get('bids_fill_price'),
+            'bids_volumes': d['data'].get('bids_volumes', '')
+        } for d in exchanges if d.get('data')
+    ])
+    print(f"\n{df_cex_max}\n")
+    max_bid_row = df_cex_max.dropna(subset=['max_bids_price']).loc[df_cex_max['max_bids_price'].idxmax()]
+
+    df_dex_sell = pd.DataFrame([
+        {
+            'aggregator_sell': d.get('aggregator_sell', ''),
+            'network_sell': d.get('network_sell', ''),
+            'price_sell': d.get('price_sell', ''),
+            'dex_sell': d.get('dex_sell', ''),
+            'data_sell': d.get('data_sell', ''),
+            'src_sell_address': d.get('src_sell_address', ''),
+            'dest_sell_address': d.get('dest_sell_address', '')
+        } for d in aggregators if d.get('price_sell')
+    ])
+    print(f"\n{df_dex_sell}\n")
+    max_dex_sell = df_dex_sell.dropna(subset=['price_sell']).loc[df_dex_sell['price_sell'].idxmax()]
+
+    df_dex_buy = pd.DataFrame([
+        {
+            'aggregator_buy': d.get('aggregator_buy', ''),
+            'network_buy': d.get('network_buy', ''),
+            'price_buy': d.get('price_buy', ''),
+            'dex_buy': d.get('dex_buy', ''),
+            'data_buy': d.get('data_buy', ''),
+            'src_buy_address': d.get('src_buy_address', ''),
+            'dest_buy_address': d.get('dest_buy_address', '')
+        } for d in aggregators if d.get('price_buy')
+    ])
+    print(f"\n{df_dex_buy}\n")
+    min_dex_buy = df_dex_buy.dropna(subset=['price_buy']).loc[df_dex_buy['price_buy'].idxmin()]
+
+    return ((min_ask_row['exchange'], min_ask_row['min_asks_price']),
+            (max_bid_row['exchange'], max_bid_row['max_bids_price']),
+            (max_dex_sell['aggregator_sell'], max_dex_sell['network_sell'], max_dex_sell['price_sell']),
+            (min_dex_buy['aggregator_buy'], min_dex_buy['network_buy'], min_dex_buy['price_buy']))
+
+
+def reducer_best_quotes(exchanges, aggregators) -> tuple:
+    best = reduce_quotes(exchanges, aggregators)
+    return ((best.min_ask.exchange, best.min_ask.price),
+            (best.max_bid.exchange, best.max_bid.price),
+            (best.dex_sell.aggregator, best.dex_sell.network, best.dex_sell.price),
+            (best.dex_buy.aggregator, best.dex_buy.network, best.dex_buy.price))
+
+
+def timed(function, samples, rounds) -> float:
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(rounds):
+            for exchanges, aggregators in samples:
+                function(exchanges, aggregators)
+    return (time.perf_counter() - started) / (rounds * len(samples))
+
+
+def pandas_import_seconds() -> float:
+    code = "import time; t = time.perf_counter(); import pandas; print(time.perf_counter() - t)"
+    return float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stdout)
+
+
+def main(rounds: int = 20) -> None:
+    samples = [sample_quotes(seed) for seed in range(50)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        mismatches = sum(pandas_best_quotes(*sample) != reducer_best_quotes(*sample) for sample in samples)
+
+    pandas_seconds = timed(pandas_best_quotes, samples, rounds)
+    reducer_seconds = timed(reducer_best_quotes, samples, rounds)
+    quotes = len(samples[0][0]) + len(samples[0][1])
+    print(f"{len(samples)} token/stablecoin samples, {quotes} quotes each, {rounds} rounds")
+    print(f"pandas:  {pandas_seconds * 1e6:10.1f} us per calculate_spread selection")
+    print(f"reducer: {reducer_seconds * 1e6:10.1f} us per calculate_spread selection "
+          f"({pandas_seconds / reducer_seconds:.0f}x)")
+    print(f"5000 tokens x 2 stablecoins: pandas {pandas_seconds * 10000:.1f} s, reducer {reducer_seconds * 10000:.3f} s")
+    print(f"pandas import: {pandas_import_seconds() * 1000:.0f} ms")
+    print(f"Mismatching selections: {mismatches}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
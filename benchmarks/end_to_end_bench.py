@@ -0,0 +1,421 @@
+'''
+End-to-end throughput of find_spread against local venues, with the synchronous legacy/
+scanner as the baseline, so a change is measured before it is called a win.
+
+    python -m benchmarks.end_to_end_bench --tokens 20 --legacy-tokens 5 --latency 40
+    python -m benchmarks.end_to_end_bench --replay results/archive.jsonl.gz --speed 0
+    python -m benchmarks.end_to_end_bench --mock-url http://127.0.0.1:8780 --json results/bench.json
+
+Without --mock-url or --replay a mock_venues server is started on --port. Each scanner runs
+in its own process, in a scratch directory (results, cex_markets.json, tokens_info.json, the
+token store and dex_contracts.json/dex_contracts/ live there), three times over the same tokens:
+  timing    tokens/s, per token p50/p99 latency (both dest tokens), CPU seconds, peak RSS
+  profile   CPU time (cProfile on process_time) split by the module of each function:
+            parse, network, spread, io, other - see CATEGORIES; builtins and stdlib
+            helpers count for whoever called them
+  alloc     tracemalloc peak and the blocks/bytes still held per token afterwards
+The legacy scanner uses requests, so its calls are routed to the mock through
+session_manager.route; it cannot run from a replay archive. It has no client-side rate
+limits, so the async scanner runs without them too unless --client-limits is given; the
+time its requests spent waiting for the limiter (summed over requests, so it can exceed the
+wall time) is reported next to its throughput either way.
+'''
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import os
+import pstats
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import ujson as json
+
+_ROOT_DIR = Path(__file__).parent.parent.absolute()
+COINS_INFO_DIR = os.path.join(_ROOT_DIR, "tokens_coins_info")
+BENCH_PART = "bench"
+
+# first match wins, on "<file>:<function>" of every profiled function (self time only)
+CATEGORIES = [
+    ("io", ("builtins.print", "_io.", "logging/", "gzip", "storage/", "telemetry/")),
+    ("parse", ("ujson", "/json/", "cexs/", "dexs/", "legacy/get_", "eth_abi", "eth_utils", "hexbytes",
+               "decimal")),
+    ("spread", ("find_spread/", "legacy/main_legacy", "numpy", "pandas")),
+    ("network", ("aiohttp", "yarl", "multidict", "asyncio", "selectors", "select.", "socket", "ssl",
+                 "requests/", "urllib3", "http/client", "web3/", "transport/", "zlib", "brotli")),
+]
+
+# the mock ignores keys, but the parsers build their URLs and headers from them
+MOCK_API_KEYS = ["ETHERSCAN_API_KEY", "ARBISCAN_API_KEY", "OPTIMISTICSCAN_API_KEY", "POLYGONSCAN_API_KEY",
+                 "SNOWTRACE_API_KEY", "BSCSCAN_API_KEY", "BASESCAN_API_KEY", "ONE_INCH_BEARER_TOKEN"]
+
+# fallback for decimals()/symbol() when tokens_info.json has no default_token_abi (the mock verifies no source)
+ERC20_ABI = [{"name": name, "type": "function", "stateMutability": "view", "inputs": [],
+              "outputs": [{"name": "", "type": output}]}
+             for name, output in [("decimals", "uint8"), ("symbol", "string")]]
+
+
+def category(key) -> str:
+    filename, _, function = key
+    where = f"{filename}:{function}"
+    for name, patterns in CATEGORIES:
+        if any(pattern in where for pattern in patterns):
+            return name
+    return "other"
+
+
+def cpu_split(profile: cProfile.Profile) -> dict:
+    '''
+    Self time per category. A function of no category (builtins, stdlib helpers) counts
+    for its callers, in proportion to the time it spent for each of them.
+    '''
+    stats = pstats.Stats(profile).stats
+    resolved = {}
+
+    def shares(key) -> dict:
+        name = category(key)
+        if name != "other":
+            return {name: 1.0}
+        if key in resolved:
+            return resolved[key]
+        resolved[key] = {"other": 1.0}
+        callers = {caller: timing for caller, timing in stats[key][4].items() if caller in stats}
+        total = sum(timing[2] for timing in callers.values())
+        result = defaultdict(float)
+        for caller, timing in callers.items():
+            weight = timing[2] / total if total else 1 / len(callers)
+            for caller_name, share in shares(caller).items():
+                result[caller_name] += share * weight
+        if result:
+            resolved[key] = result
+        return resolved[key]
+
+    split = {name: 0.0 for name, _ in CATEGORIES}
+    split["other"] = 0.0
+    for key, (_, _, self_time, _, _) in stats.items():
+        for name, share in shares(key).items():
+            split[name] += self_time * share
+    return split
+
+
+def wait_for_port(host: str, port: int, seconds: float = 30) -> None:
+    deadline = time.monotonic() + seconds
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def start_mock(args) -> subprocess.Popen:
+    command = [sys.executable, "-m", "mock_venues.server", "--port", str(args.port),
+               "--latency", str(args.latency), "--jitter", str(args.jitter),
+               "--error-rate", str(args.error_rate), "--signal-rate", str(args.signal_rate)]
+    server = subprocess.Popen(command, cwd=_ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port("127.0.0.1", args.port)
+    return server
+
+
+def make_workdir(tokens: int, source_part: str) -> str:
+    '''Scratch copy of what the scanners read and write, so a run never touches the repo files'''
+    from dexs.dex_registry import DexRegistry
+
+    workdir = tempfile.mkdtemp(prefix="cex_dex_bench_")
+    coins_dir = os.path.join(workdir, "tokens_coins_info")
+    os.makedirs(coins_dir)
+    for name in os.listdir(COINS_INFO_DIR):
+        shutil.copy(os.path.join(COINS_INFO_DIR, name), coins_dir)
+    with open(os.path.join(COINS_INFO_DIR, f"coins_info_{source_part}.json")) as file:
+        coins_info = json.load(file)[:tokens]
+    with open(os.path.join(coins_dir, f"coins_info_{BENCH_PART}.json"), "w") as file:
+        json.dump(coins_info, file)
+    shutil.copytree(os.path.join(_ROOT_DIR, "dexs/abi/dex_contracts"), os.path.join(workdir, "dex_contracts"),
+                    ignore=shutil.ignore_patterns("pools_journal.jsonl"))
+    # the legacy scanner reads the same contracts, joined into its monolithic layout
+    DexRegistry(os.path.join(workdir, "dex_contracts")).join(os.path.join(workdir, "dex_contracts.json"))
+    with open(os.path.join(_ROOT_DIR, "dexs/abi/tokens_info.json")) as file:
+        tokens_info = json.load(file)
+    if not json.loads(tokens_info.get("default_token_abi") or "[]"):
+        tokens_info["default_token_abi"] = json.dumps(ERC20_ABI)
+    with open(os.path.join(workdir, "tokens_info.json"), "w") as file:
+        json.dump(tokens_info, file)
+    for directory in ["results", "legacy/results"]:
+        os.makedirs(os.path.join(workdir, directory))
+    return workdir
+
+
+def sandbox(workdir: str) -> None:
+    '''Points the files the scanners update at the copies in workdir'''
+    from dexs.async_get_dex_price import DexPrice
+    from dexs.dex_registry import dex_registry
+    from legacy.get_dex_prices_legacy import DexPrice as LegacyDexPrice
+    from storage.token_store import token_store
+    from telemetry.venue_metrics import venue_metrics
+
+    LegacyDexPrice._DEX_CONTRACTS_PATH = os.path.join(workdir, "dex_contracts.json")
+    with open(LegacyDexPrice._DEX_CONTRACTS_PATH) as file:
+        LegacyDexPrice._dex_contracts = json.load(file)
+    for dex_price in (DexPrice, LegacyDexPrice):
+        dex_price._TOKEN_INFO_PATH = os.path.join(workdir, "tokens_info.json")
+        with open(dex_price._TOKEN_INFO_PATH) as file:
+            dex_price._tokens_info = json.load(file)
+    dex_registry.directory = os.path.join(workdir, "dex_contracts")
+    token_store.path = os.path.join(workdir, "tokens_info.db")
+    token_store.seed_path = os.path.join(workdir, "tokens_info.json")
+    venue_metrics.path = os.path.join(workdir, "results/venue_metrics.prom")
+
+
+@contextlib.contextmanager
+def routed_requests():
+    '''Sends the legacy requests/web3 calls where session_manager sends the async ones'''
+    import requests
+    from transport.session_manager import session_manager
+
+    request = requests.sessions.Session.request
+
+    def routed(self, method, url, *args, **kwargs):
+        return request(self, method, session_manager.route(url), *args, **kwargs)
+
+    requests.sessions.Session.request = routed
+    try:
+        yield
+    finally:
+        requests.sessions.Session.request = request
+
+
+async def run_async(args, workdir: str, latencies: list, run: int) -> None:
+    import find_spread.find_spread as spread_module
+    from cexs.market_universe import MarketUniverse
+    from storage.quote_history import QuoteHistory
+
+    scan_token = spread_module.scan_token
+
+    async def timed_scan_token(*scan_args, **scan_kwargs):
+        started = time.perf_counter()
+        try:
+            await scan_token(*scan_args, **scan_kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    spread_module.scan_token = timed_scan_token
+    spread_module.MarketUniverse = partial(MarketUniverse, path=os.path.join(workdir, "cex_markets.json"))
+    spread_module.quote_history = QuoteHistory(os.path.join(workdir, f"results/quote_history_{run}"))
+    try:
+        await spread_module.find_spread(BENCH_PART, concurrency=args.concurrency, budget=args.budget,
+                                        batch=args.batch, history=not args.no_history)
+    finally:
+        spread_module.scan_token = scan_token
+
+
+def run_legacy(args, workdir: str, latencies: list, run: int) -> None:
+    from legacy import main_legacy
+
+    with open(os.path.join(workdir, "tokens_coins_info", f"coins_info_{BENCH_PART}.json")) as file:
+        coins_info = json.load(file)
+    with routed_requests():
+        for src_token in coins_info:
+            started = time.perf_counter()
+            for dest_token in ["USDT", "USDC"]:
+                exchanges = main_legacy.cex_prices(src_token, dest_token=dest_token)
+                aggregators = main_legacy.dex_prices(src_token, dest_token=dest_token)
+                main_legacy.find_spread(exchanges, aggregators)
+            latencies.append(time.perf_counter() - started)
+
+
+def run_once(args, workdir: str, run: int) -> list:
+    latencies = []
+    if args.worker == "async":
+        os.chdir(workdir)
+        asyncio.run(run_async(args, workdir, latencies, run))
+    else:
+        # legacy/main_legacy.py reads ../tokens_coins_info and writes results/
+        os.chdir(os.path.join(workdir, "legacy"))
+        run_legacy(args, workdir, latencies, run)
+    return latencies
+
+
+def worker(args) -> None:
+    '''One scanner, all passes, results as JSON to args.out'''
+    import logging
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if not args.replay:
+        for name in MOCK_API_KEYS:
+            os.environ.setdefault(name, "mock")
+    sandbox(args.workdir)
+    from transport import rate_limiter
+    from transport.session_manager import session_manager
+    if not args.client_limits:
+        rate_limiter.DEFAULT_HOST_LIMIT = (1e9, 1e9)
+        session_manager.rate_limiter.host_limits = {}
+    if args.replay:
+        session_manager.replay(args.replay, args.speed)
+    elif args.mock_url:
+        session_manager.mock_url = args.mock_url
+    result = {"scanner": args.worker}
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        cpu, started = time.process_time(), time.perf_counter()
+        latencies = run_once(args, args.workdir, 0)
+        wall = time.perf_counter() - started
+        result.update({
+            "tokens": len(latencies),
+            "seconds": wall,
+            "tokens_per_second": len(latencies) / wall if wall else 0.0,
+            "limiter_wait": sum(host_stats["waited"] for host_stats in session_manager.rate_limiter.stats.values()),
+            "p50": float(np.percentile(latencies, 50)) if latencies else None,
+            "p99": float(np.percentile(latencies, 99)) if latencies else None,
+            "cpu_per_token": (time.process_time() - cpu) / max(len(latencies), 1),
+            "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        })
+
+        if not args.skip_profile:
+            profile = cProfile.Profile(time.process_time)
+            profile.enable()
+            run_once(args, args.workdir, 1)
+            profile.disable()
+            result["cpu_split"] = cpu_split(profile)
+
+        if not args.skip_alloc:
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            latencies = run_once(args, args.workdir, 2)
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            growth = [stat for stat in after.compare_to(before, "filename") if stat.size_diff > 0]
+            tokens = max(len(latencies), 1)
+            result.update({
+                "alloc_peak_mib": peak / 2 ** 20,
+                "retained_blocks_per_token": sum(stat.count_diff for stat in growth) / tokens,
+                "retained_kib_per_token": sum(stat.size_diff for stat in growth) / 1024 / tokens
+            })
+
+    with open(args.out, "w") as file:
+        json.dump(result, file)
+
+
+def run_worker(args, scanner: str, tokens: int) -> dict | None:
+    workdir = make_workdir(tokens, args.part)
+    out = os.path.join(workdir, "result.json")
+    command = [sys.executable, "-m", "benchmarks.end_to_end_bench", "--worker", scanner,
+               "--workdir", workdir, "--out", out, "--concurrency", str(args.concurrency)]
+    for flag, value in [("--budget", args.budget), ("--replay", args.replay), ("--mock-url", args.mock_url)]:
+        if value is not None:
+            command += [flag, str(value)]
+    command += ["--speed", str(args.speed)]
+    for flag in ["batch", "no_history", "client_limits", "skip_profile", "skip_alloc"]:
+        if getattr(args, flag):
+            command.append(f"--{flag.replace('_', '-')}")
+    log = os.path.join(workdir, "worker.log")
+    try:
+        with open(log, "w") as file:
+            subprocess.run(command, cwd=_ROOT_DIR, check=True, stdout=subprocess.DEVNULL, stderr=file)
+        with open(out) as file:
+            return json.load(file)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        with open(log) as file:
+            print(f"{scanner} run failed: {e}\n{''.join(file.readlines()[-20:])}")
+        return None
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"{scanner} scratch directory: {workdir}")
+
+
+def _number(value, digits: int = 3) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def print_report(results: list) -> None:
+    names = [name for name, _ in CATEGORIES] + ["other"]
+    print(f"{'':8} {'tokens':>6} {'tok/s':>8} {'wait s':>8} {'p50 s':>8} {'p99 s':>8} {'cpu s/tok':>10} {'rss MiB':>8} "
+          f"{'alloc MiB':>9} {'kept KiB/tok':>12}  cpu split")
+    for result in results:
+        split = result.get("cpu_split")
+        total = sum(split.values()) if split else 0
+        shares = " ".join(f"{name} {split[name] / total * 100:.0f}%" for name in names) if total else "-"
+        print(f"{result['scanner']:8} {result['tokens']:>6} {_number(result['tokens_per_second'], 2):>8} "
+              f"{_number(result.get('limiter_wait'), 2):>8} {_number(result['p50']):>8} {_number(result['p99']):>8} {_number(result['cpu_per_token'], 4):>10} "
+              f"{_number(result['peak_rss_mib'], 1):>8} {_number(result.get('alloc_peak_mib'), 1):>9} "
+              f"{_number(result.get('retained_kib_per_token'), 1):>12}  {shares}")
+    by_scanner = {result["scanner"]: result for result in results}
+    if "async" in by_scanner and "legacy" in by_scanner and by_scanner["legacy"]["tokens_per_second"]:
+        speedup = by_scanner["async"]["tokens_per_second"] / by_scanner["legacy"]["tokens_per_second"]
+        print(f"async vs legacy: {speedup:.1f}x tokens/s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end find_spread benchmark against local venues")
+    parser.add_argument("--tokens", type=int, default=20, help="tokens of the async run")
+    parser.add_argument("--legacy-tokens", type=int, default=5, help="tokens of the legacy run, 0 skips it")
+    parser.add_argument("--part", default="1", help="coins_info_<part>.json the tokens are taken from")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--budget", type=float, default=None)
+    parser.add_argument("--batch", action="store_true")
+    parser.add_argument("--no-history", action="store_true")
+    parser.add_argument("--client-limits", action="store_true",
+                        help="keep the production per-host budgets of rate_limiter in the async run "
+                             "(the legacy run has none, so they are lifted by default)")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency", type=float, default=40, help="mock median latency, ms")
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--signal-rate", type=float, default=0.01)
+    parser.add_argument("--mock-url", default=None, help="an already running mock_venues server")
+    parser.add_argument("--replay", default=None, help="serve a record_replay archive instead of a mock")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 0 answers at once")
+    parser.add_argument("--skip-profile", action="store_true")
+    parser.add_argument("--skip-alloc", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directories")
+    parser.add_argument("--json", default=None, help="also write the results here")
+    parser.add_argument("--worker", choices=["async", "legacy"], help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.worker:
+        worker(args)
+        return
+    server = None
+    if not args.replay and not args.mock_url:
+        server = start_mock(args)
+        args.mock_url = f"http://127.0.0.1:{args.port}"
+    try:
+        results = [run_worker(args, "async", args.tokens)]
+        if args.legacy_tokens and args.replay:
+            print("legacy baseline skipped: it uses requests, which a replay archive cannot serve")
+        elif args.legacy_tokens:
+            results.append(run_worker(args, "legacy", args.legacy_tokens))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    results = [result for result in results if result]
+    print_report(results)
+    if args.client_limits and len(results) > 1:
+        print("async ran with the client-side rate limits, legacy without: wait s is time lost to them")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
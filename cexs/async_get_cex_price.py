@@ -3,13 +3,17 @@ import aiohttp
 import logging
 import ujson as json
 
+from cexs.order_book import OrderBook, TICKET_SIZE
+from telemetry.venue_metrics import venue_metrics
+
 logging.basicConfig(level=logging.INFO)
 
 
 class CexPrice:
-    def __init__(self, exchange):
+    def __init__(self, exchange, ticket_size: float = TICKET_SIZE):
         self.exchange = exchange
-        self.pair = self.exchange.prepare_pair()
+        self.ticket_size = ticket_size
+        self.pair = self.exchange.pair
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36',
             'Accept-Language': 'en-US,en;q=0.5',
@@ -20,22 +24,9 @@ class CexPrice:
 
     async def get_exchange_data(self, session) -> dict:
         logging.info(f"START {self.exchange.name}")
-        url = self.exchange.url
         try:
-            if "symbol" in url:
-                symbol_url = self.pair
-                url = url.replace("symbol", symbol_url)
-                if self.exchange.params != "":
-                    response = await session.get(url, headers=self.headers, params=self.exchange.params)
-                else:
-                    response = await session.get(url, headers=self.headers)
-            else:
-                params = self.exchange.params
-                for key, value in params.items():
-                    if key in ["symbol", "instrument_name", "market", "pair", "instId", "currency_pair"]:
-                        value = self.pair
-                        params.update({key: value})
-                response = await session.get(url, headers=self.headers, params=params)
+            response = await session.get(self.exchange.url, headers=self.headers, params=self.exchange.params,
+                                         venue=self.exchange.name, endpoint=self.exchange.endpoint)
             logging.info(f"\nresponse {self.exchange.name} - {response}\n")
 
             if response.status == 200:
@@ -62,6 +53,10 @@ class CexPrice:
             logging.error(f"Unexpected error fetching data from {self.exchange.name}: {e}")
             return None
 
+    def price_data(self, bids, asks) -> dict:
+        book = OrderBook.from_levels(bids, asks, symbol=self.pair)
+        return book.price_data(self.exchange.name, self.pair, self.ticket_size)
+
     async def get_price(self, session) -> dict:
         try:
             data = await self.get_exchange_data(session)
@@ -69,25 +64,12 @@ class CexPrice:
                 bids = data["bids"]
                 asks = data["asks"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -100,25 +82,12 @@ class BybitPrice(CexPrice):
                 bids = data["result"]["b"]
                 asks = data["result"]["a"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             print(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -131,25 +100,12 @@ class BingxPrice(CexPrice):
                 bids = data["data"]["bids"]
                 asks = data["data"]["asks"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[-1][0])
-                asks_volumes = float(asks[-1][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -162,28 +118,15 @@ class BitfinexGeminiPrice(CexPrice):
         try:
             data = await self.get_exchange_data(session)
             if data:
-                bids = data["bids"]
-                asks = data["asks"]
+                bids = [(level["price"], level["amount"]) for level in data["bids"]]
+                asks = [(level["price"], level["amount"]) for level in data["asks"]]
 
-                max_bids_price = float(bids[0]["price"])
-                bids_volumes = float(bids[0]["amount"])
-                min_asks_price = float(asks[0]["price"])
-                asks_volumes = float(asks[0]["amount"])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -199,25 +142,12 @@ class BitgetCoinwKucoinCexioLbankPrice(CexPrice):
                 bids = data["data"]["bids"]
                 asks = data["data"]["asks"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -232,7 +162,7 @@ class BitmexPrice(CexPrice):
 
                 assets_url = "https://www.bitmex.com/api/v1/wallet/assets"
 
-                response = await session.get(assets_url)
+                response = await session.get(assets_url, venue=self.exchange.name)
                 assets_data = await response.json()
 
                 if response.status == 200:
@@ -248,16 +178,7 @@ class BitmexPrice(CexPrice):
                                 asks_volumes = float(
                                     asks["size"] / 10 ** currency["scale"])
 
-                    crypto_data = {
-                        "exchange": self.exchange.name,
-                        "pair": self.pair,
-                        "max_bids_price": max_bids_price,
-                        "bids_volumes": bids_volumes,
-                        "min_asks_price": min_asks_price,
-                        "asks_volumes": asks_volumes
-                    }
-
-                    return crypto_data
+                    return self.price_data([(max_bids_price, bids_volumes)], [(min_asks_price, asks_volumes)])
                 else:
                     logging.info(
                         f"Something went wrong with fetch data: {response.text}")
@@ -266,6 +187,7 @@ class BitmexPrice(CexPrice):
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -275,28 +197,15 @@ class BittrexPrice(CexPrice):
         try:
             data = await self.get_exchange_data(session)
             if data:
-                bids = data["bid"]
-                asks = data["ask"]
-
-                max_bids_price = float(bids[0]["rate"])
-                bids_volumes = float(bids[0]["quantity"])
-                min_asks_price = float(asks[0]["rate"])
-                asks_volumes = float(asks[0]["quantity"])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
+                bids = [(level["rate"], level["quantity"]) for level in data["bid"]]
+                asks = [(level["rate"], level["quantity"]) for level in data["ask"]]
 
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -309,25 +218,12 @@ class CryptocomPrice(CexPrice):
                 bids = data["result"]["data"][0]["bids"]
                 asks = data["result"]["data"][0]["asks"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -340,25 +236,12 @@ class DeribitPrice(CexPrice):
                 bids = data["result"]["bids"]
                 asks = data["result"]["asks"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -368,28 +251,15 @@ class DydxPrice(CexPrice):
         try:
             data = await self.get_exchange_data(session)
             if data:
-                bids = data["bids"]
-                asks = data["asks"]
-
-                max_bids_price = float(bids[0]["price"])
-                bids_volumes = float(bids[0]["size"])
-                min_asks_price = float(asks[0]["price"])
-                asks_volumes = float(asks[0]["size"])
+                bids = [(level["price"], level["size"]) for level in data["bids"]]
+                asks = [(level["price"], level["size"]) for level in data["asks"]]
 
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -399,28 +269,15 @@ class GarantexPrice(CexPrice):
         try:
             data = await self.get_exchange_data(session)
             if data:
-                bids = data["bids"]
-                asks = data["asks"]
-
-                max_bids_price = float(bids[0]["price"])
-                bids_volumes = float(bids[0]["volume"])
-                min_asks_price = float(asks[0]["price"])
-                asks_volumes = float(asks[0]["volume"])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
+                bids = [(level["price"], level["volume"]) for level in data["bids"]]
+                asks = [(level["price"], level["volume"]) for level in data["asks"]]
 
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -433,25 +290,12 @@ class HuobiPrice(CexPrice):
                 bids = data["tick"]["bids"]
                 asks = data["tick"]["asks"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -473,6 +317,7 @@ class KinePrice(CexPrice):
             else:
                 logging.info(f"No data in {self.exchange.name}")
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -485,25 +330,12 @@ class KrakenPrice(CexPrice):
                 bids = data["result"][self.pair]["bids"]
                 asks = data["result"][self.pair]["asks"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -516,25 +348,12 @@ class OkxPrice(CexPrice):
                 bids = data["data"][0]["bids"]
                 asks = data["data"][0]["asks"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -544,28 +363,15 @@ class PhemexPrice(CexPrice):
         try:
             data = await self.get_exchange_data(session)
             if data:
-                bids = data["result"]["book"]["bids"]
-                asks = data["result"]["book"]["asks"]
-
-                max_bids_price = float(bids[0][0] / 10000)
-                bids_volumes = float(bids[0][1] / 10000)
-                min_asks_price = float(asks[0][0] / 10000)
-                asks_volumes = float(asks[0][1] / 10000)
+                bids = [(level[0] / 10000, level[1] / 10000) for level in data["result"]["book"]["bids"]]
+                asks = [(level[0] / 10000, level[1] / 10000) for level in data["result"]["book"]["asks"]]
 
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -575,28 +381,15 @@ class PoloniexPrice(CexPrice):
         try:
             data = await self.get_exchange_data(session)
             if data:
-                bids = data["bids"]
-                asks = data["asks"]
-
-                max_bids_price = float(bids[0])
-                bids_volumes = float(bids[1])
-                min_asks_price = float(asks[0])
-                asks_volumes = float(asks[1])
+                bids = list(zip(data["bids"][0::2], data["bids"][1::2]))
+                asks = list(zip(data["asks"][0::2], data["asks"][1::2]))
 
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -609,25 +402,12 @@ class YoubitPrice(CexPrice):
                 bids = data[self.pair]["bids"]
                 asks = data[self.pair]["asks"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -640,25 +420,12 @@ class CoinexPrice(CexPrice):
                 bids = data["data"]["depth"]["bids"]
                 asks = data["data"]["depth"]["asks"]
 
-                max_bids_price = float(bids[0][0])
-                bids_volumes = float(bids[0][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
 
@@ -671,24 +438,11 @@ class BackpackPrice(CexPrice):
                 bids = data["bids"]
                 asks = data["asks"]
 
-                max_bids_price = float(bids[-1][0])
-                bids_volumes = float(bids[-1][1])
-                min_asks_price = float(asks[0][0])
-                asks_volumes = float(asks[0][1])
-
-                crypto_data = {
-                    "exchange": self.exchange.name,
-                    "pair": self.pair,
-                    "max_bids_price": max_bids_price,
-                    "bids_volumes": bids_volumes,
-                    "min_asks_price": min_asks_price,
-                    "asks_volumes": asks_volumes
-                }
-
-                return crypto_data
+                return self.price_data(bids, asks)
             else:
                 logging.info(f"No data in {self.exchange.name}")
                 return None
         except Exception as e:
+            venue_metrics.parse_failure(self.exchange.name, self.exchange.endpoint)
             logging.error(f"Error fetching prices from {self.exchange.name}: {e}")
             return None
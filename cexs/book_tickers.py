@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+import ujson as json
+
+from cexs.order_book import OrderBook, TICKET_SIZE
+
+logging.basicConfig(level=logging.INFO)
+
+
+def normalize_symbol(symbol: str) -> str:
+    return symbol.replace("-", "").replace("_", "").replace("/", "").upper()
+
+
+class BookTickerSource:
+    '''Binance, Mexc: one endpoint with best bid/ask for every symbol'''
+
+    def __init__(self,
+                 name: str,
+                 url: str,
+                 params: dict | None = None):
+        self.name = name
+        self.url = url
+        self.params = params or {}
+
+    def tickers(self, data):
+        for ticker in data:
+            yield ticker["symbol"], ticker["bidPrice"], ticker["bidQty"], ticker["askPrice"], ticker["askQty"]
+
+
+class BybitBookTicker(BookTickerSource):
+    def tickers(self, data):
+        for ticker in data["result"]["list"]:
+            yield ticker["symbol"], ticker["bid1Price"], ticker["bid1Size"], ticker["ask1Price"], ticker["ask1Size"]
+
+
+class OkxBookTicker(BookTickerSource):
+    def tickers(self, data):
+        for ticker in data["data"]:
+            yield ticker["instId"], ticker["bidPx"], ticker["bidSz"], ticker["askPx"], ticker["askSz"]
+
+
+class GateioBookTicker(BookTickerSource):
+    def tickers(self, data):
+        for ticker in data:
+            yield ticker["currency_pair"], ticker["highest_bid"], ticker.get("highest_size"), \
+                ticker["lowest_ask"], ticker.get("lowest_size")
+
+
+class KucoinBookTicker(BookTickerSource):
+    def tickers(self, data):
+        for ticker in data["data"]["ticker"]:
+            yield ticker["symbol"], ticker["buy"], ticker["bestBidSize"], ticker["sell"], ticker["bestAskSize"]
+
+
+class BitgetBookTicker(BookTickerSource):
+    def tickers(self, data):
+        for ticker in data["data"]:
+            yield ticker["symbol"], ticker["bidPr"], ticker["bidSz"], ticker["askPr"], ticker["askSz"]
+
+
+class HuobiBookTicker(BookTickerSource):
+    def tickers(self, data):
+        for ticker in data["data"]:
+            yield ticker["symbol"], ticker["bid"], ticker["bidSize"], ticker["ask"], ticker["askSize"]
+
+
+class PoloniexBookTicker(BookTickerSource):
+    def tickers(self, data):
+        for ticker in data:
+            yield ticker["symbol"], ticker["bid"], ticker["bidQuantity"], ticker["ask"], ticker["askQuantity"]
+
+
+Binance_book_ticker = BookTickerSource(
+    name="binance",
+    url="https://api.binance.com/api/v3/ticker/bookTicker",
+)
+
+
+Bybit_book_ticker = BybitBookTicker(
+    name="bybit",
+    url="https://api.bybit.com/v5/market/tickers",
+    params={
+        "category": "spot"
+    },
+)
+
+
+Okx_book_ticker = OkxBookTicker(
+    name="okx",
+    url="https://www.okx.com/api/v5/market/tickers",
+    params={
+        "instType": "SPOT"
+    },
+)
+
+
+Gateio_book_ticker = GateioBookTicker(
+    name="gateio",
+    url="https://api.gateio.ws/api/v4/spot/tickers",
+)
+
+
+Kucoin_book_ticker = KucoinBookTicker(
+    name="kucoin",
+    url="https://api.kucoin.com/api/v1/market/allTickers",
+)
+
+
+Mexc_book_ticker = BookTickerSource(
+    name="mexc",
+    url="https://api.mexc.com/api/v3/ticker/bookTicker",
+)
+
+
+Bitget_book_ticker = BitgetBookTicker(
+    name="bitget",
+    url="https://api.bitget.com/api/v2/spot/market/tickers",
+)
+
+
+Huobi_book_ticker = HuobiBookTicker(
+    name="huobi",
+    url="https://api.huobi.pro/market/tickers",
+)
+
+
+Poloniex_book_ticker = PoloniexBookTicker(
+    name="poloniex",
+    url="https://api.poloniex.com/markets/ticker24h",
+)
+
+
+BOOK_TICKER_SOURCES = [
+    Binance_book_ticker,
+    Bybit_book_ticker,
+    Okx_book_ticker,
+    Gateio_book_ticker,
+    Kucoin_book_ticker,
+    Mexc_book_ticker,
+    Bitget_book_ticker,
+    Huobi_book_ticker,
+    Poloniex_book_ticker,
+]
+
+
+class BookTickerSnapshot:
+    '''
+    Top of book for every symbol of the exchanges in BOOK_TICKER_SOURCES,
+    pulled with one request per exchange and indexed by normalized symbol.
+    get_price() is a one level book: when that level cannot fill the ticket its
+    fill prices are None and the scan asks the venue for its depth instead.
+    '''
+
+    def __init__(self, sources: list | None = None, max_age: float = 5):
+        self.sources = sources if sources is not None else BOOK_TICKER_SOURCES
+        self.max_age = max_age
+        self.index = {}
+        self.updated_at = {}
+        self._lock = asyncio.Lock()
+
+    async def _fetch(self, source, session):
+        try:
+            response = await session.get(source.url, params=source.params, venue=source.name)
+            if response.status != 200:
+                logging.info(f"Book tickers of {source.name}: status {response.status}")
+                return None
+            text = await response.text()
+            index = {}
+            for symbol, bid, bid_qty, ask, ask_qty in source.tickers(json.loads(text)):
+                if not bid or not ask or bid_qty is None or ask_qty is None:
+                    continue
+                index[normalize_symbol(symbol)] = (float(bid), float(bid_qty), float(ask), float(ask_qty))
+            return index
+        except asyncio.TimeoutError:
+            logging.error(f"Timeout in book tickers of {source.name}")
+        except aiohttp.ClientError as e:
+            logging.error(f"Client error in book tickers of {source.name}: {e}")
+        except Exception as e:
+            logging.error(f"Error parsing book tickers of {source.name}: {e}")
+        return None
+
+    async def refresh(self, session) -> None:
+        start = time.monotonic()
+        results = await asyncio.gather(*[self._fetch(source, session) for source in self.sources])
+        now = time.monotonic()
+        for source, index in zip(self.sources, results):
+            if index:
+                self.index[source.name] = index
+                self.updated_at[source.name] = now
+            elif source.name in self.updated_at and now - self.updated_at[source.name] > self.max_age:
+                del self.index[source.name]
+                del self.updated_at[source.name]
+        logging.info(f"Book tickers refreshed for {sorted(self.index)} in {now - start:.2f}s")
+
+    def is_stale(self) -> bool:
+        if not self.updated_at:
+            return True
+        return time.monotonic() - min(self.updated_at.values()) > self.max_age
+
+    async def refresh_if_stale(self, session) -> None:
+        async with self._lock:
+            if self.is_stale():
+                await self.refresh(session)
+
+    def covers(self, exchange_name: str) -> bool:
+        return exchange_name in self.index
+
+    def get_price(self, exchange_name: str, pair: str, ticket_size: float = TICKET_SIZE) -> dict | None:
+        top = self.index.get(exchange_name, {}).get(normalize_symbol(pair))
+        if top is None:
+            return None
+        max_bids_price, bids_volumes, min_asks_price, asks_volumes = top
+        book = OrderBook.from_levels([(max_bids_price, bids_volumes)], [(min_asks_price, asks_volumes)], symbol=pair)
+        return book.price_data(exchange_name, pair, ticket_size)
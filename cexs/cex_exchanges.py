@@ -1,124 +1,145 @@
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+
+@dataclass(frozen=True)
+class ExchangeRequest:
+    '''One order book request: template url/params filled with the pair of a single token'''
+    name: str
+    url: str
+    params: dict
+    pair: str
+    src_token: str
+    dest_token: str
+    endpoint: str
+
+
+@dataclass(frozen=True, eq=False)
 class CexExchanges:
     '''Bybit, Binance, Mexc'''
+    name: str
+    url: str
+    params: dict
 
-    def __init__(self,
-                 name: str,
-                 url: str,
-                 params: dict,
-                 src_token: str,
-                 dest_token: str):
-        self.name = name
-        self.url = url
-        self.params = params
-        self.src_token = src_token
-        self.dest_token = dest_token
-
-    def prepare_pair(self) -> str:
-        pairs = (self.src_token+self.dest_token).upper()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        pairs = (src_token+dest_token).upper()
         return pairs
 
+    def spec(self, src_token: str, dest_token: str) -> ExchangeRequest:
+        pair = self.prepare_pair(src_token, dest_token)
+        url = self.url
+        params = dict(self.params or {})
+        if "symbol" in url:
+            url = url.replace("symbol", pair)
+        else:
+            for key in params:
+                if key in ["symbol", "instrument_name", "market", "pair", "instId", "currency_pair"]:
+                    params[key] = pair
+        return ExchangeRequest(name=self.name, url=url, params=params, pair=pair,
+                               src_token=src_token, dest_token=dest_token, endpoint=urlsplit(self.url).path)
+
 
 class BingxBittrexCoinbaseKucoinOkxCexio(CexExchanges):
     '''Bingx, Bittrex, Coinbase, Kucoin, Okx, Cexio'''
 
-    def prepare_pair(self) -> str:
-        pairs = (self.src_token+"-"+self.dest_token).upper()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        pairs = (src_token+"-"+dest_token).upper()
         return pairs
 
 
 class BitfinexKinePhemex(CexExchanges):
     '''Bitfinex, Kine, Phemex'''
 
-    def prepare_pair(self) -> str:
-        if self.src_token == "USDT":
-            self.src_token = "USD"
-        if self.dest_token == "USDT":
-            self.dest_token = "USD"
-        pairs = (self.src_token+self.dest_token).upper()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        if src_token == "USDT":
+            src_token = "USD"
+        if dest_token == "USDT":
+            dest_token = "USD"
+        pairs = (src_token+dest_token).upper()
         return pairs
 
 
 class BitgetYoubitLbank(CexExchanges):
     '''Bitget, Youbit, Lbank'''
 
-    def prepare_pair(self) -> str:
-        pairs = (self.src_token+"_"+self.dest_token).lower()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        pairs = (src_token+"_"+dest_token).lower()
         return pairs
 
 
 class BitmexKraken(CexExchanges):
     '''Bitmex, Kraken'''
 
-    def prepare_pair(self) -> str:
-        if self.src_token == "BTC":
-            self.src_token = "XBT"
-        if self.dest_token == "BTC":
-            self.dest_token = "XBT"
-        pairs = (self.src_token+self.dest_token).upper()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        if src_token == "BTC":
+            src_token = "XBT"
+        if dest_token == "BTC":
+            dest_token = "XBT"
+        pairs = (src_token+dest_token).upper()
         return pairs
 
 
 class BitstampGarantexHuobi(CexExchanges):
     '''Bitstamp, Garantex, Huobi'''
 
-    def prepare_pair(self) -> str:
-        pairs = (self.src_token+self.dest_token).lower()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        pairs = (src_token+dest_token).lower()
         return pairs
 
 
 class CoinwCryptocomPoloniexBackpackGateio(CexExchanges):
     '''Coinw, Cryptocom, Poloniex, Backpack, Gateio'''
 
-    def prepare_pair(self) -> str:
-        pairs = (self.src_token+"_"+self.dest_token).upper()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        pairs = (src_token+"_"+dest_token).upper()
         return pairs
 
 
 class Deribit(CexExchanges):
     '''Deribit'''
 
-    def prepare_pair(self) -> str:
-        if self.src_token == "USDT":
-            self.src_token = "PERPETUAL"
-        if self.dest_token == "USDT":
-            self.dest_token = "PERPETUAL"
-        pairs = (self.src_token+"-"+self.dest_token).upper()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        if src_token == "USDT":
+            src_token = "PERPETUAL"
+        if dest_token == "USDT":
+            dest_token = "PERPETUAL"
+        pairs = (src_token+"-"+dest_token).upper()
         return pairs
 
 
 class Dydx(CexExchanges):
     '''Dydx'''
 
-    def prepare_pair(self) -> str:
-        if self.src_token == "USDT":
-            self.src_token = "USD"
-        if self.dest_token == "USDT":
-            self.dest_token = "USD"
-        pairs = (self.src_token+"-"+self.dest_token).upper()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        if src_token == "USDT":
+            src_token = "USD"
+        if dest_token == "USDT":
+            dest_token = "USD"
+        pairs = (src_token+"-"+dest_token).upper()
         return pairs
 
 
 class Gemini(CexExchanges):
     '''Gemini'''
 
-    def prepare_pair(self) -> str:
-        if self.src_token == "USDT":
-            self.src_token = "USD"
-        if self.dest_token == "USDT":
-            self.dest_token = "USD"
-        pairs = (self.src_token+self.dest_token).lower()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        if src_token == "USDT":
+            src_token = "USD"
+        if dest_token == "USDT":
+            dest_token = "USD"
+        pairs = (src_token+dest_token).lower()
         return pairs
 
 
 class Zigzag(CexExchanges):
     '''Zigzag'''
 
-    def prepare_pair(self) -> str:
-        if self.src_token == "BTC":
-            self.src_token = "WBTC"
-        if self.dest_token == "BTC":
-            self.dest_token = "WBTC"
-        pairs = (self.src_token+"-"+self.dest_token).lower()
+    def prepare_pair(self, src_token: str, dest_token: str) -> str:
+        if src_token == "BTC":
+            src_token = "WBTC"
+        if dest_token == "BTC":
+            dest_token = "WBTC"
+        pairs = (src_token+"-"+dest_token).lower()
         return pairs
 
 
@@ -129,8 +150,6 @@ Bybit_exchange = CexExchanges(
         "category": "spot",
         "symbol": "",
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -139,10 +158,8 @@ Binance_exchange = CexExchanges(
     url="https://api.binance.com/api/v3/depth",
     params={
         "symbol": "",
-        "limit": 1
+        "limit": 20
     },
-    src_token="",
-    dest_token=""
 )
 
 
@@ -153,8 +170,6 @@ Bingx_exchange = BingxBittrexCoinbaseKucoinOkxCexio(
         "symbol": "",
         "limit": 100
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -162,8 +177,6 @@ Bitfinex_exchange = BitfinexKinePhemex(
     name="bitfinex",
     url="https://api.bitfinex.com/v1/book/symbol",
     params="",
-    src_token="",
-    dest_token="",
 )
 
 
@@ -173,8 +186,6 @@ Bitget_exchange = BitgetYoubitLbank(
     params={
         "symbol": ""
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -185,8 +196,6 @@ Bitmex_exchange = BitmexKraken(
         "symbol": "",
         "depth": 1
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -194,8 +203,6 @@ Bitstamp_exchange = BitstampGarantexHuobi(
     name="bitstamp",
     url="https://www.bitstamp.net/api/v2/order_book/symbol",
     params="",
-    src_token="",
-    dest_token="",
 )
 
 
@@ -203,10 +210,8 @@ Bittrex_exchange = BingxBittrexCoinbaseKucoinOkxCexio(
     name="bittrex",
     url="https://api.bittrex.com/v3/markets/symbol/orderbook",
     params={
-        "depth": 1
+        "depth": 25
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -214,8 +219,6 @@ Coinbase_exchange = BingxBittrexCoinbaseKucoinOkxCexio(
     name="coinbase",
     url="https://api.exchange.coinbase.com/products/symbol/book",
     params="",
-    src_token="",
-    dest_token="",
 )
 
 
@@ -227,8 +230,6 @@ Coinw_exchange = CoinwCryptocomPoloniexBackpackGateio(
         "symbol": "",
         "limit": 20
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -237,10 +238,8 @@ Cryptocom_exchange = CoinwCryptocomPoloniexBackpackGateio(
     url="https://api.crypto.com/v2/public/get-book",
     params={
         "instrument_name": "",
-        "depth": 5
+        "depth": 20
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -249,10 +248,8 @@ Deribit_exchange = Deribit(
     url="https://www.deribit.com/api/v2/public/get_order_book",
     params={
         "instrument_name": "",
-        "depth": 5
+        "depth": 20
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -260,8 +257,6 @@ Dydx_exchange = Dydx(
     name="dydx",
     url="https://api.dydx.exchange/v3/orderbook/symbol",
     params="",
-    src_token="",
-    dest_token="",
 )
 
 
@@ -271,8 +266,6 @@ Garantex_exchange = BitstampGarantexHuobi(
     params={
         "market": ""
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -282,8 +275,6 @@ Gateio_exchange = CoinwCryptocomPoloniexBackpackGateio(
     params={
         "currency_pair": ""
         },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -291,8 +282,6 @@ Gemini_exchange = Gemini(
     name="gemini",
     url="https://api.gemini.com/v1/book/symbol",
     params="",
-    src_token="",
-    dest_token="",
 )
 
 
@@ -302,10 +291,8 @@ Huobi_exchange = BitstampGarantexHuobi(
     params={
         "symbol": "",
         "type": "step1",
-        "depth": 5
+        "depth": 20
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -313,8 +300,6 @@ Kine_exchange = BitfinexKinePhemex(
     name="kine",
     url="https://api.kine.exchange/market/api/price/symbol",
     params="",
-    src_token="",
-    dest_token="",
 )
 
 
@@ -323,10 +308,8 @@ Kraken_exchange = BitmexKraken(
     url="https://api.kraken.com/0/public/Depth",
     params={
         "pair": "",
-        "count": 1
+        "count": 20
     },
-    src_token="",
-    dest_token=""
 )
 
 
@@ -335,10 +318,8 @@ Kucoin_exchange = BingxBittrexCoinbaseKucoinOkxCexio(
     url="https://api.kucoin.com/api/v1/market/orderbook/level2_20",
     params={
         "symbol": "",
-        "limit": 1
+        "limit": 20
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -347,10 +328,8 @@ Mexc_exchange = CexExchanges(
     url="https://api.mexc.com/api/v3/depth",
     params={
         "symbol": "",
-        "limit": 5
+        "limit": 20
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -359,10 +338,8 @@ Okx_exchange = BingxBittrexCoinbaseKucoinOkxCexio(
     url="https://www.okx.com/api/v5/market/books",
     params={
         "instId": "",
-        "sz": 5
+        "sz": 20
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -372,8 +349,6 @@ Phemex_exchange = BitfinexKinePhemex(
     params={
         "symbol": ""
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -381,8 +356,6 @@ Poloniex_exchange = CoinwCryptocomPoloniexBackpackGateio(
     name="poloniex",
     url="https://api.poloniex.com/markets/symbol/orderBook",
     params="",
-    src_token="",
-    dest_token="",
 )
 
 
@@ -390,10 +363,8 @@ Youbit_exchange = BitgetYoubitLbank(
     name="youbit",
     url="https://yobit.net/api/3/depth/symbol",
     params={
-        "limit": 5
+        "limit": 20
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -401,8 +372,6 @@ Zigzag_exchange = Zigzag(
     name="zigzag",
     url="https://zigzag-exchange.herokuapp.com/api/coinmarketcap/v1/orderbook/symbol/1",
     params="",
-    src_token="",
-    dest_token="",
 )
 
 
@@ -414,8 +383,6 @@ Coinex_exchange = CexExchanges(
         "limit": 50,
         "interval": 0
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -425,8 +392,6 @@ Backpack_exchange = CoinwCryptocomPoloniexBackpackGateio(
     params={
         "symbol": ""
     },
-    src_token="",
-    dest_token="",
 )
 
 
@@ -436,8 +401,6 @@ Cexio_exchange = BingxBittrexCoinbaseKucoinOkxCexio(
     params={
         "pair": "",
     },
-    src_token="",
-    dest_token="",
 )
 
 Lbank_exchange = BitgetYoubitLbank(
@@ -447,6 +410,4 @@ Lbank_exchange = BitgetYoubitLbank(
         "symbol": "",
         "size": 50
     },
-    src_token="",
-    dest_token="",
 )
\ No newline at end of file
@@ -0,0 +1,350 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+import aiohttp
+import ujson as json
+
+from cexs.book_tickers import normalize_symbol
+
+logging.basicConfig(level=logging.INFO)
+
+_ROOT_DIR = Path(__file__).parent.parent.absolute()
+MARKETS_PATH = os.path.join(_ROOT_DIR, "results/cex_markets.json")
+
+
+class MarketListSource:
+    '''Binance, Mexc: exchangeInfo with every spot symbol'''
+
+    def __init__(self,
+                 name: str,
+                 url: str,
+                 params: dict | None = None):
+        self.name = name
+        self.url = url
+        self.params = params or {}
+
+    def symbols(self, data):
+        for market in data["symbols"]:
+            if market.get("status", "TRADING") in ["TRADING", "ENABLED", "1"]:
+                yield market["symbol"]
+
+
+class BybitMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data["result"]["list"]:
+            if market["status"] == "Trading":
+                yield market["symbol"]
+
+
+class OkxMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data["data"]:
+            if market["state"] == "live":
+                yield market["instId"]
+
+
+class GateioMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data:
+            if market["trade_status"] == "tradable":
+                yield market["id"]
+
+
+class KucoinMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data["data"]:
+            if market["enableTrading"]:
+                yield market["symbol"]
+
+
+class BitgetMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data["data"]:
+            if market["status"] == "online":
+                yield market["symbol"]
+
+
+class HuobiMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data["data"]:
+            if market["state"] == "online":
+                yield market["symbol"]
+
+
+class PoloniexMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data:
+            if market["state"] == "NORMAL":
+                yield market["symbol"]
+
+
+class KrakenMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data["result"].values():
+            yield market["altname"]
+
+
+class CoinbaseMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data:
+            if market["status"] == "online":
+                yield market["id"]
+
+
+class CryptocomMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data["result"]["instruments"]:
+            yield market["instrument_name"]
+
+
+class BitfinexGeminiMarketList(MarketListSource):
+    def symbols(self, data):
+        yield from data
+
+
+class BingxMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data["data"]["symbols"]:
+            if market["status"] == 1:
+                yield market["symbol"]
+
+
+class CoinexMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data["data"]:
+            yield market["market"]
+
+
+class BackpackMarketList(MarketListSource):
+    def symbols(self, data):
+        for market in data:
+            yield market["symbol"]
+
+
+Binance_market_list = MarketListSource(
+    name="binance",
+    url="https://api.binance.com/api/v3/exchangeInfo",
+    params={
+        "permissions": "SPOT"
+    },
+)
+
+
+Bybit_market_list = BybitMarketList(
+    name="bybit",
+    url="https://api.bybit.com/v5/market/instruments-info",
+    params={
+        "category": "spot"
+    },
+)
+
+
+Okx_market_list = OkxMarketList(
+    name="okx",
+    url="https://www.okx.com/api/v5/public/instruments",
+    params={
+        "instType": "SPOT"
+    },
+)
+
+
+Gateio_market_list = GateioMarketList(
+    name="gateio",
+    url="https://api.gateio.ws/api/v4/spot/currency_pairs",
+)
+
+
+Kucoin_market_list = KucoinMarketList(
+    name="kucoin",
+    url="https://api.kucoin.com/api/v2/symbols",
+)
+
+
+Mexc_market_list = MarketListSource(
+    name="mexc",
+    url="https://api.mexc.com/api/v3/exchangeInfo",
+)
+
+
+Bitget_market_list = BitgetMarketList(
+    name="bitget",
+    url="https://api.bitget.com/api/v2/spot/public/symbols",
+)
+
+
+Huobi_market_list = HuobiMarketList(
+    name="huobi",
+    url="https://api.huobi.pro/v1/common/symbols",
+)
+
+
+Poloniex_market_list = PoloniexMarketList(
+    name="poloniex",
+    url="https://api.poloniex.com/markets",
+)
+
+
+Kraken_market_list = KrakenMarketList(
+    name="kraken",
+    url="https://api.kraken.com/0/public/AssetPairs",
+)
+
+
+Coinbase_market_list = CoinbaseMarketList(
+    name="coinbase",
+    url="https://api.exchange.coinbase.com/products",
+)
+
+
+Cryptocom_market_list = CryptocomMarketList(
+    name="cryptocom",
+    url="https://api.crypto.com/v2/public/get-instruments",
+)
+
+
+Bitfinex_market_list = BitfinexGeminiMarketList(
+    name="bitfinex",
+    url="https://api.bitfinex.com/v1/symbols",
+)
+
+
+Gemini_market_list = BitfinexGeminiMarketList(
+    name="gemini",
+    url="https://api.gemini.com/v1/symbols",
+)
+
+
+Bingx_market_list = BingxMarketList(
+    name="bingx",
+    url="https://open-api.bingx.com/openApi/spot/v1/common/symbols",
+)
+
+
+Coinex_market_list = CoinexMarketList(
+    name="coinex",
+    url="https://api.coinex.com/v2/spot/market",
+)
+
+
+Backpack_market_list = BackpackMarketList(
+    name="backpack",
+    url="https://api.backpack.exchange/api/v1/markets",
+)
+
+
+MARKET_LIST_SOURCES = [
+    Binance_market_list,
+    Bybit_market_list,
+    Okx_market_list,
+    Gateio_market_list,
+    Kucoin_market_list,
+    Mexc_market_list,
+    Bitget_market_list,
+    Huobi_market_list,
+    Poloniex_market_list,
+    Kraken_market_list,
+    Coinbase_market_list,
+    Cryptocom_market_list,
+    Bitfinex_market_list,
+    Gemini_market_list,
+    Bingx_market_list,
+    Coinex_market_list,
+    Backpack_market_list,
+]
+
+
+class MarketUniverse:
+    '''
+    Which (exchange, pair) combinations are listed, so the scan only requests
+    pairs that actually trade. Persisted to MARKETS_PATH for fast restarts and
+    refreshed every refresh_interval seconds.
+    '''
+
+    def __init__(self,
+                 sources: list | None = None,
+                 path: str = MARKETS_PATH,
+                 refresh_interval: float = 6 * 3600,
+                 retry_interval: float = 600):
+        self.sources = sources if sources is not None else MARKET_LIST_SOURCES
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.markets = {}
+        self.updated_at = {}
+        self.attempted_at = {}
+        self.skipped = 0
+        self._lock = asyncio.Lock()
+
+    def load(self) -> bool:
+        try:
+            with open(self.path) as file:
+                saved = json.load(file)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logging.error(f"Error loading market universe from {self.path}: {e}")
+            return False
+        for name, markets in saved.items():
+            self.markets[name] = set(markets["symbols"])
+            self.updated_at[name] = markets["updated_at"]
+        logging.info(f"Market universe loaded for {len(self.markets)} exchanges")
+        return True
+
+    def save(self) -> None:
+        saved = {name: {"updated_at": self.updated_at[name], "symbols": sorted(symbols)}
+                 for name, symbols in self.markets.items()}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as file:
+            json.dump(saved, file)
+
+    async def _fetch(self, source, session):
+        try:
+            response = await session.get(source.url, params=source.params, venue=source.name)
+            if response.status != 200:
+                logging.info(f"Market list of {source.name}: status {response.status}")
+                return None
+            text = await response.text()
+            return {normalize_symbol(symbol) for symbol in source.symbols(json.loads(text))}
+        except asyncio.TimeoutError:
+            logging.error(f"Timeout in market list of {source.name}")
+        except aiohttp.ClientError as e:
+            logging.error(f"Client error in market list of {source.name}: {e}")
+        except Exception as e:
+            logging.error(f"Error parsing market list of {source.name}: {e}")
+        return None
+
+    async def refresh(self, session, sources: list | None = None) -> None:
+        sources = sources if sources is not None else self.sources
+        results = await asyncio.gather(*[self._fetch(source, session) for source in sources])
+        now = time.time()
+        for source, symbols in zip(sources, results):
+            if symbols:
+                self.markets[source.name] = symbols
+                self.updated_at[source.name] = now
+        self.save()
+        logging.info(f"Market universe refreshed: "
+                     f"{ {name: len(symbols) for name, symbols in self.markets.items()} }")
+
+    async def refresh_if_stale(self, session) -> None:
+        async with self._lock:
+            now = time.time()
+            stale = [source for source in self.sources
+                     if now - self.updated_at.get(source.name, 0) > self.refresh_interval
+                     and now - self.attempted_at.get(source.name, 0) > self.retry_interval]
+            if stale:
+                for source in stale:
+                    self.attempted_at[source.name] = now
+                await self.refresh(session, stale)
+
+    def has_pair(self, exchange_name: str, pair: str) -> bool | None:
+        '''None when the exchange market list is unknown and the pair has to be requested'''
+        symbols = self.markets.get(exchange_name)
+        if symbols is None:
+            return None
+        listed = normalize_symbol(pair) in symbols
+        if not listed:
+            self.skipped += 1
+        return listed
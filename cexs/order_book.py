@@ -0,0 +1,158 @@
+import time
+
+import numpy as np
+
+TICKET_SIZE = 100
+
+
+class OrderBookSide:
+    '''
+    One side of a book as parallel NumPy arrays sorted best level first.
+    Prices are stored as sort keys (negated for bids) so both sides are
+    ascending and a level is found with a binary search. Inserting or
+    removing a level shifts the levels behind it, so update() is O(n); for
+    the 20-100 level books the venues send (and even 1000) the shift is a
+    memmove that costs less than the NumPy call overhead, about 4 us an
+    update either way, and the arrays keep fill_price() vectorized.
+    '''
+
+    def __init__(self, is_bid: bool, capacity: int = 64):
+        self.is_bid = is_bid
+        self._keys = np.empty(capacity, dtype=np.float64)
+        self._sizes = np.empty(capacity, dtype=np.float64)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _key(self, price: float) -> float:
+        return -price if self.is_bid else price
+
+    @property
+    def prices(self) -> np.ndarray:
+        keys = self._keys[:self._count]
+        return -keys if self.is_bid else keys
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return self._sizes[:self._count]
+
+    def load(self, levels) -> None:
+        levels = np.asarray(levels, dtype=np.float64).reshape(-1, 2) if len(levels) else np.empty((0, 2))
+        levels = levels[levels[:, 1] > 0]
+        keys = -levels[:, 0] if self.is_bid else levels[:, 0]
+        order = np.argsort(keys, kind="stable")
+        keys, sizes = keys[order], levels[order, 1]
+        if len(keys) > 1:
+            last = np.append(keys[1:] != keys[:-1], True)
+            keys, sizes = keys[last], sizes[last]
+        self._count = len(keys)
+        if self._count > len(self._keys):
+            self._keys = np.empty(self._count * 2, dtype=np.float64)
+            self._sizes = np.empty(self._count * 2, dtype=np.float64)
+        self._keys[:self._count] = keys
+        self._sizes[:self._count] = sizes
+
+    def update(self, price: float, size: float) -> None:
+        '''Sets the size of a level, 0 removes it: O(log n) lookup, O(n) shift on insert/remove'''
+        key = self._key(price)
+        n = self._count
+        i = int(np.searchsorted(self._keys[:n], key))
+        if i < n and self._keys[i] == key:
+            if size == 0:
+                self._keys[i:n - 1] = self._keys[i + 1:n]
+                self._sizes[i:n - 1] = self._sizes[i + 1:n]
+                self._count -= 1
+            else:
+                self._sizes[i] = size
+        elif size != 0:
+            if n == len(self._keys):
+                self._keys = np.concatenate([self._keys, np.empty(n, dtype=np.float64)])
+                self._sizes = np.concatenate([self._sizes, np.empty(n, dtype=np.float64)])
+            self._keys[i + 1:n + 1] = self._keys[i:n]
+            self._sizes[i + 1:n + 1] = self._sizes[i:n]
+            self._keys[i] = key
+            self._sizes[i] = size
+            self._count += 1
+
+    def best(self) -> tuple | None:
+        if not self._count:
+            return None
+        return float(self.prices[0]), float(self._sizes[0])
+
+    def depth_notional(self) -> float:
+        return float(np.dot(self.prices, self.sizes))
+
+    def fill_price(self, notional: float) -> float | None:
+        '''Average price of taking this side for `notional` in quote currency, None if the book is too thin'''
+        if not self._count or notional <= 0:
+            return None
+        prices = self.prices
+        level_notional = prices * self.sizes
+        cumulative = np.cumsum(level_notional)
+        last = int(np.searchsorted(cumulative, notional))
+        if last >= self._count:
+            return None
+        filled_before = cumulative[last - 1] if last else 0.0
+        base_amount = self.sizes[:last].sum() + (notional - filled_before) / prices[last]
+        return float(notional / base_amount)
+
+
+class OrderBook:
+    '''L2 order book of one symbol with a depth-weighted fill price query'''
+
+    def __init__(self, symbol: str = ""):
+        self.symbol = symbol
+        self.bids = OrderBookSide(is_bid=True)
+        self.asks = OrderBookSide(is_bid=False)
+        self.sequence = None
+        self.updated_at = 0.0
+
+    @classmethod
+    def from_levels(cls, bids, asks, symbol: str = "", sequence=None):
+        book = cls(symbol)
+        book.apply_snapshot(bids, asks, sequence)
+        return book
+
+    @staticmethod
+    def _pairs(levels) -> list:
+        return [(level[0], level[1]) for level in levels]
+
+    def apply_snapshot(self, bids, asks, sequence=None) -> None:
+        self.bids.load(self._pairs(bids))
+        self.asks.load(self._pairs(asks))
+        self.sequence = sequence
+        self.updated_at = time.time()
+
+    def apply_update(self, bids, asks, sequence=None) -> None:
+        for level in bids:
+            self.bids.update(float(level[0]), float(level[1]))
+        for level in asks:
+            self.asks.update(float(level[0]), float(level[1]))
+        if sequence is not None:
+            self.sequence = sequence
+        self.updated_at = time.time()
+
+    def best_bid(self) -> tuple | None:
+        return self.bids.best()
+
+    def best_ask(self) -> tuple | None:
+        return self.asks.best()
+
+    def price_data(self, exchange: str, pair: str, ticket_size: float = TICKET_SIZE) -> dict | None:
+        best_bid = self.best_bid()
+        best_ask = self.best_ask()
+        if best_bid is None or best_ask is None:
+            return None
+        return {
+            "exchange": exchange,
+            "pair": pair,
+            "max_bids_price": best_bid[0],
+            "bids_volumes": best_bid[1],
+            "min_asks_price": best_ask[0],
+            "asks_volumes": best_ask[1],
+            "bids_fill_price": self.bids.fill_price(ticket_size),
+            "asks_fill_price": self.asks.fill_price(ticket_size),
+            "bids_depth": self.bids.depth_notional(),
+            "asks_depth": self.asks.depth_notional()
+        }
@@ -0,0 +1,384 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+
+import ujson as json
+import websockets
+
+from cexs.book_tickers import normalize_symbol
+from cexs.order_book import OrderBook, TICKET_SIZE
+
+logging.basicConfig(level=logging.INFO)
+
+
+class OrderBookStream:
+    '''
+    Local L2 books of one exchange kept up to date from its public WebSocket
+    depth feed. Diff feeds (Binance, Gate, Kucoin) are synced against a REST
+    snapshot, feeds that push their own snapshot (Bybit, Okx) are resubscribed
+    when a sequence gap shows up.
+    '''
+
+    def __init__(self,
+                 name: str,
+                 ws_url: str,
+                 rest_url: str = "",
+                 symbols: list | None = None,
+                 max_symbols_per_connection: int = 100,
+                 reconnect_delay: float = 1,
+                 max_buffered_updates: int = 1000):
+        self.name = name
+        self.ws_url = ws_url
+        self.rest_url = rest_url
+        self.symbols = list(symbols or [])
+        self.max_symbols_per_connection = max_symbols_per_connection
+        self.reconnect_delay = reconnect_delay
+        self.max_buffered_updates = max_buffered_updates
+        self.books = {}
+        self.stats = defaultdict(int)
+        self._buffers = {}
+        self._resyncs = {}
+        self._tasks = []
+
+    async def start(self, session) -> None:
+        for i in range(0, len(self.symbols), self.max_symbols_per_connection):
+            symbols = self.symbols[i:i + self.max_symbols_per_connection]
+            self._tasks.append(asyncio.create_task(self._run(symbols, session)))
+        logging.info(f"{self.name} depth stream started for {len(self.symbols)} symbols")
+
+    async def stop(self) -> None:
+        tasks = self._tasks + list(self._resyncs.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._resyncs = {}
+        self.books = {}
+        self.symbols = []
+
+    async def connect_url(self, session) -> str:
+        return self.ws_url
+
+    async def subscribe(self, ws, symbols) -> None:
+        raise NotImplementedError
+
+    async def keepalive(self, ws) -> None:
+        pass
+
+    async def on_message(self, ws, message, session) -> None:
+        raise NotImplementedError
+
+    async def _run(self, symbols, session) -> None:
+        while True:
+            try:
+                # MOCK_VENUES_URL points the stream at mock_venues/server.py like the REST calls
+                url = session.route(await self.connect_url(session))
+                async with websockets.connect(url, max_size=None, ping_interval=20) as ws:
+                    await self.subscribe(ws, symbols)
+                    keepalive = asyncio.create_task(self.keepalive(ws))
+                    try:
+                        async for raw in ws:
+                            if raw == "pong":
+                                continue
+                            self.stats["messages"] += 1
+                            await self.on_message(ws, json.loads(raw), session)
+                    finally:
+                        keepalive.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"{self.name} depth stream error: {e}")
+            for symbol in symbols:
+                self._invalidate(normalize_symbol(symbol))
+            self.stats["reconnects"] += 1
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _invalidate(self, key: str) -> None:
+        self.books.pop(key, None)
+        self._buffers.pop(key, None)
+
+    # Diff feeds: buffer updates until a REST snapshot arrives, then replay them in order.
+
+    async def fetch_snapshot(self, symbol, session) -> tuple | None:
+        raise NotImplementedError
+
+    def on_diff(self, symbol, first, last, bids, asks, session) -> None:
+        key = normalize_symbol(symbol)
+        book = self.books.get(key)
+        if book is None:
+            buffer = self._buffers.setdefault(key, [])
+            buffer.append((first, last, bids, asks))
+            if len(buffer) > self.max_buffered_updates:
+                del buffer[0]
+            if key not in self._resyncs:
+                self._resyncs[key] = asyncio.create_task(self._resync(symbol, session))
+            return
+        if last <= book.sequence:
+            return
+        if first > book.sequence + 1:
+            self.stats["gaps"] += 1
+            logging.info(f"{self.name} {symbol}: sequence gap {book.sequence} -> {first}, resync")
+            self._invalidate(key)
+            self.on_diff(symbol, first, last, bids, asks, session)
+            return
+        book.apply_update(bids, asks, last)
+
+    async def _resync(self, symbol, session, attempts: int = 3) -> None:
+        key = normalize_symbol(symbol)
+        try:
+            for attempt in range(attempts):
+                snapshot = await self.fetch_snapshot(symbol, session)
+                if snapshot is None:
+                    await asyncio.sleep(self.reconnect_delay)
+                    continue
+                sequence, bids, asks = snapshot
+                book = OrderBook(key)
+                book.apply_snapshot(bids, asks, sequence)
+                synced = True
+                for first, last, buffered_bids, buffered_asks in self._buffers.get(key, []):
+                    if last <= book.sequence:
+                        continue
+                    if first > book.sequence + 1:
+                        synced = False
+                        break
+                    book.apply_update(buffered_bids, buffered_asks, last)
+                if synced:
+                    self._buffers.pop(key, None)
+                    self.books[key] = book
+                    self.stats["resyncs"] += 1
+                    return
+                self.stats["gaps"] += 1
+                await asyncio.sleep(self.reconnect_delay / 2)
+            logging.info(f"{self.name} {symbol}: could not sync order book")
+        except Exception as e:
+            logging.error(f"{self.name} {symbol}: snapshot resync failed: {e}")
+        finally:
+            self._resyncs.pop(key, None)
+
+    # Snapshot feeds: the exchange pushes a snapshot after subscribe, resubscribe on a gap.
+
+    async def resubscribe(self, ws, symbol) -> None:
+        raise NotImplementedError
+
+    async def on_push(self, ws, symbol, is_snapshot, prev_sequence, sequence, bids, asks) -> None:
+        key = normalize_symbol(symbol)
+        if is_snapshot:
+            book = OrderBook(key)
+            book.apply_snapshot(bids, asks, sequence)
+            self.books[key] = book
+            self.stats["resyncs"] += 1
+            return
+        book = self.books.get(key)
+        if book is None:
+            return
+        if prev_sequence != book.sequence:
+            self.stats["gaps"] += 1
+            logging.info(f"{self.name} {symbol}: sequence gap {book.sequence} -> {prev_sequence}, resubscribe")
+            self._invalidate(key)
+            await self.resubscribe(ws, symbol)
+            return
+        book.apply_update(bids, asks, sequence)
+
+    def get_price(self, pair: str, ticket_size: float = TICKET_SIZE) -> dict | None:
+        book = self.books.get(normalize_symbol(pair))
+        if book is None:
+            return None
+        return book.price_data(self.name, pair, ticket_size)
+
+
+class BinanceOrderBookStream(OrderBookStream):
+    async def subscribe(self, ws, symbols) -> None:
+        params = [f"{symbol.lower()}@depth@100ms" for symbol in symbols]
+        await ws.send(json.dumps({"method": "SUBSCRIBE", "params": params, "id": 1}))
+
+    async def on_message(self, ws, message, session) -> None:
+        if message.get("e") == "depthUpdate":
+            self.on_diff(message["s"], message["U"], message["u"], message["b"], message["a"], session)
+
+    async def fetch_snapshot(self, symbol, session) -> tuple | None:
+        response = await session.get(self.rest_url, params={"symbol": symbol, "limit": 100}, venue=self.name)
+        if response.status != 200:
+            logging.info(f"{self.name} {symbol}: snapshot status {response.status}")
+            return None
+        data = await response.json(content_type=None)
+        return data["lastUpdateId"], data["bids"], data["asks"]
+
+
+class GateioOrderBookStream(OrderBookStream):
+    async def subscribe(self, ws, symbols) -> None:
+        for symbol in symbols:
+            await ws.send(json.dumps({"time": int(time.time()),
+                                      "channel": "spot.order_book_update",
+                                      "event": "subscribe",
+                                      "payload": [symbol, "100ms"]}))
+
+    async def on_message(self, ws, message, session) -> None:
+        if message.get("channel") == "spot.order_book_update" and message.get("event") == "update":
+            result = message["result"]
+            self.on_diff(result["s"], result["U"], result["u"], result.get("b", []), result.get("a", []), session)
+
+    async def fetch_snapshot(self, symbol, session) -> tuple | None:
+        response = await session.get(self.rest_url, params={"currency_pair": symbol, "limit": 100, "with_id": "true"},
+                                     venue=self.name)
+        if response.status != 200:
+            logging.info(f"{self.name} {symbol}: snapshot status {response.status}")
+            return None
+        data = await response.json(content_type=None)
+        return data["id"], data["bids"], data["asks"]
+
+
+class KucoinOrderBookStream(OrderBookStream):
+    def __init__(self, *args, token_url: str = "", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.token_url = token_url
+        self.ping_interval = 18
+
+    async def connect_url(self, session) -> str:
+        response = await session.post(self.token_url, venue=self.name)
+        data = (await response.json(content_type=None))["data"]
+        server = data["instanceServers"][0]
+        self.ping_interval = server.get("pingInterval", 18000) / 1000
+        return f"{server['endpoint']}?token={data['token']}&connectId={uuid.uuid4().hex}"
+
+    async def subscribe(self, ws, symbols) -> None:
+        await ws.send(json.dumps({"id": uuid.uuid4().hex,
+                                  "type": "subscribe",
+                                  "topic": f"/market/level2:{','.join(symbols)}",
+                                  "response": True}))
+
+    async def keepalive(self, ws) -> None:
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send(json.dumps({"id": uuid.uuid4().hex, "type": "ping"}))
+
+    async def on_message(self, ws, message, session) -> None:
+        if message.get("type") == "message" and message.get("subject") == "trade.l2update":
+            data = message["data"]
+            self.on_diff(data["symbol"], int(data["sequenceStart"]), int(data["sequenceEnd"]),
+                         data["changes"]["bids"], data["changes"]["asks"], session)
+
+    async def fetch_snapshot(self, symbol, session) -> tuple | None:
+        response = await session.get(self.rest_url, params={"symbol": symbol}, venue=self.name)
+        if response.status != 200:
+            logging.info(f"{self.name} {symbol}: snapshot status {response.status}")
+            return None
+        data = (await response.json(content_type=None))["data"]
+        return int(data["sequence"]), data["bids"], data["asks"]
+
+
+class BybitOrderBookStream(OrderBookStream):
+    async def subscribe(self, ws, symbols) -> None:
+        for i in range(0, len(symbols), 10):
+            args = [f"orderbook.50.{symbol}" for symbol in symbols[i:i + 10]]
+            await ws.send(json.dumps({"op": "subscribe", "args": args}))
+
+    async def resubscribe(self, ws, symbol) -> None:
+        await ws.send(json.dumps({"op": "unsubscribe", "args": [f"orderbook.50.{symbol}"]}))
+        await ws.send(json.dumps({"op": "subscribe", "args": [f"orderbook.50.{symbol}"]}))
+
+    async def keepalive(self, ws) -> None:
+        while True:
+            await asyncio.sleep(20)
+            await ws.send(json.dumps({"op": "ping"}))
+
+    async def on_message(self, ws, message, session) -> None:
+        if message.get("topic", "").startswith("orderbook."):
+            data = message["data"]
+            await self.on_push(ws, data["s"], message["type"] == "snapshot", data["u"] - 1, data["u"],
+                               data["b"], data["a"])
+
+
+class OkxOrderBookStream(OrderBookStream):
+    async def subscribe(self, ws, symbols) -> None:
+        for i in range(0, len(symbols), 50):
+            args = [{"channel": "books", "instId": symbol} for symbol in symbols[i:i + 50]]
+            await ws.send(json.dumps({"op": "subscribe", "args": args}))
+
+    async def resubscribe(self, ws, symbol) -> None:
+        args = [{"channel": "books", "instId": symbol}]
+        await ws.send(json.dumps({"op": "unsubscribe", "args": args}))
+        await ws.send(json.dumps({"op": "subscribe", "args": args}))
+
+    async def keepalive(self, ws) -> None:
+        while True:
+            await asyncio.sleep(25)
+            await ws.send("ping")
+
+    async def on_message(self, ws, message, session) -> None:
+        if message.get("arg", {}).get("channel") == "books" and "data" in message:
+            symbol = message["arg"]["instId"]
+            for data in message["data"]:
+                await self.on_push(ws, symbol, message.get("action") == "snapshot",
+                                   data.get("prevSeqId"), data.get("seqId"), data["bids"], data["asks"])
+
+
+Binance_order_book_stream = BinanceOrderBookStream(
+    name="binance",
+    ws_url="wss://stream.binance.com:9443/ws",
+    rest_url="https://api.binance.com/api/v3/depth",
+    max_symbols_per_connection=200,
+)
+
+
+Bybit_order_book_stream = BybitOrderBookStream(
+    name="bybit",
+    ws_url="wss://stream.bybit.com/v5/public/spot",
+)
+
+
+Okx_order_book_stream = OkxOrderBookStream(
+    name="okx",
+    ws_url="wss://ws.okx.com:8443/ws/v5/public",
+)
+
+
+Gateio_order_book_stream = GateioOrderBookStream(
+    name="gateio",
+    ws_url="wss://api.gateio.ws/ws/v4/",
+    rest_url="https://api.gateio.ws/api/v4/spot/order_book",
+)
+
+
+Kucoin_order_book_stream = KucoinOrderBookStream(
+    name="kucoin",
+    ws_url="",
+    rest_url="https://api.kucoin.com/api/v1/market/orderbook/level2_100",
+    token_url="https://api.kucoin.com/api/v1/bullet-public",
+)
+
+
+ORDER_BOOK_STREAMS = [
+    Binance_order_book_stream,
+    Bybit_order_book_stream,
+    Okx_order_book_stream,
+    Gateio_order_book_stream,
+    Kucoin_order_book_stream,
+]
+
+
+class OrderBookStreams:
+    '''Streaming mode for cex_prices: local books read without a network round trip'''
+
+    def __init__(self, streams: list | None = None):
+        self.streams = {stream.name: stream for stream in (streams if streams is not None else ORDER_BOOK_STREAMS)}
+
+    async def start(self, session, symbols: dict) -> None:
+        for name, stream in self.streams.items():
+            stream.symbols = symbols.get(name, [])
+            if stream.symbols:
+                await stream.start(session)
+
+    async def stop(self) -> None:
+        await asyncio.gather(*[stream.stop() for stream in self.streams.values()])
+
+    def covers(self, exchange_name: str) -> bool:
+        return exchange_name in self.streams and bool(self.streams[exchange_name].symbols)
+
+    def get_price(self, exchange_name: str, pair: str) -> dict | None:
+        return self.streams[exchange_name].get_price(pair)
+
+    def report(self) -> str:
+        return "\n".join(f"{name}: books {len(stream.books)}/{len(stream.symbols)}, {dict(stream.stats)}"
+                         for name, stream in self.streams.items() if stream.symbols)
@@ -1,7 +1,10 @@
 import asyncio
 import logging
 
+import aiohttp
+
 from dexs.async_get_dex_price import DexPrice
+from telemetry.venue_metrics import venue_metrics
 
 
 class DexscreenerAggregatorApi(DexPrice):
@@ -9,22 +12,29 @@ class DexscreenerAggregatorApi(DexPrice):
         logging.info(f"\nSTART {self.name}\n")
         url = f"https://api.dexscreener.com/latest/dex/tokens/{self.src_token},{self.dest_token}"
         try:
-            response = await session.get(url)
+            response = await session.get(url,
+                                         venue=self.name, endpoint="tokens", network=self.network.name)
             logging.info(
                 f"\nENTER Print from {self.name}\nreponse.status - {response.status}\n")
             if response.status == 200:
                 dexcreener_info = await response.json()
                 logging.info(f"\n{self.name} - {dexcreener_info}")
-                dexcreener_info = dexcreener_info["pairs"]
-                highest_price_pair = None
-                highest_price = float('-inf')
-                for pair in dexcreener_info:
-                    if float(pair["priceUsd"]) > float(highest_price) and pair["baseToken"][
-                        "address"] == self.src_token and pair["quoteToken"]["address"] == self.dest_token:
-                        highest_price = float(pair["priceUsd"])
-                        highest_price_pair = pair
-                money_volumes_1h = highest_price * \
-                                   float(highest_price_pair['volume']['h1'])
+                try:
+                    dexcreener_info = dexcreener_info["pairs"]
+                    highest_price_pair = None
+                    highest_price = float('-inf')
+                    for pair in dexcreener_info:
+                        if float(pair["priceUsd"]) > float(highest_price) and pair["baseToken"][
+                            "address"] == self.src_token and pair["quoteToken"]["address"] == self.dest_token:
+                            highest_price = float(pair["priceUsd"])
+                            highest_price_pair = pair
+                    money_volumes_1h = highest_price * \
+                                       float(highest_price_pair['volume']['h1']) if highest_price_pair else 0
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    venue_metrics.parse_failure(self.name, "tokens", self.network.name)
+                    logging.error(
+                        f"Error in DexscreenerAggregatorApi - get_price, in parsing of data: {e}")
+                    return None
                 print(money_volumes_1h)
                 if highest_price_pair and money_volumes_1h > 500:
                     data = {"aggregator": self.name,
@@ -46,6 +56,9 @@ class DexscreenerAggregatorApi(DexPrice):
             logging.error(
                 f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
             return None
+        except aiohttp.ClientError as e:
+            logging.error(
+                f"Error in DexscreenerAggregatorApi - get_price, request failed: {e!r}")
         except Exception as e:
             logging.error(
                 f"Error in DexscreenerAggregatorApi - get_price, in request of data: {e}")
@@ -1,9 +1,11 @@
 import asyncio
 import logging
 
+import aiohttp
 from web3 import Web3
 
 from dexs.async_get_dex_price import DexPrice
+from telemetry.venue_metrics import venue_metrics
 
 
 class KyberswapAggregatorApi(DexPrice):
@@ -38,31 +40,38 @@ class KyberswapAggregatorApi(DexPrice):
                 decimals_dest_token = await self._get_decimals(self.dest_token, session)
 
                 url = f"https://aggregator-api.kyberswap.com/{network.lower()}/route/encode?tokenIn={self.src_token}&tokenOut={self.dest_token}&amountIn={self.amount * 10 ** decimals_src_token}&to=0x0000000000000000000000000000000000000000&saveGas=0&gasInclude=1&slippageTolerance=50"
-                response = await session.get(url)
+                response = await session.get(url,
+                                             venue=self.name, endpoint="route/encode", network=self.network.name)
                 logging.info(
                     f"\nENTER Print from {self.name}\nreponse.status - {response.status}\n")
                 if response.status == 200:
                     kyberswap_info = await response.json()
                     logging.info(f"\n{self.name} - {kyberswap_info}")
-                    kyberswap_data_list = []
-                    for swaps in kyberswap_info["swaps"]:
-                        for swap in swaps:
-                            if Web3.to_checksum_address(swap["tokenIn"]) == Web3.to_checksum_address(
-                                    self.src_token) and Web3.to_checksum_address(
-                                    swap["tokenOut"]) == Web3.to_checksum_address(self.dest_token):
-                                kyberswap_data_list.append({"aggregator": self.name,
-                                                            "network": self.network.name,
-                                                            "src_address": self.src_token,
-                                                            "dest_address": self.dest_token,
-                                                            "dex": swap["exchange"],
-                                                            "price": (float(
-                                                                swap["amountOut"]) / 10 ** decimals_dest_token) / (
-                                                                                 float(swap[
-                                                                                           "swapAmount"]) / 10 ** decimals_src_token) / self.amount,
-                                                            "data": {
-                                                                "fees": swap["poolExtra"],
-                                                                "gas": kyberswap_info["gasUsd"]}
-                                                            })
+                    try:
+                        kyberswap_data_list = []
+                        for swaps in kyberswap_info["swaps"]:
+                            for swap in swaps:
+                                if Web3.to_checksum_address(swap["tokenIn"]) == Web3.to_checksum_address(
+                                        self.src_token) and Web3.to_checksum_address(
+                                        swap["tokenOut"]) == Web3.to_checksum_address(self.dest_token):
+                                    kyberswap_data_list.append({"aggregator": self.name,
+                                                                "network": self.network.name,
+                                                                "src_address": self.src_token,
+                                                                "dest_address": self.dest_token,
+                                                                "dex": swap["exchange"],
+                                                                "price": (float(
+                                                                    swap["amountOut"]) / 10 ** decimals_dest_token) / (
+                                                                                     float(swap[
+                                                                                               "swapAmount"]) / 10 ** decimals_src_token) / self.amount,
+                                                                "data": {
+                                                                    "fees": swap["poolExtra"],
+                                                                    "gas": kyberswap_info["gasUsd"]}
+                                                                })
+                    except (KeyError, IndexError, TypeError, ValueError) as e:
+                        venue_metrics.parse_failure(self.name, "route/encode", self.network.name)
+                        logging.error(
+                            f"Error in KyberswapAggregatorApi - get_price, in parsing of data: {e}")
+                        return None
                     highest_price_dex = {}
                     highest_price = float("-inf")
                     for dex in kyberswap_data_list:
@@ -75,12 +84,15 @@ class KyberswapAggregatorApi(DexPrice):
                 else:
                     logging.info(
                         f"Response status code in KyberswapAggregatorApi not 200: {response.text}")
-            except Exception as e:
-                logging.error(
-                    f"Error in KyberswapAggregatorApi - get_price, in request of data: {e}")
             except asyncio.TimeoutError:
                 logging.error(
                     f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
+            except aiohttp.ClientError as e:
+                logging.error(
+                    f"Error in KyberswapAggregatorApi - get_price, request failed: {e!r}")
+            except Exception as e:
+                logging.error(
+                    f"Error in KyberswapAggregatorApi - get_price, in request of data: {e}")
             return None
         else:
             logging.info(
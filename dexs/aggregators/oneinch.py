@@ -2,7 +2,10 @@ import asyncio
 import logging
 import os
 
+import aiohttp
+
 from dexs.async_get_dex_price import DexPrice
+from telemetry.venue_metrics import venue_metrics
 
 
 class OneInchAggregatorApi(DexPrice):
@@ -20,19 +23,26 @@ class OneInchAggregatorApi(DexPrice):
                 "dst": self.dest_token,
                 "amount": self.amount * 10 ** decimals_src_token
             }
-            response = await session.get(url, headers=headers, params=params)
+            response = await session.get(url, headers=headers, params=params,
+                                         venue=self.name, endpoint="quote", network=self.network.name)
             logging.info(
                 f"\nENTER Print from {self.name}\nreponse.status - {response.status}\n")
             if response.status == 200:
                 one_inch_data = await response.json()
                 logging.info(f"\n{self.name} - {one_inch_data}")
-                data = {"aggregator": self.name,
-                        "network": self.network.name,
-                        "src_address": self.src_token,
-                        "dest_address": self.dest_token,
-                        "dex": self.name,
-                        "price": int(one_inch_data["toAmount"]) / 10 ** decimals_dest_token / self.amount
-                        }
+                try:
+                    data = {"aggregator": self.name,
+                            "network": self.network.name,
+                            "src_address": self.src_token,
+                            "dest_address": self.dest_token,
+                            "dex": self.name,
+                            "price": int(one_inch_data["toAmount"]) / 10 ** decimals_dest_token / self.amount
+                            }
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    venue_metrics.parse_failure(self.name, "quote", self.network.name)
+                    logging.error(
+                        f"Error in OneInchAggregatorApi - get_price, in parsing of data: {e}")
+                    return None
                 logging.info(f"RETURN DATA - {self.name} - {data}")
                 return data
             else:
@@ -42,6 +52,9 @@ class OneInchAggregatorApi(DexPrice):
             logging.error(
                 f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
             return None
+        except aiohttp.ClientError as e:
+            logging.error(
+                f"Error in OneInchAggregatorApi - get_price, request failed: {e!r}")
         except Exception as e:
             logging.error(
                 f"Error in OneInchAggregatorApi - get_price, in request of data: {e}")
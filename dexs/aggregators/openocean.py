@@ -1,7 +1,10 @@
 import asyncio
 import logging
 
+import aiohttp
+
 from dexs.async_get_dex_price import DexPrice
+from telemetry.venue_metrics import venue_metrics
 
 
 class OpenoceanAggregatorApi(DexPrice):
@@ -16,15 +19,22 @@ class OpenoceanAggregatorApi(DexPrice):
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
         }
         try:
-            response = await session.get(url_gas, headers=headers)
+            response = await session.get(url_gas, headers=headers,
+                                         venue=self.name, endpoint="gasPrice", network=self.network.name)
             if response.status == 200:
                 gas = await response.json()
-                if self.network.chain_id == 1:
-                    gas = round(
-                        float(gas["without_decimals"]["base"]), 1)
-                else:
-                    gas = round(
-                        float(gas["without_decimals"]["standard"]), 1)
+                try:
+                    if self.network.chain_id == 1:
+                        gas = round(
+                            float(gas["without_decimals"]["base"]), 1)
+                    else:
+                        gas = round(
+                            float(gas["without_decimals"]["standard"]), 1)
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    venue_metrics.parse_failure(self.name, "gasPrice", self.network.name)
+                    logging.error(
+                        f"Error in OpenoceanAggregatorApi - get_price, in parsing of gas value: {e}")
+                    gas = 35
             else:
                 logging.info(
                     f"Response status code in OpenoceanAggregatorApi get_gas not 200: {response.text}")
@@ -33,6 +43,10 @@ class OpenoceanAggregatorApi(DexPrice):
             logging.error(
                 f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
             return None
+        except aiohttp.ClientError as e:
+            logging.error(
+                f"Error in OpenoceanAggregatorApi - get_price, request of gas value failed: {e!r}")
+            gas = 35
         except Exception as e:
             logging.error(
                 f"Error in OpenoceanAggregatorApi - get_price, in request of gas value: {e}")
@@ -42,26 +56,33 @@ class OpenoceanAggregatorApi(DexPrice):
         else:
             url = f"https://open-api.openocean.finance/v3/{self.network.chain_id}/quote?inTokenAddress={self.src_token}&outTokenAddress={self.dest_token}&amount={self.amount}&slippage=1&gasPrice=35"
         try:
-            response = await session.get(url, headers=headers)
+            response = await session.get(url, headers=headers,
+                                         venue=self.name, endpoint="quote", network=self.network.name)
             logging.info(
                 f"\nENTER Print from {self.name}\nreponse.status - {response.status}\n")
             if response.status == 200:
                 open_ocean_data = await response.json()
                 logging.info(f"\n{self.name} - {open_ocean_data}")
-                out_amount = open_ocean_data["data"]["outAmount"]
-                decimals = open_ocean_data["data"]["outToken"]["decimals"]
-                price = float(out_amount) / self.amount / 10 ** decimals
-                data = {"aggregator": self.name,
-                        "network": self.network.name,
-                        "src_address": self.src_token,
-                        "dest_address": self.dest_token,
-                        "dex": self.name,
-                        "price": price,
-                        "data": {
-                            "estimated gas": open_ocean_data['data']['estimatedGas'],
-                            "gas": gas
-                        }
-                        }
+                try:
+                    out_amount = open_ocean_data["data"]["outAmount"]
+                    decimals = open_ocean_data["data"]["outToken"]["decimals"]
+                    price = float(out_amount) / self.amount / 10 ** decimals
+                    data = {"aggregator": self.name,
+                            "network": self.network.name,
+                            "src_address": self.src_token,
+                            "dest_address": self.dest_token,
+                            "dex": self.name,
+                            "price": price,
+                            "data": {
+                                "estimated gas": open_ocean_data['data']['estimatedGas'],
+                                "gas": gas
+                            }
+                            }
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    venue_metrics.parse_failure(self.name, "quote", self.network.name)
+                    logging.error(
+                        f"Error in OpenoceanAggregatorApi - get_price, in parsing of data: {e}")
+                    return None
                 logging.info(f"RETURN DATA - {self.name} - {data}")
                 return data
             else:
@@ -71,6 +92,9 @@ class OpenoceanAggregatorApi(DexPrice):
             logging.error(
                 f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
             return None
+        except aiohttp.ClientError as e:
+            logging.error(
+                f"Error in OpenoceanAggregatorApi - get_price, request failed: {e!r}")
         except Exception as e:
             logging.error(
                 f"Error in OpenoceanAggregatorApi - get_price, in request of data: {e}")
@@ -1,7 +1,10 @@
 import asyncio
 import logging
 
+import aiohttp
+
 from dexs.async_get_dex_price import DexPrice
+from telemetry.venue_metrics import venue_metrics
 
 
 class ParaswapAggregatorApi(DexPrice):
@@ -13,35 +16,45 @@ class ParaswapAggregatorApi(DexPrice):
                 decimals_src_token = await self._get_decimals(self.src_token, session)
                 decimals_dest_token = await self._get_decimals(self.dest_token, session)
                 url = f"https://api.paraswap.io/prices/?srcToken={self.src_token}&destToken={self.dest_token}&amount={self.amount * 10 ** decimals_src_token}&srcDecimals={decimals_src_token}&destDecimals={decimals_dest_token}&side=SELL&network={self.network.chain_id}"
-                response = await session.get(url)
+                response = await session.get(url,
+                                             venue=self.name, endpoint="prices", network=self.network.name)
                 logging.info(
                     f"\nENTER Print from {self.name}\nreponse.status - {response.status}\n")
                 if response.status == 200:
                     paraswap_info = await response.json()
                     logging.info(f"\n{self.name} - {paraswap_info}")
-                    paraswap_info = paraswap_info["priceRoute"]
-                    data = {"aggregator": self.name,
-                            "network": self.network.name,
-                            "src_address": self.src_token,
-                            "dest_address": self.dest_token,
-                            "dex": paraswap_info["bestRoute"][0]["swaps"][0]["swapExchanges"][0]["exchange"],
-                            "price": float(paraswap_info["destAmount"]) / 10 ** float(
-                                paraswap_info["destDecimals"]) / self.amount,
-                            "data": {
-                                "fees": paraswap_info["gasCostUSD"]
-                            }
-                            }
+                    try:
+                        paraswap_info = paraswap_info["priceRoute"]
+                        data = {"aggregator": self.name,
+                                "network": self.network.name,
+                                "src_address": self.src_token,
+                                "dest_address": self.dest_token,
+                                "dex": paraswap_info["bestRoute"][0]["swaps"][0]["swapExchanges"][0]["exchange"],
+                                "price": float(paraswap_info["destAmount"]) / 10 ** float(
+                                    paraswap_info["destDecimals"]) / self.amount,
+                                "data": {
+                                    "fees": paraswap_info["gasCostUSD"]
+                                }
+                                }
+                    except (KeyError, IndexError, TypeError, ValueError) as e:
+                        venue_metrics.parse_failure(self.name, "prices", self.network.name)
+                        logging.error(
+                            f"Error in ParaswapAggregatorApi - get_price, in parsing of data: {e}")
+                        return None
                     logging.info(f"RETURN DATA - {self.name} - {data}")
                     return data
                 else:
                     logging.info(
                         f"Response status code in ParaswapAggregatorApi get_price not 200: {response.text}")
-            except Exception as e:
-                logging.error(
-                    f"Error in ParaswapAggregatorApi - get_price, in request of data: {e}")
             except asyncio.TimeoutError:
                 logging.error(
                     f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
+            except aiohttp.ClientError as e:
+                logging.error(
+                    f"Error in ParaswapAggregatorApi - get_price, request failed: {e!r}")
+            except Exception as e:
+                logging.error(
+                    f"Error in ParaswapAggregatorApi - get_price, in request of data: {e}")
             return None
         else:
             logging.info(
@@ -4,12 +4,17 @@ import os
 import sys
 from pathlib import Path
 
-import requests
 import ujson as json
 import web3
 from dotenv import load_dotenv
 from web3 import Web3
 
+from dexs.dex_registry import dex_registry
+from dexs.multicall import multicall
+from dexs.web3_providers import web3_providers
+from storage.token_store import token_store
+from transport.session_manager import session_manager
+
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 
@@ -21,13 +26,12 @@ class DexPrice:
         _ROOT_DIR = Path(__file__).parent.parent.absolute()
 
     _BOT_DIR = os.path.join(_ROOT_DIR, "dexs")
-    _DEX_CONTRACTS_PATH = os.path.join(_BOT_DIR, "abi/dex_contracts.json")
     _TOKEN_INFO_PATH = os.path.join(_BOT_DIR, "abi/tokens_info.json")
     _DEFAULT_FACTORY_PATH = os.path.join(_BOT_DIR, "abi/default_factory_abi.json")
-    _DEFAULT_V2_POOL_PATH = os.path.join(_BOT_DIR, "abi/default_v2_pool_abi.json")
-    _DEFAULT_V3_POOL_PATH = os.path.join(_BOT_DIR, "abi/default_v3_pool_abi.json")
-    _dex_contracts = json.load(open(_DEX_CONTRACTS_PATH))
+    # default_token_abi; the tokens themselves are in storage.token_store
     _tokens_info = json.load(open(_TOKEN_INFO_PATH))
+    # (network, address): decimals lookup in flight
+    _decimals_lookups = {}
 
     def __init__(self, src_token: str, dest_token: str, name: str, network, slippage: int | None = 500,
                  amount: int | None = 1):
@@ -43,76 +47,84 @@ class DexPrice:
             self.dest_token = Web3.to_checksum_address(self.dest_token)
 
     def _connect_web3(self):
-        try:
-            w3 = Web3(Web3.HTTPProvider(self.network.rpc))
-            return w3
-        except Exception as e:
-            logging.error(f"Error connecting to web3: {e}")
+        return web3_providers.get(self.network)
+
+    async def _call(self, function):
+        '''A view call, batched with the others of this tick in one Multicall3 eth_call'''
+        return await multicall.call(self.network, function)
+
+    def _contract(self, address: str, abi):
+        return dex_registry.contract(self._connect_web3(), self.network.name, address, abi)
 
     def _get_contract_address_and_abi(self, contract_type: str):
-        if contract_type in DexPrice._dex_contracts[self.network.name][self.name]:
-            contract_data = DexPrice._dex_contracts[self.network.name][self.name][contract_type]
-            return Web3.to_checksum_address(contract_data["address"]), contract_data["abi"]
-        else:
+        address, abi = dex_registry.contract_data(self.network.name, self.name, contract_type)
+        if address is None:
             return None, None
+        return Web3.to_checksum_address(address), abi
 
-    def _get_factory_address(self, router):
+    async def _get_factory_address(self, router):
         try:
             if self.name == "traderjoe_v2":
-                return router.functions.getFactory().call()
+                return await self._call(router.functions.getFactory())
             else:
-                return router.functions.factory().call()
+                return await self._call(router.functions.factory())
         except Exception as e:
             logging.error(f"Error in _get_factory_address: {e}")
 
-    def _get_factory_abi(self, factory_address):
+    async def _get_factory_abi(self, factory_address):
         factory_address = Web3.to_checksum_address(factory_address)
         if factory_address != "0x0000000000000000000000000000000000000000":
             try:
-                get_factory_abi = requests.get(
-                    self.network.explorer_api_abi + factory_address + self.network.api_key).json()
-                if get_factory_abi.status_code == 200:
+                response = await session_manager.get(
+                    self.network.explorer_api_abi + factory_address + self.network.api_key,
+                    venue="explorer", endpoint="getabi", network=self.network.name)
+                get_factory_abi = await response.json()
+                if response.status == 200:
                     return get_factory_abi["result"] if get_factory_abi["result"] != "Invalid Address format" else \
-                        json.load(open(DexPrice._DEFAULT_FACTORY_PATH))
+                        dex_registry.load_abi(DexPrice._DEFAULT_FACTORY_PATH)
                 else:
                     logging.info(
-                        f"Response code in _get_factory_abi not 200: {get_factory_abi.text}")
+                        f"Response code in _get_factory_abi not 200: {get_factory_abi}")
             except Exception as e:
                 logging.error(
                     f"Error in _get_factory_abi in request of factory abi: {e}")
         else:
             return None
 
-    def _update_contracts_file(self):
-        with open(DexPrice._DEX_CONTRACTS_PATH, "w") as file:
-            json.dump(DexPrice._dex_contracts, file, indent=4)
+    async def _get_factory_contract(self):
+        factory_address, factory_abi = self._get_contract_address_and_abi("factory")
+        if factory_address is None:
+            router_address, router_abi = self._get_contract_address_and_abi("router")
+            if router_address is None:
+                return None
+            factory_address = await self._get_factory_address(self._contract(router_address, router_abi))
+            if not factory_address:
+                return None
+            factory_abi = await self._get_factory_abi(factory_address)
+        if factory_abi:
+            return self._contract(Web3.to_checksum_address(factory_address), factory_abi)
+
+    def _get_pool_abi(self, pool_address):
+        if pool_address and pool_address != "0x0000000000000000000000000000000000000000":
+            return dex_registry.default_pool_abi(self.network.name, self.name)
 
-    def _get_pool_contract(self):
-        w3 = self._connect_web3()
-        if not "pools" in DexPrice._dex_contracts[self.network.name][self.name]:
-            pool_abi_path = DexPrice._DEFAULT_V3_POOL_PATH if self.name.split(
-                "_")[1] == "v3" else DexPrice._DEFAULT_V2_POOL_PATH
-            DexPrice._dex_contracts[self.network.name][self.name].setdefault(
-                "pools", {"default_pool_abi": json.load(open(pool_abi_path))})
+    async def _get_pool_contract(self):
         pool_key = self.src_token + self.dest_token
-        if pool_key in DexPrice._dex_contracts[self.network.name][self.name]["pools"]:
-            pool_address = DexPrice._dex_contracts[self.network.name][self.name]["pools"][pool_key]["address"]
-            pool_abi = DexPrice._dex_contracts[self.network.name][self.name]["pools"][pool_key]["abi"]
+        pool_address, pool_abi = dex_registry.pool(self.network.name, self.name, pool_key)
+        if pool_address is not None:
             try:
-                return w3.eth.contract(address=pool_address, abi=pool_abi)
+                return self._contract(pool_address, pool_abi)
             except Exception as e:
                 logging.error(f"Error in _get_pool_contract: {e}")
         else:
-            factory = self._get_factory_contract()
+            factory = await self._get_factory_contract()
             if factory:
-                pool_address = self._get_pool_address(factory)
+                pool_address = await self._get_pool_address(factory)
                 pool_abi = self._get_pool_abi(pool_address)
                 if pool_abi:
-                    DexPrice._dex_contracts[self.network.name][self.name]["pools"].update(
-                        {pool_key: {"address": pool_address, "abi": pool_abi}})
-                    self._update_contracts_file()
+                    dex_registry.add_pool(self.network.name, self.name, pool_key, pool_address)
                     try:
-                        return w3.eth.contract(address=pool_address, abi=pool_abi)
+                        return self._contract(pool_address, pool_abi)
                     except Exception as e:
                         logging.error(f"Error in _get_pool_contract: {e}")
                 else:
@@ -123,97 +135,92 @@ class DexPrice:
                 logging.info("Factory doesn't exist.")
                 return None
 
-    def _get_pool_address(self, factory):
+    async def _get_pool_address(self, factory):
+        src_token = Web3.to_checksum_address(self.src_token)
+        dest_token = Web3.to_checksum_address(self.dest_token)
         try:
             if self.name == "kyberswap":
-                return factory.functions.getPools(Web3.to_checksum_address(self.src_token),
-                                                  Web3.to_checksum_address(self.dest_token)).call()[0]
+                return (await self._call(factory.functions.getPools(src_token, dest_token)))[0]
             elif self.name == "traderjoe_v2":
-                return factory.functions.getAllLBPairs(Web3.to_checksum_address(self.src_token),
-                                                       Web3.to_checksum_address(self.dest_token)).call()[0][1]
+                return (await self._call(factory.functions.getAllLBPairs(src_token, dest_token)))[0][1]
             elif self.name.split("_")[1] == "v3":
-                return factory.functions.getPool(Web3.to_checksum_address(self.src_token),
-                                                 Web3.to_checksum_address(self.dest_token), self.slippage).call()
+                return await self._call(factory.functions.getPool(src_token, dest_token, self.slippage))
             else:
-                return factory.functions.getPair(Web3.to_checksum_address(self.src_token),
-                                                 Web3.to_checksum_address(self.dest_token)).call()
+                return await self._call(factory.functions.getPair(src_token, dest_token))
         except Exception as e:
             logging.error(f"Error in _get_pool_address: {e}")
 
-    async def _get_decimals(self, token_address: str, session):
-        w3 = self._connect_web3()
+    async def _get_decimals(self, token_address: str, session=None):
+        '''
+        Decimals from token_store, or from the chain on a miss. Concurrent misses of one
+        token share a single lookup.
+        '''
         token_address = Web3.to_checksum_address(token_address)
-        if self.network.name not in DexPrice._tokens_info:
-            DexPrice._tokens_info.update({self.network.name: {}})
-        if token_address in DexPrice._tokens_info[self.network.name]:
-            token_decimals = DexPrice._tokens_info[self.network.name][token_address]["decimals"]
-        else:
-            url = self.network.explorer_api_abi + token_address + self.network.api_key
-            try:
-                response = await session.get(url)
-                get_token_abi = await response.json()
-                if response.status == 200:
-                    token_abi = get_token_abi["result"]
-                else:
-                    logging.info(
-                        f"Response code in _get_decimals not 200: {get_token_abi}")
-                    token_abi = DexPrice._tokens_info["default_token_abi"]
-                if token_abi == "Invalid Address format" or token_abi == "Contract source code not verified" or token_abi == "" or not token_abi:
-                    token_abi = DexPrice._tokens_info["default_token_abi"]
-            except asyncio.TimeoutError:
-                logging.error(
-                    f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
-                token_abi = DexPrice._tokens_info["default_token_abi"]
-            except Exception as e:
-                logging.error(
-                    f"Error in _get_decimals in request of token_abi: {e}")
-                token_abi = DexPrice._tokens_info["default_token_abi"]
+        token = token_store.get(self.network.name, token_address)
+        if token is not None:
+            return token["decimals"]
+        key = (self.network.name, token_address)
+        if key not in DexPrice._decimals_lookups:
+            lookup = asyncio.ensure_future(self._lookup_decimals(token_address, session or session_manager))
+            lookup.add_done_callback(lambda _: DexPrice._decimals_lookups.pop(key, None))
+            DexPrice._decimals_lookups[key] = lookup
+        return await asyncio.shield(DexPrice._decimals_lookups[key])
 
-            try:
-                token_contract = w3.eth.contract(
-                    address=token_address,
-                    abi=token_abi)
-                token_symbol = token_contract.functions.symbol().call()
-                token_decimals = token_contract.functions.decimals().call()
-            except asyncio.TimeoutError:
-                logging.error(
-                    f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
+    async def _read_token(self, token_address: str, token_abi) -> tuple:
+        token_contract = self._contract(token_address, token_abi)
+        return await asyncio.gather(self._call(token_contract.functions.symbol()),
+                                    self._call(token_contract.functions.decimals()))
+
+    async def _lookup_decimals(self, token_address: str, session) -> int:
+        url = self.network.explorer_api_abi + token_address + self.network.api_key
+        try:
+            response = await session.get(url, venue="explorer", endpoint="getabi", network=self.network.name)
+            get_token_abi = await response.json()
+            if response.status == 200:
+                token_abi = get_token_abi["result"]
+            else:
+                logging.info(
+                    f"Response code in _get_decimals not 200: {get_token_abi}")
                 token_abi = DexPrice._tokens_info["default_token_abi"]
-                token_contract = w3.eth.contract(
-                    address=token_address,
-                    abi=token_abi)
-                token_symbol = token_contract.functions.symbol().call()
-                token_decimals = token_contract.functions.decimals().call()
-            except web3.exceptions.ABIFunctionNotFound:
+            if token_abi == "Invalid Address format" or token_abi == "Contract source code not verified" or token_abi == "" or not token_abi:
                 token_abi = DexPrice._tokens_info["default_token_abi"]
-                token_contract = w3.eth.contract(
-                    address=token_address,
-                    abi=token_abi)
-                token_symbol = token_contract.functions.symbol().call()
-                token_decimals = token_contract.functions.decimals().call()
-            DexPrice._tokens_info[self.network.name].update(
-                {token_address:
-                     {"symbol": token_symbol,
-                      "abi": token_abi,
-                      "decimals": token_decimals}})
-            with open(DexPrice._TOKEN_INFO_PATH, "w") as file:
-                json.dump(DexPrice._tokens_info, file, indent=4)
+        except asyncio.TimeoutError:
+            logging.error(
+                f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
+            token_abi = DexPrice._tokens_info["default_token_abi"]
+        except Exception as e:
+            logging.error(
+                f"Error in _get_decimals in request of token_abi: {e}")
+            token_abi = DexPrice._tokens_info["default_token_abi"]
+
+        try:
+            token_symbol, token_decimals = await self._read_token(token_address, token_abi)
+        except asyncio.TimeoutError:
+            logging.error(
+                f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
+            token_abi = DexPrice._tokens_info["default_token_abi"]
+            token_symbol, token_decimals = await self._read_token(token_address, token_abi)
+        except web3.exceptions.ABIFunctionNotFound:
+            token_abi = DexPrice._tokens_info["default_token_abi"]
+            token_symbol, token_decimals = await self._read_token(token_address, token_abi)
+        token_store.put(self.network.name, token_address, token_symbol, token_decimals, token_abi)
         return int(token_decimals)
 
     def _get_tokens_symbol(self):
-        src_token_symbol = DexPrice._tokens_info[self.network.name][self.src_token]["symbol"]
-        dest_token_symbol = DexPrice._tokens_info[self.network.name][self.dest_token]["symbol"]
+        src_token_symbol = token_store.get(self.network.name, self.src_token)["symbol"]
+        dest_token_symbol = token_store.get(self.network.name, self.dest_token)["symbol"]
         return src_token_symbol, dest_token_symbol
 
-    def _get_v2_price(self, pool) -> float:
+    async def _get_v2_price(self, pool) -> float:
         try:
             if self.name == "traderjoe_v2":
-                reserves = pool.functions.getReservesAndId().call()
+                reserves = await self._call(pool.functions.getReservesAndId())
             else:
-                reserves = pool.functions.getReserves().call()
+                reserves = await self._call(pool.functions.getReserves())
         except Exception as e:
             logging.error(
                 f"Error in _get_v2_price in request of getReserves: {e}")
+            return None
 
         if reserves[0] == 0 or reserves[0] == "" or reserves[1] == 0 or reserves[1] == "":
             logging.info(
@@ -222,21 +229,21 @@ class DexPrice:
         else:
             try:
                 if self.name == "traderjoe_v2":
-                    token0 = pool.functions.tokenX().call()
-                    token1 = pool.functions.tokenY().call()
+                    token0, token1 = await asyncio.gather(self._call(pool.functions.tokenX()),
+                                                          self._call(pool.functions.tokenY()))
                 else:
-                    token0 = pool.functions.token0().call()
-                    token1 = pool.functions.token1().call()
+                    token0, token1 = await asyncio.gather(self._call(pool.functions.token0()),
+                                                          self._call(pool.functions.token1()))
 
                 if Web3.to_checksum_address(token0) == self.src_token and Web3.to_checksum_address(
                         token1) == self.dest_token:
-                    decimals_token0 = self._get_decimals(self.src_token)
-                    decimals_token1 = self._get_decimals(self.dest_token)
+                    decimals_token0, decimals_token1 = await asyncio.gather(self._get_decimals(self.src_token),
+                                                                            self._get_decimals(self.dest_token))
                     price = (reserves[0] / 10 ** decimals_token0) / \
                             (reserves[1] / 10 ** decimals_token1)
                 else:
-                    decimals_token0 = self._get_decimals(token0)
-                    decimals_token1 = self._get_decimals(token1)
+                    decimals_token0, decimals_token1 = await asyncio.gather(self._get_decimals(token0),
+                                                                            self._get_decimals(token1))
                     price = (reserves[1] / 10 ** decimals_token1) / \
                             (reserves[0] / 10 ** decimals_token0)
                 return price
@@ -244,13 +251,13 @@ class DexPrice:
                 logging.error(
                     f"Error in _get_v2_price in request of price: {e}")
 
-    def _get_v3_price(self, pool) -> float:
+    async def _get_v3_price(self, pool) -> float:
         try:
-            slot0 = pool.functions.slot0().call()
-            token0 = pool.functions.token0().call()
-            token1 = pool.functions.token1().call()
-            decimals_token0 = self._get_decimals(token0)
-            decimals_token1 = self._get_decimals(token1)
+            slot0, token0, token1 = await asyncio.gather(self._call(pool.functions.slot0()),
+                                                         self._call(pool.functions.token0()),
+                                                         self._call(pool.functions.token1()))
+            decimals_token0, decimals_token1 = await asyncio.gather(self._get_decimals(token0),
+                                                                    self._get_decimals(token1))
             price_of_token0 = ((slot0[0] / 2 ** 96) ** 2) / \
                               (10 ** decimals_token1 / 10 ** decimals_token0)
             if Web3.to_checksum_address(token0) == self.src_token and Web3.to_checksum_address(
@@ -261,44 +268,40 @@ class DexPrice:
         except Exception as e:
             logging.error(f"Error in _get_v3_price: {e}")
 
-    def _get_aggregator_price(self) -> float:
-        w3 = self._connect_web3()
+    async def _get_aggregator_price(self) -> float:
         try:
-            aggregator_contract = w3.eth.contract(
-                address=DexPrice._dex_contracts[self.network.name][self.name]["oracle"]["address"],
-                abi=DexPrice._dex_contracts[self.network.name][self.name]["oracle"]["abi"])
+            aggregator_contract = self._contract(*self._get_contract_address_and_abi("oracle"))
             if self.name == "woofi_aggregator":
-                aggregator_price_src_token = aggregator_contract.functions.woPrice(
-                    self.src_token).call()
-                aggregator_price_dest_token = aggregator_contract.functions.woPrice(
-                    self.dest_token).call()
+                aggregator_price_src_token, aggregator_price_dest_token = await asyncio.gather(
+                    self._call(aggregator_contract.functions.woPrice(self.src_token)),
+                    self._call(aggregator_contract.functions.woPrice(self.dest_token)))
                 price_src_token = aggregator_price_src_token[0] / 10 ** 8
                 price_dest_token = aggregator_price_dest_token[0] / 10 ** 8
                 price = price_src_token / price_dest_token
             else:
-                aggregator_price = aggregator_contract.functions.getRate(
-                    self.src_token, self.dest_token, False).call()
-                decimals_dest_tokens = self._get_decimals(self.dest_token)
-                decimals_src_token = self._get_decimals(self.src_token)
+                aggregator_price, decimals_dest_tokens, decimals_src_token = await asyncio.gather(
+                    self._call(aggregator_contract.functions.getRate(self.src_token, self.dest_token, False)),
+                    self._get_decimals(self.dest_token),
+                    self._get_decimals(self.src_token))
                 price = aggregator_price / 10 ** decimals_dest_tokens
             return price
         except Exception as e:
             logging.error(f"Error in _get_aggregator_price: {e}")
 
-    def get_price(self):
+    async def get_price(self, session=None):
         if self.name.split("_")[1] == "aggregator":
-            price = self._get_aggregator_price()
+            price = await self._get_aggregator_price()
             src_token_symbol, dest_token_symbol = self._get_tokens_symbol()
             logging.info(
                 f"In {self.name} - {self.network.name}: price of {src_token_symbol} in {dest_token_symbol} {price}")
             print("----------------------------------------------")
         else:
-            pool = self._get_pool_contract()
+            pool = await self._get_pool_contract()
             if pool:
                 if self.name.split("_")[1] == "v3":
-                    price = self._get_v3_price(pool=pool)
+                    price = await self._get_v3_price(pool=pool)
                 else:
-                    price = self._get_v2_price(pool=pool)
+                    price = await self._get_v2_price(pool=pool)
                 src_token_symbol, dest_token_symbol = self._get_tokens_symbol()
                 logging.info(f"Price of {dest_token_symbol} {1 / price}")
                 logging.info(f"Price of {src_token_symbol}  {price}")
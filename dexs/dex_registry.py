@@ -0,0 +1,284 @@
+'''
+Router, factory, oracle and pool contracts of every DEX DexPrice reads on chain, one file per
+network and DEX under dexs/abi/dex_contracts/<network>/<dex>.json:
+
+    {"router": {"address", "abi"}, "factory": {...}, "oracle": {...},
+     "pools": {"default_pool_abi": [...], "<src><dest>": {"address"[, "abi"]}}}
+
+A file is read the first time its DEX is priced on its network. ABIs are stored parsed and
+a pool only has its own "abi" when it differs from default_pool_abi. Pools found at run time
+are appended to pools_journal.jsonl next to the files and replayed on load;
+`python -m dexs.dex_registry --compact` folds the journal into the files.
+
+The files are the only source. The monolithic dex_contracts.json the legacy scanner reads is
+generated from them, journal included, with `python -m dexs.dex_registry --join` (the legacy
+scanner and the end-to-end bench do it when the file is missing); it is not tracked.
+`python -m dexs.dex_registry --split` goes the other way, for a monolithic file from elsewhere.
+'''
+import argparse
+import logging
+import os
+import re
+from pathlib import Path
+
+import ujson as json
+
+from dexs import networks
+
+logging.basicConfig(level=logging.INFO)
+
+_ROOT_DIR = Path(__file__).parent.parent.absolute()
+DEX_CONTRACTS_DIR = os.path.join(_ROOT_DIR, "dexs/abi/dex_contracts")
+DEX_CONTRACTS_FILE = os.path.join(_ROOT_DIR, "dexs/abi/dex_contracts.json")
+DEFAULT_POOL_ABI_PATHS = {"v2": os.path.join(_ROOT_DIR, "dexs/abi/default_v2_pool_abi.json"),
+                          "v3": os.path.join(_ROOT_DIR, "dexs/abi/default_v3_pool_abi.json")}
+DEFAULT_FACTORY_ABI_PATH = os.path.join(_ROOT_DIR, "dexs/abi/default_factory_abi.json")
+JOURNAL_NAME = "pools_journal.jsonl"
+
+
+def network_slug(network_name: str) -> str:
+    '''"BNB Smart Chain (BEP20)" -> "bnb_smart_chain_bep20"'''
+    return re.sub(r"[^a-z0-9]+", "_", network_name.lower()).strip("_")
+
+
+def _parse(abi):
+    '''A JSON string ABI as a list, "" (no ABI) as None'''
+    if isinstance(abi, str):
+        return json.loads(abi) if abi.strip() else None
+    return abi
+
+
+def _dump(abi) -> str:
+    '''The inverse of _parse, as the legacy scanner stores ABIs'''
+    return "" if abi is None else json.dumps(abi)
+
+
+class DexRegistry:
+    '''
+    Lazily loaded dexs/abi/dex_contracts/ with ABIs parsed once. contract() caches a contract
+    factory per ABI and a contract per (network, address), so building a router, pool or
+    oracle contract for a quote costs a dict lookup. add_pool() appends one line to the
+    journal instead of rewriting the registry.
+    '''
+
+    def __init__(self, directory: str = DEX_CONTRACTS_DIR):
+        self.directory = directory
+        self.entries = {}
+        self.abis = {}
+        self.factories = {}
+        self.contracts = {}
+        self._journal = None
+        self._journal_file = None
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.directory, JOURNAL_NAME)
+
+    def path(self, network_name: str, dex: str) -> str:
+        return os.path.join(self.directory, network_slug(network_name), f"{dex}.json")
+
+    def entry(self, network_name: str, dex: str) -> dict:
+        '''The contracts of a DEX on a network, {} when it has none'''
+        key = (network_name, dex)
+        if key not in self.entries:
+            path = self.path(network_name, dex)
+            entry = {}
+            if os.path.exists(path):
+                with open(path) as file:
+                    entry = json.load(file)
+            for pool_key, pool in self._journal_entries().get(key, {}).items():
+                entry.setdefault("pools", {})[pool_key] = pool
+            self.entries[key] = entry
+        return self.entries[key]
+
+    def _journal_entries(self) -> dict:
+        '''{(network, dex): {pool key: pool}} of the journal, read once'''
+        if self._journal is None:
+            self._journal = {}
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path) as file:
+                    for line in file:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # a line cut short by a crash
+                            continue
+                        pool = {"address": record["address"]}
+                        if "abi" in record:
+                            pool["abi"] = record["abi"]
+                        self._journal.setdefault((record["network"], record["dex"]), {})[record["key"]] = pool
+        return self._journal
+
+    def contract_data(self, network_name: str, dex: str, kind: str) -> tuple:
+        '''(address, parsed abi) of the router, factory or oracle, (None, None) if unknown'''
+        data = self.entry(network_name, dex).get(kind)
+        if not data:
+            return None, None
+        return data["address"], data["abi"]
+
+    def default_pool_abi(self, network_name: str, dex: str) -> list:
+        pools = self.entry(network_name, dex).setdefault("pools", {})
+        if "default_pool_abi" not in pools:
+            version = "v3" if dex.split("_")[1:2] == ["v3"] else "v2"
+            pools["default_pool_abi"] = self.load_abi(DEFAULT_POOL_ABI_PATHS[version])
+        return pools["default_pool_abi"]
+
+    def pool(self, network_name: str, dex: str, pool_key: str) -> tuple:
+        '''(address, parsed abi) of a known pool, (None, None) otherwise'''
+        pool = self.entry(network_name, dex).get("pools", {}).get(pool_key)
+        if pool is None:
+            return None, None
+        return pool["address"], pool.get("abi") or self.default_pool_abi(network_name, dex)
+
+    def add_pool(self, network_name: str, dex: str, pool_key: str, address: str, abi=None) -> None:
+        '''Remembers a pool found on chain; abi only when it is not the default pool ABI'''
+        pool = {"address": address}
+        record = {"network": network_name, "dex": dex, "key": pool_key, "address": address}
+        if abi is not None and _parse(abi) != self.default_pool_abi(network_name, dex):
+            pool["abi"] = record["abi"] = _parse(abi)
+        self.entry(network_name, dex).setdefault("pools", {})[pool_key] = pool
+        self._journal_entries().setdefault((network_name, dex), {})[pool_key] = pool
+        try:
+            if self._journal_file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._journal_file = open(self.journal_path, "a")
+            self._journal_file.write(json.dumps(record) + "\n")
+            self._journal_file.flush()
+        except Exception as e:
+            logging.error(f"Error appending pool {pool_key} of {dex} on {network_name} to {self.journal_path}: {e}")
+
+    def parse_abi(self, abi):
+        '''An ABI as a list, JSON strings (e.g. explorer answers) are parsed once'''
+        if not isinstance(abi, str):
+            return abi
+        if abi not in self.abis:
+            self.abis[abi] = _parse(abi)
+        return self.abis[abi]
+
+    def load_abi(self, path: str) -> list:
+        if path not in self.abis:
+            with open(path) as file:
+                self.abis[path] = _parse(json.load(file))
+        return self.abis[path]
+
+    def contract(self, w3, network_name: str, address: str, abi):
+        '''A contract of w3, built from a cached factory of its ABI'''
+        abi = self.parse_abi(abi)
+        key = (network_name, address, id(abi))
+        if key not in self.contracts:
+            factory_key = (network_name, id(abi))
+            if factory_key not in self.factories:
+                # ids stay valid, every ABI list is kept by the registry
+                self.factories[factory_key] = (w3.eth.contract(abi=abi), abi)
+            self.contracts[key] = self.factories[factory_key][0](address=address)
+        return self.contracts[key]
+
+    def close(self) -> None:
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+    def compact(self) -> int:
+        '''Writes the journal into the per DEX files and empties it, returns the pools moved'''
+        moved = 0
+        for (network_name, dex), pools in self._journal_entries().items():
+            entry = self.entry(network_name, dex)
+            entry.setdefault("pools", {}).update(pools)
+            self._write(network_name, dex, entry)
+            moved += len(pools)
+        self.close()
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal = {}
+        return moved
+
+    def _write(self, network_name: str, dex: str, entry: dict) -> None:
+        path = self.path(network_name, dex)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as file:
+            json.dump(entry, file, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def join(self, target: str = DEX_CONTRACTS_FILE) -> int:
+        '''
+        Writes the files, journal pools included, as one monolithic dex_contracts.json in the
+        legacy layout (ABIs as JSON strings, every pool with its abi), returns the DEXes written
+        '''
+        dex_contracts = {}
+        written = 0
+        for network in vars(networks).values():
+            if not isinstance(network, networks.Network):
+                continue
+            directory = os.path.join(self.directory, network_slug(network.name))
+            if not os.path.isdir(directory):
+                continue
+            for file_name in sorted(os.listdir(directory)):
+                if not file_name.endswith(".json"):
+                    continue
+                dex = file_name[:-len(".json")]
+                entry = self.entry(network.name, dex)
+                contracts = {kind: {"address": data["address"], "abi": _dump(data["abi"])}
+                             for kind, data in entry.items() if kind != "pools"}
+                if "pools" in entry:
+                    default_abi = entry["pools"].get("default_pool_abi")
+                    pools = {"default_pool_abi": _dump(default_abi)} if default_abi else {}
+                    for pool_key, pool in entry["pools"].items():
+                        if pool_key != "default_pool_abi":
+                            pools[pool_key] = {"address": pool["address"], "abi": _dump(pool.get("abi") or default_abi)}
+                    contracts["pools"] = pools
+                dex_contracts.setdefault(network.name, {})[dex] = contracts
+                written += 1
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        with open(target + ".tmp", "w") as file:
+            json.dump(dex_contracts, file, indent=4)
+        os.replace(target + ".tmp", target)
+        return written
+
+    def split(self, source: str = DEX_CONTRACTS_FILE) -> int:
+        '''Writes a monolithic dex_contracts.json as per network and DEX files, returns the files'''
+        with open(source) as file:
+            dex_contracts = json.load(file)
+        written = 0
+        for network_name, dexes in dex_contracts.items():
+            for dex, contracts in dexes.items():
+                entry = {}
+                for kind, data in contracts.items():
+                    if kind != "pools":
+                        entry[kind] = {"address": data["address"], "abi": _parse(data["abi"])}
+                if "pools" in contracts:
+                    default_abi = _parse(contracts["pools"].get("default_pool_abi"))
+                    pools = {"default_pool_abi": default_abi} if default_abi else {}
+                    for pool_key, pool in contracts["pools"].items():
+                        if pool_key == "default_pool_abi":
+                            continue
+                        pools[pool_key] = {"address": pool["address"]}
+                        if _parse(pool["abi"]) != default_abi:
+                            pools[pool_key]["abi"] = _parse(pool["abi"])
+                    entry["pools"] = pools
+                self._write(network_name, dex, entry)
+                written += 1
+        self.entries = {}
+        return written
+
+
+dex_registry = DexRegistry()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the per network and DEX contract files")
+    parser.add_argument("--split", nargs="?", const=DEX_CONTRACTS_FILE,
+                        help="rebuild the files from a monolithic dex_contracts.json")
+    parser.add_argument("--compact", action="store_true", help="fold the pool journal into the files")
+    parser.add_argument("--join", nargs="?", const=DEX_CONTRACTS_FILE,
+                        help="write the monolithic dex_contracts.json the legacy scanner reads")
+    args = parser.parse_args(argv)
+    if args.split:
+        logging.info(f"Wrote {dex_registry.split(args.split)} files to {dex_registry.directory}")
+    if args.compact:
+        logging.info(f"Moved {dex_registry.compact()} pools from the journal to {dex_registry.directory}")
+    if args.join:
+        logging.info(f"Wrote {dex_registry.join(args.join)} DEXes to {args.join}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import asyncio
 import logging
 
+import aiohttp
+
 from dexs.async_get_dex_price import DexPrice
+from telemetry.venue_metrics import venue_metrics
 
 
 class JupyterApi(DexPrice):
@@ -18,19 +21,26 @@ class JupyterApi(DexPrice):
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
             }
             try:
-                response = await session.get(url, headers=headers)
+                response = await session.get(url, headers=headers,
+                                             venue=self.name, endpoint="price", network=self.network.name)
                 logging.info(
                     f"\nENTER Print from {self.name}\nreponse.status - {response.status}\n")
                 if response.status == 200:
                     jupyter_data = await response.json()
                     logging.info(f"\n{self.name} - {jupyter_data}")
-                    data = {"aggregator": self.name,
-                            "network": self.network.name,
-                            "src_address": self.src_token,
-                            "dest_address": self.dest_token,
-                            "dex": self.name,
-                            "price": float(jupyter_data['data'][self.src_token]['price'])
-                            }
+                    try:
+                        data = {"aggregator": self.name,
+                                "network": self.network.name,
+                                "src_address": self.src_token,
+                                "dest_address": self.dest_token,
+                                "dex": self.name,
+                                "price": float(jupyter_data['data'][self.src_token]['price'])
+                                }
+                    except (KeyError, IndexError, TypeError, ValueError) as e:
+                        venue_metrics.parse_failure(self.name, "price", self.network.name)
+                        logging.error(
+                            f"Error in JupyterApi - get_price, in parsing of data: {e}")
+                        return None
                     logging.info(f"RETURN DATA - {self.name} - {data}")
                     return data
                 else:
@@ -40,6 +50,9 @@ class JupyterApi(DexPrice):
                 logging.error(
                     f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
                 return None
+            except aiohttp.ClientError as e:
+                logging.error(
+                    f"Error in JupyterApi - get_price, request failed: {e!r}")
             except Exception as e:
                 logging.error(
                     f"Error in JupyterApi - get_price, in request of data: {e}")
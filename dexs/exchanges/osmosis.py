@@ -1,7 +1,10 @@
 import asyncio
 import logging
 
+import aiohttp
+
 from dexs.async_get_dex_price import DexPrice
+from telemetry.venue_metrics import venue_metrics
 
 
 class OsmosisApi(DexPrice):
@@ -18,17 +21,24 @@ class OsmosisApi(DexPrice):
             }
             try:
                 url = f"https://data.osmosis.zone/tokens/v2/all"
-                response = await session.get(url, headers=headers)
+                response = await session.get(url, headers=headers,
+                                             venue=self.name, endpoint="tokens/v2/all", network=self.network.name)
                 logging.info(
                     f"\nENTER Print from {self.name}\nreponse.status - {response.status}\n")
                 if response.status == 200:
                     osmosis_data = await response.json()
                     logging.info(f"\n{self.name} - {osmosis_data}")
 
-                    for data in osmosis_data:
-                        if data['denom'] == self.src_token:
-                            price = data['price']
-                            volume_24h = data['volume_24h']
+                    try:
+                        for data in osmosis_data:
+                            if data['denom'] == self.src_token:
+                                price = data['price']
+                                volume_24h = data['volume_24h']
+                    except (KeyError, IndexError, TypeError, ValueError) as e:
+                        venue_metrics.parse_failure(self.name, "tokens/v2/all", self.network.name)
+                        logging.error(
+                            f"Error in OsmosisApi - get_price, in parsing of data: {e}")
+                        return None
 
                     data = {"aggregator": self.name,
                             "network": self.network.name,
@@ -46,6 +56,9 @@ class OsmosisApi(DexPrice):
                 logging.error(
                     f"TimeoutError: API call in {self.name} took longer than 10 seconds.")
                 return None
+            except aiohttp.ClientError as e:
+                logging.error(
+                    f"Error in OsmosisApi - get_price, request failed: {e!r}")
             except Exception as e:
                 logging.error(
                     f"Error in OsmosisApi - get_price, in request of data: {e}")
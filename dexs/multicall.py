@@ -0,0 +1,125 @@
+import asyncio
+import logging
+
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+from dexs.web3_providers import web3_providers
+
+logging.basicConfig(level=logging.INFO)
+
+MULTICALL3_ABI = [{
+    "name": "aggregate3",
+    "type": "function",
+    "stateMutability": "payable",
+    "inputs": [{"name": "calls", "type": "tuple[]", "components": [
+        {"name": "target", "type": "address"},
+        {"name": "allowFailure", "type": "bool"},
+        {"name": "callData", "type": "bytes"}]}],
+    "outputs": [{"name": "returnData", "type": "tuple[]", "components": [
+        {"name": "success", "type": "bool"},
+        {"name": "returnData", "type": "bytes"}]}]
+}]
+
+
+class MulticallFailure(Exception):
+    pass
+
+
+class Multicall:
+    '''
+    Multicall3 aggregate3 per network. View calls awaited through call() in the same tick of
+    the event loop (or within window seconds) go out as one eth_call of up to max_calls
+    calls, so decimals/symbol of many tokens or the reserves of many pools cost a few RPC
+    round trips. Every call may fail on its own (allowFailure), only its awaiter gets the
+    error. Networks without network.multicall, and batches the RPC rejects, fall back to
+    one eth_call per function.
+    '''
+
+    def __init__(self,
+                 window: float = 0,
+                 max_calls: int = 500):
+        self.window = window
+        self.max_calls = max_calls
+        self.pending = {}
+        self.flushes = {}
+        self.networks = {}
+        self._tasks = set()
+        self.calls = 0
+        self.batches = 0
+        self.fallbacks = 0
+
+    async def call(self, network, function):
+        '''function: a bound contract function, e.g. token.functions.decimals()'''
+        if not network.multicall:
+            return await function.call()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self.pending.setdefault(network.name, [])
+        pending.append((function, future))
+        self.networks[network.name] = network
+        if len(pending) >= self.max_calls:
+            self._flush(network.name)
+        elif network.name not in self.flushes:
+            self.flushes[network.name] = loop.call_later(self.window, self._flush, network.name) if self.window \
+                else loop.call_soon(self._flush, network.name)
+        return await future
+
+    def _flush(self, name: str) -> None:
+        handle = self.flushes.pop(name, None)
+        if handle is not None:
+            handle.cancel()
+        calls = self.pending.pop(name, [])
+        for start in range(0, len(calls), self.max_calls):
+            # the loop only keeps a weak reference to a task, a collected batch would leave its awaiters hanging
+            task = asyncio.ensure_future(self._aggregate(self.networks[name], calls[start:start + self.max_calls]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _aggregate(self, network, calls: list) -> None:
+        w3 = web3_providers.get(network)
+        multicall = w3.eth.contract(address=network.multicall, abi=MULTICALL3_ABI)
+        try:
+            results = await multicall.functions.aggregate3(
+                [(function.address, True, function._encode_transaction_data()) for function, _ in calls]).call()
+        except Exception as e:
+            logging.error(f"Multicall of {len(calls)} calls on {network.name} failed, calling one by one: {e}")
+            self.fallbacks += 1
+            await asyncio.gather(*[self._single(function, future) for function, future in calls])
+            return
+        self.batches += 1
+        self.calls += len(calls)
+        for (function, future), (success, data) in zip(calls, results):
+            if future.done():
+                continue
+            if not success or not data:
+                future.set_exception(MulticallFailure(f"{function.fn_name} on {function.address} failed in multicall"))
+                continue
+            try:
+                future.set_result(self._decode(w3, function, data))
+            except Exception as e:
+                future.set_exception(e)
+
+    @staticmethod
+    async def _single(function, future) -> None:
+        try:
+            result = await function.call()
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def _decode(w3, function, data: bytes):
+        '''The value function.call() would have returned'''
+        output_types = get_abi_output_types(function.abi)
+        output = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, w3.codec.decode(output_types, data))
+        return output[0] if len(output) == 1 else output
+
+    def report(self) -> str:
+        return f"Multicall: {self.calls} calls in {self.batches} batches, {self.fallbacks} fallbacks"
+
+
+multicall = Multicall()
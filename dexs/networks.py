@@ -3,26 +3,38 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Multicall3, same address on most EVM chains (https://www.multicall3.com/deployments)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
 
 class Network:
     def __init__(self,
                  name: str,
-                 rpc: str,
+                 rpc: str | list,
                  chain_id: int,
                  eip1559_tx: bool,
                  coin_symbol: str,
                  explorer: str,
                  explorer_api_abi: str,
                  api_key: str,
+                 multicall: str | None = None,
+                 max_block_lag: int = 5
                  ):
+        '''
+        rpc: one URL or a list of them, the first is the primary (see dexs/rpc_endpoints.py).
+        max_block_lag: blocks an RPC may be behind the others before it is skipped.
+        '''
         self.name = name
-        self.rpc = rpc
+        self.rpcs = [rpc] if isinstance(rpc, str) else list(rpc)
+        self.rpc = self.rpcs[0]
         self.chain_id = chain_id
         self.eip1559_tx = eip1559_tx
         self.coin_symbol = coin_symbol
         self.explorer = explorer
         self.explorer_api_abi = explorer_api_abi
         self.api_key = api_key
+        self.multicall = multicall
+        self.max_block_lag = max_block_lag
 
     def __str__(self):
         return f"{self.name}"
@@ -30,85 +42,112 @@ class Network:
 
 Ethereum = Network(
     name="Ethereum",
-    rpc="https://eth.drpc.org",
+    rpc=["https://eth.drpc.org",
+         "https://ethereum-rpc.publicnode.com",
+         "https://rpc.ankr.com/eth"],
     chain_id=1,
     eip1559_tx=True,
     coin_symbol="ETH",
     explorer="https://etherscan.io/",
     explorer_api_abi="https://api.etherscan.io/api?module=contract&action=getabi&address=",
-    api_key=os.getenv("ETHERSCAN_API_KEY")
+    api_key=os.getenv("ETHERSCAN_API_KEY"),
+    multicall=MULTICALL3_ADDRESS
 )
 
 
 Arbitrum = Network(
     name="Arbitrum",
-    rpc="https://arbitrum-one.public.blastapi.io",
+    rpc=["https://arbitrum-one.public.blastapi.io",
+         "https://arb1.arbitrum.io/rpc",
+         "https://arbitrum-one-rpc.publicnode.com"],
     chain_id=42161,
     eip1559_tx=True,
     coin_symbol="ETH",
     explorer="https://arbiscan.io/",
     explorer_api_abi="https://api.arbiscan.io/api?module=contract&action=getabi&address=",
-    api_key=os.getenv("ARBISCAN_API_KEY")
+    api_key=os.getenv("ARBISCAN_API_KEY"),
+    multicall=MULTICALL3_ADDRESS,
+    max_block_lag=40
 )
 
 
 Optimism = Network(
     name="Optimism",
-    rpc="https://rpc.ankr.com/optimism/",
+    rpc=["https://rpc.ankr.com/optimism/",
+         "https://mainnet.optimism.io",
+         "https://optimism-rpc.publicnode.com"],
     chain_id=10,
     eip1559_tx=True,
     coin_symbol="ETH",
     explorer="https://optimistic.etherscan.io/",
     explorer_api_abi="https://api-optimistic.etherscan.io/api?module=contract&action=getabi&address=",
-    api_key=os.getenv("OPTIMISTICSCAN_API_KEY")
+    api_key=os.getenv("OPTIMISTICSCAN_API_KEY"),
+    multicall=MULTICALL3_ADDRESS,
+    max_block_lag=10
 )
 
 
 Polygon = Network(
     name="Polygon",
-    rpc="https://polygon-rpc.com/",
+    rpc=["https://polygon-rpc.com/",
+         "https://polygon-bor-rpc.publicnode.com",
+         "https://rpc.ankr.com/polygon"],
     chain_id=137,
     eip1559_tx=True,
     coin_symbol="MATIC",
     explorer="https://polygonscan.com/",
     explorer_api_abi="https://api.polygonscan.com/api?module=contract&action=getabi&address=",
-    api_key=os.getenv("POLYGONSCAN_API_KEY")
+    api_key=os.getenv("POLYGONSCAN_API_KEY"),
+    multicall=MULTICALL3_ADDRESS,
+    max_block_lag=10
 )
 
 
 Avalanche = Network(
     name="Avalanche C-Chain",
-    rpc="https://rpc.ankr.com/avalanche/",
+    rpc=["https://rpc.ankr.com/avalanche/",
+         "https://api.avax.network/ext/bc/C/rpc",
+         "https://avalanche-c-chain-rpc.publicnode.com"],
     chain_id=43114,
     eip1559_tx=True,
     coin_symbol="AVAX",
     explorer="https://snowtrace.io/",
     explorer_api_abi="https://api.snowtrace.io/api?module=contract&action=getabi&address=",
-    api_key=os.getenv("SNOWTRACE_API_KEY")
+    api_key=os.getenv("SNOWTRACE_API_KEY"),
+    multicall=MULTICALL3_ADDRESS,
+    max_block_lag=10
 )
 
 
 BinanceSmartChain = Network(
     name='BNB Smart Chain (BEP20)',
-    rpc='https://bsc-dataseed.binance.org/',
+    rpc=['https://bsc-dataseed.binance.org/',
+         'https://bsc-dataseed1.defibit.io/',
+         'https://bsc-rpc.publicnode.com'],
     chain_id=56,
     eip1559_tx=False,
     coin_symbol='BNB',
     explorer='https://bscscan.com/',
     explorer_api_abi='https://api.bscscan.com/api?module=contract&action=getabi&address=',
-    api_key=os.getenv("BSCSCAN_API_KEY")
+    api_key=os.getenv("BSCSCAN_API_KEY"),
+    multicall=MULTICALL3_ADDRESS,
+    max_block_lag=10
 )
 
 
 Base = Network(
     name='Base',
-    rpc='https://base.api.onfinality.io/public',
+    rpc=['https://base.api.onfinality.io/public',
+         'https://mainnet.base.org',
+         'https://base-rpc.publicnode.com'],
     chain_id=8453,
     eip1559_tx=True,
     coin_symbol='ETH',
     explorer='https://basescan.org/',
     explorer_api_abi='https://api.basescan.org/api?module=contract&action=getabi&address=',
-    api_key=os.getenv("BASESCAN_API_KEY")
+    api_key=os.getenv("BASESCAN_API_KEY"),
+    multicall=MULTICALL3_ADDRESS,
+    max_block_lag=10
 )
 
 
@@ -126,25 +165,32 @@ Solana = Network(
 
 Fantom = Network(
     name='fantom',
-    rpc='https://rpc.ankr.com/fantom/',
+    rpc=['https://rpc.ankr.com/fantom/',
+         'https://rpcapi.fantom.network',
+         'https://fantom-rpc.publicnode.com'],
     chain_id=250,
     eip1559_tx=True,
     coin_symbol='FTM',
     explorer='https://ftmscan.com/',
     explorer_api_abi="",
-    api_key=""
+    api_key="",
+    multicall=MULTICALL3_ADDRESS,
+    max_block_lag=20
 )
 
 
 ZkSync = Network(
     name='zkSync Era',
-    rpc='https://mainnet.era.zksync.io/',
+    rpc=['https://mainnet.era.zksync.io/',
+         'https://zksync.drpc.org'],
     chain_id=324,
     eip1559_tx=False,
     coin_symbol='ETH',
     explorer='https://explorer.zksync.io/',
     explorer_api_abi='',
-    api_key=''
+    api_key='',
+    multicall="0xF9cda624FBC7e059355ce98a31693d299FACd963",
+    max_block_lag=20
 )
 
 
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+
+import ujson as json
+
+logging.basicConfig(level=logging.INFO)
+
+
+class RpcEndpoint:
+    def __init__(self, url: str):
+        self.url = url
+        self.latency = None
+        self.error_rate = 0.0
+        self.block = None
+        self.behind = False
+        self.failures_in_row = 0
+        self.down_until = 0
+        self.requests = 0
+        self.failures = 0
+        self.hedges = 0
+
+    def score(self) -> float:
+        '''Lower is better; endpoints not measured yet score 0 so each one gets tried'''
+        return (self.latency or 0) * (1 + 4 * self.error_rate)
+
+    def healthy(self, now: float) -> bool:
+        return not self.behind and self.down_until <= now
+
+
+class RpcEndpoints:
+    '''
+    The RPC endpoints of one network. A request goes to the healthy endpoint with the best
+    score (latency EWMA weighted by error rate). If it has not answered within hedge_factor
+    times its latency (at least min_hedge seconds) the same request is sent to the next one
+    and the first answer wins; a failed request moves on to the next endpoint.
+    failure_threshold failures in a row take an endpoint out for down_seconds. Every
+    block_check_seconds eth_blockNumber is asked from all endpoints, those more than
+    max_block_lag blocks behind the highest are skipped until they catch up.
+    Requests may be sent twice, so only read calls go through here.
+    '''
+
+    def __init__(self,
+                 name: str,
+                 urls: list,
+                 post,
+                 hedge_factor: float = 3,
+                 min_hedge: float = 0.25,
+                 failure_threshold: int = 3,
+                 down_seconds: float = 30,
+                 block_check_seconds: float = 30,
+                 max_block_lag: int = 5,
+                 alpha: float = 0.2):
+        '''post: async (url, body) -> bytes, raises on HTTP and connection errors'''
+        self.name = name
+        self.endpoints = [RpcEndpoint(url) for url in urls]
+        self.post = post
+        self.hedge_factor = hedge_factor
+        self.min_hedge = min_hedge
+        self.failure_threshold = failure_threshold
+        self.down_seconds = down_seconds
+        self.block_check_seconds = block_check_seconds
+        self.max_block_lag = max_block_lag
+        self.alpha = alpha
+        self.block_check = None
+        self.blocks_checked_at = 0
+
+    def ranked(self) -> list:
+        now = time.monotonic()
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy(now)]
+        # with none healthy every endpoint is still tried, the best first
+        return sorted(healthy or self.endpoints, key=RpcEndpoint.score)
+
+    def hedge_after(self, endpoint: RpcEndpoint) -> float:
+        return max(self.min_hedge, self.hedge_factor * (endpoint.latency or self.min_hedge))
+
+    async def request(self, body: str) -> bytes:
+        self._schedule_block_check()
+        remaining = self.ranked()
+        pending = set()
+        error = None
+        try:
+            while remaining or pending:
+                # at most one hedge in flight next to the first request
+                if remaining and len(pending) < 2:
+                    endpoint = remaining.pop(0)
+                    if pending:
+                        endpoint.hedges += 1
+                    pending.add(asyncio.ensure_future(self._send(endpoint, body)))
+                    timeout = self.hedge_after(endpoint) if remaining and len(pending) < 2 else None
+                else:
+                    timeout = None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error
+
+    async def _send(self, endpoint: RpcEndpoint, body: str) -> bytes:
+        started = time.perf_counter()
+        endpoint.requests += 1
+        try:
+            response = await self.post(endpoint.url, body)
+        except asyncio.CancelledError:
+            # lost to a hedge: the time it took so far still counts against its latency
+            self._observe(endpoint, time.perf_counter() - started)
+            raise
+        except Exception as e:
+            self._failed(endpoint, e)
+            raise
+        self._observe(endpoint, time.perf_counter() - started)
+        endpoint.error_rate *= 1 - self.alpha
+        endpoint.failures_in_row = 0
+        return response
+
+    def _observe(self, endpoint: RpcEndpoint, latency: float) -> None:
+        endpoint.latency = latency if endpoint.latency is None \
+            else endpoint.latency + self.alpha * (latency - endpoint.latency)
+
+    def _failed(self, endpoint: RpcEndpoint, e: Exception) -> None:
+        endpoint.failures += 1
+        endpoint.failures_in_row += 1
+        endpoint.error_rate += self.alpha * (1 - endpoint.error_rate)
+        if endpoint.failures_in_row >= self.failure_threshold:
+            endpoint.down_until = time.monotonic() + self.down_seconds
+            logging.error(f"RPC {endpoint.url} of {self.name} down for {self.down_seconds:g}s after "
+                          f"{endpoint.failures_in_row} failures: {e}")
+
+    def _schedule_block_check(self) -> None:
+        if len(self.endpoints) < 2:
+            return
+        loop = asyncio.get_running_loop()
+        # a check left unfinished by an earlier event loop never completes, it is replaced
+        if self.block_check is not None and not self.block_check.done() and self.block_check.get_loop() is loop:
+            return
+        if time.monotonic() - self.blocks_checked_at < self.block_check_seconds:
+            return
+        self.blocks_checked_at = time.monotonic()
+        self.block_check = asyncio.ensure_future(self.check_blocks())
+
+    async def check_blocks(self) -> None:
+        body = json.dumps({"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 0})
+        blocks = await asyncio.gather(*[self._block_number(endpoint, body) for endpoint in self.endpoints])
+        known = [block for block in blocks if block is not None]
+        if not known:
+            return
+        head = max(known)
+        for endpoint, block in zip(self.endpoints, blocks):
+            if block is None:
+                continue
+            endpoint.block = block
+            behind = head - block > self.max_block_lag
+            if behind != endpoint.behind:
+                logging.info(f"RPC {endpoint.url} of {self.name} at block {block}, head {head}: "
+                             f"{'skipped' if behind else 'caught up'}")
+            endpoint.behind = behind
+
+    async def _block_number(self, endpoint: RpcEndpoint, body: str) -> int | None:
+        try:
+            return int(json.loads(await self._send(endpoint, body))["result"], 16)
+        except Exception as e:
+            logging.error(f"Error getting block number from RPC {endpoint.url} of {self.name}: {e}")
+            return None
+
+    def report(self) -> list:
+        now = time.monotonic()
+        lines = []
+        for endpoint in self.endpoints:
+            state = "behind" if endpoint.behind else "down" if endpoint.down_until > now else "up"
+            latency = f"{endpoint.latency * 1000:.0f} ms" if endpoint.latency is not None else "-"
+            lines.append(f"{endpoint.url}: {state}, {latency}, error rate {endpoint.error_rate:.2f}, "
+                         f"block {endpoint.block or '-'}, {endpoint.requests} requests, "
+                         f"{endpoint.failures} failures, {endpoint.hedges} hedges")
+        return lines
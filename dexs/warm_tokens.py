@@ -0,0 +1,129 @@
+'''
+Fills storage.token_store with decimals and symbol of every EVM address in
+tokens_coins_info/coins_info.json and the USDT/USDC address files, so the first scan after
+a deploy does not download ABIs from the explorers nor read tokens one by one.
+
+    python -m dexs.warm_tokens [--coins tokens_coins_info/coins_info_1.json] [--force]
+
+Tokens are read with Multicall3 (decimals() and symbol() of chunk tokens per batch,
+concurrency batches in flight); tokens already in the store are skipped unless --force.
+A token whose symbol() cannot be decoded (bytes32 symbols) gets the coin name instead.
+Networks without multicall (Solana, Osmosis, TON) are left to their own APIs.
+'''
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import ujson as json
+from web3 import Web3
+
+from dexs import networks
+from dexs.multicall import multicall
+from dexs.web3_providers import web3_providers
+from storage.token_store import token_store
+
+logging.basicConfig(level=logging.INFO)
+
+_ROOT_DIR = Path(__file__).parent.parent.absolute()
+COINS_DIR = os.path.join(_ROOT_DIR, "tokens_coins_info")
+
+ERC20_ABI = [{"name": name, "type": "function", "stateMutability": "view", "inputs": [],
+              "outputs": [{"name": "", "type": output}]}
+             for name, output in [("decimals", "uint8"), ("symbol", "string")]]
+
+
+def evm_networks() -> dict:
+    return {network.name: network for network in vars(networks).values()
+            if isinstance(network, networks.Network) and network.multicall}
+
+
+def collect_addresses(coins_path: str, known_networks: dict) -> dict:
+    '''{network name: {checksum address: coin name}} of every network in known_networks'''
+    addresses = defaultdict(dict)
+    with open(coins_path) as file:
+        coins_info = json.load(file)
+    sources = [(coin["name"], coin.get("blockchains", {})) for coin in coins_info]
+    for dest_token in ["USDT", "USDC"]:
+        with open(os.path.join(COINS_DIR, f"{dest_token.lower()}_adresses.json")) as file:
+            sources.append((dest_token, json.load(file)))
+    for name, blockchains in sources:
+        for network_name, address in blockchains.items():
+            if network_name not in known_networks or not address:
+                continue
+            try:
+                addresses[network_name].setdefault(Web3.to_checksum_address(address), name)
+            except ValueError:
+                logging.info(f"Skipping {name} on {network_name}: {address} is not an EVM address")
+    return addresses
+
+
+async def resolve_chunk(network, chunk: list) -> tuple:
+    '''Stores decimals and symbol of (address, coin name) pairs, returns (stored, failed)'''
+    w3 = web3_providers.get(network)
+    contracts = [w3.eth.contract(address=address, abi=ERC20_ABI) for address, _ in chunk]
+    results = await asyncio.gather(*[multicall.call(network, contract.functions.decimals()) for contract in contracts],
+                                   *[multicall.call(network, contract.functions.symbol()) for contract in contracts],
+                                   return_exceptions=True)
+    stored = 0
+    for (address, name), token_decimals, symbol in zip(chunk, results[:len(chunk)], results[len(chunk):]):
+        if isinstance(token_decimals, Exception):
+            logging.info(f"No decimals() for {name} {address} on {network.name}: {token_decimals}")
+            continue
+        token_store.put(network.name, address, name if isinstance(symbol, Exception) else symbol, token_decimals)
+        stored += 1
+    return stored, len(chunk) - stored
+
+
+async def warm_up(coins_path: str, chunk: int = 250, concurrency: int = 4, force: bool = False) -> dict:
+    '''{network name: [stored, failed, already known]}'''
+    known_networks = evm_networks()
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+    jobs = []
+    for network_name, tokens in collect_addresses(coins_path, known_networks).items():
+        known = set() if force else token_store.addresses(network_name)
+        missing = [(address, name) for address, name in tokens.items() if address not in known]
+        results[network_name] = [0, 0, len(tokens) - len(missing)]
+        jobs += [(known_networks[network_name], missing[start:start + chunk]) for start in range(0, len(missing), chunk)]
+
+    async def bounded(network, tokens):
+        async with semaphore:
+            return await resolve_chunk(network, tokens)
+
+    async with web3_providers:
+        counts = await asyncio.gather(*[bounded(network, tokens) for network, tokens in jobs])
+        await token_store.drain()
+    for (network, _), (stored, failed) in zip(jobs, counts):
+        results[network.name][0] += stored
+        results[network.name][1] += failed
+    for network_name, (stored, failed, known) in results.items():
+        logging.info(f"{network_name}: stored {stored}, failed {failed}, already known {known}")
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve token decimals and symbols into the token store")
+    parser.add_argument("--coins", default=os.path.join(COINS_DIR, "coins_info.json"))
+    parser.add_argument("--chunk", type=int, default=250, help="tokens per multicall batch")
+    parser.add_argument("--concurrency", type=int, default=4, help="batches in flight")
+    parser.add_argument("--force", action="store_true", help="also re-read tokens already in the store")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    results = asyncio.run(warm_up(args.coins, args.chunk, args.concurrency, args.force))
+    logging.info(f"Warm-up of {sum(stored for stored, _, _ in results.values())} tokens "
+                 f"in {time.perf_counter() - started:.1f}s")
+    logging.info(multicall.report())
+    logging.info(web3_providers.report())
+    token_store.close()
+
+
+if __name__ == "__main__":
+    main()
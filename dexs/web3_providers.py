@@ -0,0 +1,168 @@
+import asyncio
+import logging
+
+import aiohttp
+from web3 import AsyncWeb3
+from web3._utils.encoding import FriendlyJsonSerde, Web3JsonEncoder
+from web3.providers.async_rpc import AsyncHTTPProvider
+from yarl import URL
+
+from dexs.rpc_endpoints import RpcEndpoints
+from transport.session_manager import session_manager
+
+logging.basicConfig(level=logging.INFO)
+
+
+class BatchingHTTPProvider(AsyncHTTPProvider):
+    '''
+    AsyncHTTPProvider that posts through session_manager (the RPC host as venue, endpoint
+    "rpc", the network) to the RPC endpoints of a network, picked by RpcEndpoints. Requests made in the same tick of the
+    event loop go out as one JSON-RPC batch array of up to max_batch calls and their answers
+    are matched back by id. A network whose endpoints answer a batch with anything but an
+    array gets one POST per request from then on.
+    '''
+
+    def __init__(self, network, urls: list, providers, max_batch: int = 50, request_kwargs: dict | None = None):
+        super().__init__(urls[0], request_kwargs)
+        self.network = network
+        self.endpoints = RpcEndpoints(network.name, urls, self._send, max_block_lag=network.max_block_lag)
+        self.providers = providers
+        self.max_batch = max_batch
+        self.batching = max_batch > 1
+        self.pending = []
+        self._tasks = set()
+        self.flush_handle = None
+        self.requests = 0
+        self.posts = 0
+
+    async def make_request(self, method, params):
+        request_id = next(self.request_counter)
+        request_data = FriendlyJsonSerde().json_encode(
+            {"jsonrpc": "2.0", "method": method, "params": params or [], "id": request_id}, cls=Web3JsonEncoder)
+        self.requests += 1
+        if not self.batching:
+            return self.decode_rpc_response(await self._post(request_data))
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((request_id, request_data, future))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        # the loop only keeps a weak reference to a task, a collected post would leave its awaiters hanging
+        task = asyncio.ensure_future(self._post_single(*batch[0]) if len(batch) == 1 else self._post_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _post(self, body: str) -> bytes:
+        self.posts += 1
+        return await self.endpoints.request(body)
+
+    async def _send(self, url: str, body: str) -> bytes:
+        session = await self.providers.session()
+        # one circuit per RPC host: a dead endpoint must not sideline the ones RpcEndpoints fails over to
+        response = await session.post(url, data=body, venue=URL(url).host, endpoint="rpc", network=self.network.name,
+                                      timeout=aiohttp.ClientTimeout(total=self.providers.timeout),
+                                      **self.get_request_kwargs())
+        # the body is read first, which also gives the connection back
+        body = await response.read()
+        response.raise_for_status()
+        return body
+
+    async def _post_single(self, request_id: int, request_data: str, future) -> None:
+        try:
+            response = self.decode_rpc_response(await self._post(request_data))
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(response)
+
+    async def _post_batch(self, batch: list) -> None:
+        try:
+            responses = self.decode_rpc_response(await self._post(f"[{','.join(data for _, data, _ in batch)}]"))
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        if not isinstance(responses, list):
+            logging.info(f"RPC of {self.network} does not take JSON-RPC batches, sending one request per call")
+            self.batching = False
+            await asyncio.gather(*[self._post_single(*request) for request in batch])
+            return
+        by_id = {response.get("id"): response for response in responses}
+        for request_id, _, future in batch:
+            if future.done():
+                continue
+            if request_id in by_id:
+                future.set_result(by_id[request_id])
+            else:
+                future.set_exception(ValueError(f"No answer to JSON-RPC request {request_id} in the batch"))
+
+
+class Web3Providers:
+    '''
+    One AsyncWeb3 per network, shared by every DexPrice. Contract reads are awaited, so a
+    decimals lookup or a pool read overlaps with the other requests of the scan instead of
+    holding the event loop for a whole RPC round trip. All providers post through
+    session_manager and batch the requests of a tick (see BatchingHTTPProvider), so RPC
+    calls share its connection pools, rate limits, circuit breaker, metrics, mock routing
+    and record/replay with the REST calls.
+    Used as `async with web3_providers:` (which holds session_manager open), or opened on first use.
+    '''
+
+    def __init__(self,
+                 timeout: float = 10,
+                 max_batch: int = 50):
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.providers = {}
+        self._entered = False
+
+    async def session(self):
+        if session_manager.closed:
+            await session_manager.open()
+        return session_manager
+
+    def get(self, network) -> AsyncWeb3:
+        if network.name not in self.providers:
+            provider = BatchingHTTPProvider(network, list(network.rpcs), self, self.max_batch)
+            self.providers[network.name] = AsyncWeb3(provider)
+        return self.providers[network.name]
+
+    async def close(self):
+        if self._entered:
+            self._entered = False
+            logging.info(f"Web3 providers closed: {', '.join(self.providers) or 'none used'}")
+            await session_manager.__aexit__(None, None, None)
+
+    def report(self) -> str:
+        lines = ["Web3 providers:"]
+        for name, w3 in self.providers.items():
+            provider = w3.provider
+            lines.append(f"    {name}: {provider.requests} requests in {provider.posts} posts"
+                         f"{'' if provider.batching else ', batches off'}")
+            lines += [f"        {line}" for line in provider.endpoints.report()]
+        return "\n".join(lines)
+
+    async def __aenter__(self):
+        await session_manager.__aenter__()
+        self._entered = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+web3_providers = Web3Providers()
@@ -1,6 +1,7 @@
 import asyncio
 import ujson as json
 from find_spread.find_spread import calculate_spread, cex_prices, dex_prices
+from transport.session_manager import session_manager
 
 SRC_TOKEN = "OSMO"
 DEST_TOKEN = "USDC"
@@ -18,8 +19,9 @@ def get_token_from_list(token: str) -> dict:
 
 async def main(src_token: str, dest_token: str, part_of_files) -> None:
     src_token = get_token_from_list(src_token)
-    exchanges = await cex_prices(src_token, dest_token)
-    aggregators = await dex_prices(src_token, dest_token)
+    async with session_manager as session:
+        exchanges = await cex_prices(src_token, dest_token, session)
+        aggregators = await dex_prices(src_token, dest_token, session)
     print(f"\n\n\nCEXES - {exchanges}\n\n\nDEXES - {aggregators}\n\n\n")
     calculate_spread(exchanges, aggregators, part_of_files)
 
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+
+async def gather_within(labelled_coros: list, deadline: float | None = None) -> tuple:
+    '''
+    Runs (label, coroutine) pairs like asyncio.gather, but when deadline (event loop time)
+    passes the unfinished ones are cancelled. Returns the results that arrived in time
+    and the labels of the venues that did not.
+    '''
+    if deadline is None:
+        results = await asyncio.gather(*[coro for _, coro in labelled_coros])
+        return list(results), []
+    tasks = [(label, asyncio.ensure_future(coro)) for label, coro in labelled_coros]
+    if not tasks:
+        return [], []
+    timeout = max(deadline - asyncio.get_running_loop().time(), 0)
+    done, pending = await asyncio.wait([task for _, task in tasks], timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    results = []
+    missing = []
+    for label, task in tasks:
+        if task in done and task.exception() is None:
+            results.append(task.result())
+        else:
+            if task in done:
+                logging.error(f"Error in {' '.join(label)}: {task.exception()}")
+            missing.append(label)
+    return results, missing
+
+
+async def as_completed_within(labelled_coros: list, deadline: float | None = None, missing: list | None = None):
+    '''
+    Yields (label, result) of (label, coroutine) pairs in the order they finish. When deadline
+    (event loop time) passes, the rest are cancelled and their labels added to missing.
+    '''
+    tasks = {asyncio.ensure_future(coro): label for label, coro in labelled_coros}
+    pending = set(tasks)
+    loop = asyncio.get_running_loop()
+    try:
+        while pending:
+            timeout = max(deadline - loop.time(), 0) if deadline is not None else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                if task.exception() is not None:
+                    logging.error(f"Error in {' '.join(tasks[task])}: {task.exception()}")
+                    if missing is not None:
+                        missing.append(tasks[task])
+                    continue
+                yield tasks[task], task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            if missing is not None:
+                missing += [tasks[task] for task in pending]
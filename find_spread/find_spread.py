@@ -1,9 +1,8 @@
 import asyncio
-import aiohttp
 import ujson as json
-import pandas as pd
 import logging
 import time
+from functools import partial
 
 from cexs.cex_exchanges import Bybit_exchange, Binance_exchange, Bingx_exchange, Bitfinex_exchange, Bitget_exchange, \
     Bitmex_exchange, Bitstamp_exchange, Coinbase_exchange, Coinw_exchange, Cryptocom_exchange, Deribit_exchange, \
@@ -14,6 +13,14 @@ from cexs.async_get_cex_price import BybitPrice, BingxPrice, BitfinexGeminiPrice
     BitmexPrice, CexPrice, CryptocomPrice, DeribitPrice, GarantexPrice, HuobiPrice, KrakenPrice, OkxPrice, \
     PhemexPrice, \
     PoloniexPrice, YoubitPrice, CoinexPrice, BackpackPrice
+from cexs.book_tickers import BookTickerSnapshot
+from cexs.market_universe import MarketUniverse
+from cexs.ws_order_books import OrderBookStreams
+from find_spread.deadline import as_completed_within, gather_within
+from find_spread.quote_reducer import quote_tables, reduce_quotes
+from find_spread.spread_matrix import SpreadMatrix
+from find_spread.spread_rules import quote_amount, signal_key, spread_signals
+from find_spread.streaming_spread import QuoteState
 from dexs.aggregators.dexscreener import DexscreenerAggregatorApi
 from dexs.aggregators.paraswap import ParaswapAggregatorApi
 from dexs.aggregators.kyberswap import KyberswapAggregatorApi
@@ -24,122 +31,59 @@ from dexs.exchanges.osmosis import OsmosisApi
 from dexs.exchanges.stonfi import StonFiApi
 from dexs.networks import Ethereum, BinanceSmartChain, Arbitrum, Optimism, Polygon, Avalanche, Solana, Osmosis, Base, \
     TON
-from aiohttp import ClientTimeout
+from dexs.multicall import multicall
+from dexs.web3_providers import web3_providers
+from storage.quote_history import quote_history
+from storage.result_writer import result_writer
+from storage.token_store import token_store
+from telemetry.venue_metrics import venue_metrics
+from transport.circuit_breaker import venue_label
+from transport.rate_limiter import scan_key
+from transport.session_manager import session_manager
 
 logging.basicConfig(level=logging.INFO)
 
 
-def calculate_spread(exchanges, aggregators, part_of_files):
+def calculate_spread(exchanges, aggregators, part_of_files) -> set:
+    '''Writes the spreads of one token to the results and signal files, returns signal_key() of each signal written'''
     current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
     min_ask_exchange = min_ask_value = min_ask_pair = asks_volumes = None
     max_bid_exchange = max_bid_value = max_bid_pair = bids_volumes = None
     aggregator_sell = network_sell = price_sell = dex_sell = data_sell = None
     aggregator_buy = network_buy = price_buy = dex_buy = data_buy = None
 
-    min_asks_exist = 'min_asks_price' in exchanges[0]['data'] if exchanges else False
-    max_bids_exist = 'max_bids_price' in exchanges[0]['data'] if exchanges else False
-
-    dex_price_sell_exist = False
-    dex_price_buy_exist = False
-
-    for aggregator in aggregators:
-        if 'price_sell' in aggregator:
-            dex_price_sell_exist = True
-        if 'price_buy' in aggregator:
-            dex_price_buy_exist = True
+    best = reduce_quotes(exchanges, aggregators)
+    spreads = {signal["kind"]: signal for signal in spread_signals(best)}
+    min_asks_exist = best.min_ask is not None
+    max_bids_exist = best.max_bid is not None
+    dex_price_sell_exist = best.dex_sell is not None
+    dex_price_buy_exist = best.dex_buy is not None
 
     if min_asks_exist:
-        df_cex_min = pd.DataFrame([
-            {
-                'exchange': d['exchange'],
-                'pair': d['data'].get('pair', ''),
-                'min_asks_price': d['data'].get('min_asks_price', ''),
-                'asks_volumes': d['data'].get('asks_volumes', '')
-            } for d in exchanges if d.get('data')
-        ])
-        print(f"\n{df_cex_min}\n")
-        if not df_cex_min.empty:
-            min_ask_row = df_cex_min.dropna(
-                subset=['min_asks_price']).loc[df_cex_min['min_asks_price'].idxmin()]
-            min_ask_exchange, min_ask_value, min_ask_pair, asks_volumes = (
-                min_ask_row['exchange'], min_ask_row['min_asks_price'],
-                min_ask_row['pair'], min_ask_row['asks_volumes']
-            )
+        min_ask_exchange, min_ask_value, min_ask_pair, asks_volumes = (
+            best.min_ask.exchange, best.min_ask.price, best.min_ask.pair, best.min_ask.volumes
+        )
 
     if max_bids_exist:
-        df_cex_max = pd.DataFrame([
-            {
-                'exchange': d['exchange'],
-                'pair': d['data'].get('pair', ''),
-                'max_bids_price': d['data'].get('max_bids_price', ''),
-                'bids_volumes': d['data'].get('bids_volumes', '')
-            } for d in exchanges if d.get('data')
-        ])
-        print(f"\n{df_cex_max}\n")
-        if not df_cex_max.empty:
-            max_bid_row = df_cex_max.dropna(
-                subset=['max_bids_price']).loc[df_cex_max['max_bids_price'].idxmax()]
-            max_bid_exchange, max_bid_value, max_bid_pair, bids_volumes = (
-                max_bid_row['exchange'], max_bid_row['max_bids_price'],
-                max_bid_row['pair'], max_bid_row['bids_volumes']
-            )
+        max_bid_exchange, max_bid_value, max_bid_pair, bids_volumes = (
+            best.max_bid.exchange, best.max_bid.price, best.max_bid.pair, best.max_bid.volumes
+        )
 
     if dex_price_sell_exist:
-        df_dex_sell = pd.DataFrame([
-            {
-                'aggregator_sell': d.get('aggregator_sell', ''),
-                'network_sell': d.get('network_sell', ''),
-                'price_sell': d.get('price_sell', ''),
-                'dex_sell': d.get('dex_sell', ''),
-                'data_sell': d.get('data_sell', ''),
-                'src_sell_address': d.get('src_sell_address', ''),
-                'dest_sell_address': d.get('dest_sell_address', '')
-            } for d in aggregators if d.get('price_sell')
-        ])
-        print(f"\n{df_dex_sell}\n")
-        if not df_dex_sell.empty:
-            max_dex_sell_price = df_dex_sell.dropna(
-                subset=['price_sell']).loc[df_dex_sell['price_sell'].idxmax()]
-            aggregator_sell, network_sell, price_sell, dex_sell, data_sell, src_sell_address, dest_sell_address = (
-                max_dex_sell_price['aggregator_sell'],
-                max_dex_sell_price['network_sell'],
-                max_dex_sell_price['price_sell'],
-                max_dex_sell_price['dex_sell'],
-                max_dex_sell_price['data_sell'],
-                max_dex_sell_price['src_sell_address'],
-                max_dex_sell_price['dest_sell_address'],
-            )
+        sell = best.dex_sell
+        aggregator_sell, network_sell, price_sell, dex_sell, data_sell, src_sell_address, dest_sell_address = (
+            sell.aggregator, sell.network, sell.price, sell.dex, sell.data, sell.src_address, sell.dest_address
+        )
 
     if dex_price_buy_exist:
-        df_dex_buy = pd.DataFrame([
-            {
-                'aggregator_buy': d.get('aggregator_buy', ''),
-                'network_buy': d.get('network_buy', ''),
-                'price_buy': d.get('price_buy', ''),
-                'dex_buy': d.get('dex_buy', ''),
-                'data_buy': d.get('data_buy', ''),
-                'src_buy_address': d.get('src_buy_address', ''),
-                'dest_buy_address': d.get('dest_buy_address', '')
-            } for d in aggregators if d.get('price_buy')
-        ])
-        print(f"\n{df_dex_buy}\n")
-        if not df_dex_buy.empty:
-            min_dex_buy_price = df_dex_buy.dropna(
-                subset=['price_buy']).loc[df_dex_buy['price_buy'].idxmin()]
-            aggregator_buy, network_buy, price_buy, dex_buy, data_buy, src_buy_address, dest_buy_address = (
-                min_dex_buy_price['aggregator_buy'],
-                min_dex_buy_price['network_buy'],
-                min_dex_buy_price['price_buy'],
-                min_dex_buy_price['dex_buy'],
-                min_dex_buy_price['data_buy'],
-                min_dex_buy_price['src_buy_address'],
-                min_dex_buy_price['dest_buy_address']
-            )
+        buy = best.dex_buy
+        aggregator_buy, network_buy, price_buy, dex_buy, data_buy, src_buy_address, dest_buy_address = (
+            buy.aggregator, buy.network, buy.price, buy.dex, buy.data, buy.src_address, buy.dest_address
+        )
 
     if min_asks_exist and max_bids_exist and dex_price_sell_exist and dex_price_buy_exist:
-        if price_sell > max_bid_value and price_buy < min_ask_value:
-            percents_spread = (float(price_sell) /
-                               float(price_buy) * 100) - 100
+        if "dex_dex" in spreads:
+            percents_spread, levels = spreads["dex_dex"]["spread"], spreads["dex_dex"]["levels"]
 
             result_dex_output = (
                 f"\n\n-------------------------------------------------\n\n"
@@ -160,7 +104,7 @@ def calculate_spread(exchanges, aggregators, part_of_files):
             print(result_dex_output)
 
             if network_buy == "Ethereum" or network_sell == "Ethereum":
-                if percents_spread >= 15:
+                if "" in levels:
                     signal_output = (
                         f"\n\n-------------------------------------------------\n\n"
                         f"Timestamp: {current_time}\n\n"
@@ -181,18 +125,10 @@ def calculate_spread(exchanges, aggregators, part_of_files):
                     )
                     print(f"**********SIGNAL**********")
                     print(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_min.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_max.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_sell.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_buy.to_string(index=False) + '\n\n')
+                    result_writer.write(f'./results/async_signals_{part_of_files}.txt', signal_output,
+                                        partial(quote_tables, exchanges, aggregators))
             else:
-                if percents_spread >= 3:
+                if "" in levels:
                     signal_output = (
                         f"\n\n-------------------------------------------------\n\n"
                         f"Timestamp: {current_time}\n\n"
@@ -212,18 +148,10 @@ def calculate_spread(exchanges, aggregators, part_of_files):
                     )
                     print(f"**********SIGNAL**********")
                     print(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_min.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_max.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_sell.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_buy.to_string(index=False) + '\n\n')
-
-                if percents_spread >= 30:
+                    result_writer.write(f'./results/async_signals_{part_of_files}.txt', signal_output,
+                                        partial(quote_tables, exchanges, aggregators))
+
+                if "_30" in levels:
                     signal_output = (
                         f"\n\n-------------------------------------------------\n\n"
                         f"Timestamp: {current_time}\n\n"
@@ -243,24 +171,15 @@ def calculate_spread(exchanges, aggregators, part_of_files):
                     )
                     print(f"**********SIGNAL**********")
                     print(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_cex_min.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_cex_max.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_dex_sell.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_dex_buy.to_string(index=False) + '\n\n')
-
-            with open(f'./results/async_results_{part_of_files}.txt', 'a') as file:
-                file.write(result_dex_output)
-
-        if price_sell > max_bid_value and price_buy > min_ask_value and min_ask_value != 0:
-            percents_spread = (float(price_sell) /
-                               float(min_ask_value) * 100) - 100
-            asks_amount = float(min_ask_value) * float(asks_volumes)
+                    result_writer.write(f'./results/async_signals_{part_of_files}_30.txt', signal_output,
+                                        partial(quote_tables, exchanges, aggregators))
+
+            result_writer.write(f'./results/async_results_{part_of_files}.txt', result_dex_output)
+
+        if "cex_dex" in spreads:
+            percents_spread, asks_amount, levels = (
+                spreads["cex_dex"]["spread"], spreads["cex_dex"]["amount"], spreads["cex_dex"]["levels"]
+            )
 
             result_dex_output = (
                 f"\n\n-------------------------------------------------\n\n"
@@ -279,7 +198,7 @@ def calculate_spread(exchanges, aggregators, part_of_files):
             print(result_dex_output)
 
             if network_sell == "Ethereum":
-                if percents_spread >= 10 and asks_amount >= 100:
+                if "" in levels:
                     signal_output = (
                         f"\n\n-------------------------------------------------\n\n"
                         f"Timestamp: {current_time}\n\n"
@@ -299,18 +218,10 @@ def calculate_spread(exchanges, aggregators, part_of_files):
                     )
                     print(f"**********SIGNAL**********")
                     print(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_min.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_max.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_sell.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_buy.to_string(index=False) + '\n\n')
+                    result_writer.write(f'./results/async_signals_{part_of_files}.txt', signal_output,
+                                        partial(quote_tables, exchanges, aggregators))
             else:
-                if percents_spread >= 3 and asks_amount >= 50:
+                if "" in levels:
                     signal_output = (
                         f"\n\n-------------------------------------------------\n\n"
                         f"Timestamp: {current_time}\n\n"
@@ -330,18 +241,10 @@ def calculate_spread(exchanges, aggregators, part_of_files):
                     )
                     print(f"**********SIGNAL**********")
                     print(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_min.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_max.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_sell.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_buy.to_string(index=False) + '\n\n')
-
-                if percents_spread >= 30 and asks_amount >= 200:
+                    result_writer.write(f'./results/async_signals_{part_of_files}.txt', signal_output,
+                                        partial(quote_tables, exchanges, aggregators))
+
+                if "_30" in levels:
                     signal_output = (
                         f"\n\n-------------------------------------------------\n\n"
                         f"Timestamp: {current_time}\n\n"
@@ -361,24 +264,15 @@ def calculate_spread(exchanges, aggregators, part_of_files):
                     )
                     print(f"**********SIGNAL**********")
                     print(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_cex_min.to_string(index=False) + '\n\n')
-                    with open(f'results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_cex_max.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_dex_sell.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_dex_buy.to_string(index=False) + '\n\n')
-
-            with open(f'./results/async_results_{part_of_files}.txt', 'a') as file:
-                file.write(result_dex_output)
-
-        if price_sell < max_bid_value and price_buy < min_ask_value:
-            percents_spread = (float(max_bid_value) /
-                               float(price_buy) * 100) - 100
-            asks_amount = float(max_bid_value) * float(bids_volumes)
+                    result_writer.write(f'./results/async_signals_{part_of_files}_30.txt', signal_output,
+                                        partial(quote_tables, exchanges, aggregators))
+
+            result_writer.write(f'./results/async_results_{part_of_files}.txt', result_dex_output)
+
+        if "dex_cex" in spreads:
+            percents_spread, asks_amount, levels = (
+                spreads["dex_cex"]["spread"], spreads["dex_cex"]["amount"], spreads["dex_cex"]["levels"]
+            )
 
             result_dex_output = (
                 f"\n\n-------------------------------------------------\n\n"
@@ -396,7 +290,7 @@ def calculate_spread(exchanges, aggregators, part_of_files):
             print(result_dex_output)
 
             if network_buy == "Ethereum":
-                if percents_spread >= 10 and asks_amount >= 100:
+                if "" in levels:
                     signal_output = (
                         f"\n\n-------------------------------------------------\n\n"
                         f"Timestamp: {current_time}\n\n"
@@ -416,19 +310,11 @@ def calculate_spread(exchanges, aggregators, part_of_files):
                     )
                     print(f"**********SIGNAL**********")
                     print(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_min.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_max.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_sell.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_buy.to_string(index=False) + '\n\n')
+                    result_writer.write(f'./results/async_signals_{part_of_files}.txt', signal_output,
+                                        partial(quote_tables, exchanges, aggregators))
 
             else:
-                if percents_spread >= 3 and asks_amount >= 50:
+                if "" in levels:
                     signal_output = (
                         f"\n\n-------------------------------------------------\n\n"
                         f"Timestamp: {current_time}\n\n"
@@ -448,18 +334,10 @@ def calculate_spread(exchanges, aggregators, part_of_files):
                     )
                     print(f"**********SIGNAL**********")
                     print(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_min.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_cex_max.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_sell.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                        file.write(df_dex_buy.to_string(index=False) + '\n\n')
-
-                if percents_spread >= 30 and asks_amount >= 200:
+                    result_writer.write(f'./results/async_signals_{part_of_files}.txt', signal_output,
+                                        partial(quote_tables, exchanges, aggregators))
+
+                if "_30" in levels:
                     signal_output = (
                         f"\n\n-------------------------------------------------\n\n"
                         f"Timestamp: {current_time}\n\n"
@@ -479,25 +357,15 @@ def calculate_spread(exchanges, aggregators, part_of_files):
                     )
                     print(f"**********SIGNAL**********")
                     print(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(signal_output)
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_cex_min.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_cex_max.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_dex_sell.to_string(index=False) + '\n\n')
-                    with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                        file.write(df_dex_buy.to_string(index=False) + '\n\n')
-
-            with open(f'./results/async_results_{part_of_files}.txt', 'a') as file:
-                file.write(result_dex_output)
-
-    if min_asks_exist and max_bids_exist:
-        percents_spread = (float(max_bid_value) /
-                           float(min_ask_value) * 100) - 100
-        asks_amount = float(min_ask_value) * float(asks_volumes)
-        bids_amount = float(max_bid_value) * float(bids_volumes)
+                    result_writer.write(f'./results/async_signals_{part_of_files}_30.txt', signal_output,
+                                        partial(quote_tables, exchanges, aggregators))
+
+            result_writer.write(f'./results/async_results_{part_of_files}.txt', result_dex_output)
+
+    if "cex_cex" in spreads:
+        percents_spread, levels = spreads["cex_cex"]["spread"], spreads["cex_cex"]["levels"]
+        asks_amount = quote_amount(min_ask_value, asks_volumes)
+        bids_amount = quote_amount(max_bid_value, bids_volumes)
 
         result_output = (
             f"\n\n-------------------------------------------------\n\n"
@@ -513,31 +381,28 @@ def calculate_spread(exchanges, aggregators, part_of_files):
         )
         print(result_output)
 
-        if percents_spread >= 3 and asks_amount >= 50 and bids_amount >= 50:
+        if "" in levels:
             print(f"**********SIGNAL**********")
             print(result_output)
-            with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                file.write(result_output)
-            with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                file.write(df_cex_min.to_string(index=False) + '\n\n')
-            with open(f'./results/async_signals_{part_of_files}.txt', 'a') as file:
-                file.write(df_cex_max.to_string(index=False) + '\n\n')
-
-        if percents_spread >= 30 and asks_amount >= 200 and bids_amount >= 200:
+            result_writer.write(f'./results/async_signals_{part_of_files}.txt', result_output,
+                                partial(quote_tables, exchanges))
+
+        if "_30" in levels:
             print(f"**********SIGNAL**********")
             print(result_output)
-            with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                file.write(result_output)
-            with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                file.write(df_cex_min.to_string(index=False) + '\n\n')
-            with open(f'./results/async_signals_{part_of_files}_30.txt', 'a') as file:
-                file.write(df_cex_max.to_string(index=False) + '\n\n')
+            result_writer.write(f'./results/async_signals_{part_of_files}_30.txt', result_output,
+                                partial(quote_tables, exchanges))
+
+        result_writer.write(f'./results/async_results_{part_of_files}.txt', result_output)
 
-        with open(f'./results/async_results_{part_of_files}.txt', 'a') as file:
-            file.write(result_output)
+    return {signal_key(signal) for signal in spreads.values() if signal["levels"]}
 
 
-async def cex_prices(src_token, dest_token):
+def cex_price_tasks(src_token, dest_token, session, snapshot=None, streams=None, universe=None) -> tuple:
+    '''
+    Quotes already known from streams/snapshot, and (label, coroutine) pairs
+    of the order book requests still to be made
+    '''
     cexs = {
         Bybit_exchange: BybitPrice,
         Binance_exchange: CexPrice,
@@ -567,31 +432,60 @@ async def cex_prices(src_token, dest_token):
         Lbank_exchange: BitgetCoinwKucoinCexioLbankPrice
     }
 
-    cexs_price_list = []
-    cex_price_info = {}
+    results = []
+    tasks = []
     if src_token not in ["USDT", "USDC"]:
-        async with aiohttp.ClientSession(timeout=ClientTimeout(total=10)) as session:
-            tasks = []
-            for cex, obj in cexs.items():
-                cex.src_token = src_token["name"]
-                cex.dest_token = dest_token
-                exchange = obj(exchange=cex)
-                tasks.append(exchange.get_price(session=session))
-
-            results = await asyncio.gather(*tasks)
-            for result in results:
-                logging.info(f"result {result}")
+        for cex, obj in cexs.items():
+            request = cex.spec(src_token["name"], dest_token)
+            if not session.breaker.is_available(request.name):
+                continue
+            if universe and universe.has_pair(request.name, request.pair) is False:
+                continue
+            if streams and streams.covers(request.name):
+                result = streams.get_price(request.name, request.pair)
                 if result:
-                    cex_price_info = {
-                        "exchange": result["exchange"], "data": result}
-                    cexs_price_list.append(cex_price_info)
-                    logging.info(
-                        f"\nEXIT Print from cex_prices\ncex_price_info: {cex_price_info}\n")
-
+                    results.append(result)
+                    continue
+            if snapshot and snapshot.covers(request.name):
+                result = snapshot.get_price(request.name, request.pair)
+                if result is None:
+                    # not in the bulk tickers of the venue: not listed there
+                    continue
+                if result["asks_fill_price"] is not None and result["bids_fill_price"] is not None:
+                    results.append(result)
+                    continue
+                # the top level alone cannot fill TICKET_SIZE, the depth request prices it
+            exchange = obj(exchange=request)
+            tasks.append(((request.name, ""), exchange.get_price(session=session)))
+    return results, tasks
+
+
+async def cex_prices(src_token, dest_token, session=None, snapshot=None, streams=None, universe=None,
+                     deadline=None, missing=None):
+    '''deadline: event loop time after which unfinished venues are cancelled and added to missing'''
+    if session is None:
+        async with session_manager as session:
+            return await cex_prices(src_token, dest_token, session, snapshot, streams, universe, deadline, missing)
+
+    results, tasks = cex_price_tasks(src_token, dest_token, session, snapshot, streams, universe)
+    arrived, late = await gather_within(tasks, deadline)
+    results += arrived
+    if missing is not None:
+        missing += late
+    cexs_price_list = []
+    for result in results:
+        logging.info(f"result {result}")
+        if result:
+            cex_price_info = {
+                "exchange": result["exchange"], "data": result}
+            cexs_price_list.append(cex_price_info)
+            logging.info(
+                f"\nEXIT Print from cex_prices\ncex_price_info: {cex_price_info}\n")
     return cexs_price_list
 
 
-async def dex_prices(src_token, dest_token):
+def dex_price_tasks(src_token, dest_token, session) -> tuple:
+    '''(label, coroutine) pairs of the DEX sell and buy quotes of one token'''
     aggregators = {'Paraswap': ParaswapAggregatorApi,
                    'Kyberswap': KyberswapAggregatorApi,
                    'OpenOcean': OpenoceanAggregatorApi,
@@ -621,130 +515,292 @@ async def dex_prices(src_token, dest_token):
         dest_token = json.load(open("./tokens_coins_info/usdc_adresses.json"))
     else:
         print(f"Not USDT or USDC")
-    aggregator_price_info = {}
-    aggregator_price_list = []
-    async with aiohttp.ClientSession(timeout=ClientTimeout(total=10)) as session:
-        tasks_dex_sell = []
-        tasks_dex_buy = []
-        for name, aggregator in aggregators.items():
-            for network in networks:
-                if src_token not in ["USDT", "USDC"]:
-                    if network.name in src_token["blockchains"]:
-                        if name not in ['Dexscreener', 'Stonfi', 'Osmosis']:
-                            aggregator_object_sell = aggregator(
-                                src_token=src_token["blockchains"][network.name],
-                                dest_token=dest_token[network.name],
-                                name=name,
-                                network=network
-                            )
-                            tasks_dex_sell.append(
-                                aggregator_object_sell.get_price(session=session))
-
-                            aggregator_object_buy = aggregator(
-                                src_token=dest_token[network.name],
-                                dest_token=src_token["blockchains"][network.name],
-                                name=name,
-                                network=network
-                            )
-                            tasks_dex_buy.append(
-                                aggregator_object_buy.get_price(session=session))
-                        else:
-                            aggregator_object_sell = aggregator(
-                                src_token=src_token["blockchains"][network.name],
-                                dest_token=dest_token[network.name],
-                                name=name,
-                                network=network
-                            )
-                            tasks_dex_sell.append(
-                                aggregator_object_sell.get_price(session=session))
-                            tasks_dex_buy.append(
-                                aggregator_object_sell.get_price(session=session))
-
-        results_dex_sell = await asyncio.gather(*tasks_dex_sell)
-        results_dex_buy = await asyncio.gather(*tasks_dex_buy)
-
-        print(
-            f"\n*********RESULTS DEX SELL: {results_dex_sell}\n\n*********RESULTS DEX BUY: {results_dex_buy}\n\n")
-
-        for result_dex_sell in results_dex_sell:
-            print(f"\n*********RESULT DEX SELL: {result_dex_sell}\n\n")
-            if result_dex_sell:
-                if result_dex_sell["price"] != 0 and result_dex_sell["price"] != None:
-                    if "data" in result_dex_sell:
-                        aggregator_price_info = {"aggregator_sell": result_dex_sell["aggregator"],
-                                                 "network_sell": result_dex_sell["network"],
-                                                 "src_sell_address": result_dex_sell["src_address"],
-                                                 "dest_sell_address": result_dex_sell["dest_address"],
-                                                 "price_sell": float(result_dex_sell["price"]),
-                                                 "dex_sell": result_dex_sell["dex"],
-                                                 "data_sell": result_dex_sell["data"]}
+    tasks_dex_sell = []
+    tasks_dex_buy = []
+    for name, aggregator in aggregators.items():
+        for network in networks:
+            if not session.breaker.is_available(name, network.name):
+                continue
+            if src_token not in ["USDT", "USDC"]:
+                if network.name in src_token["blockchains"]:
+                    if name not in ['Dexscreener', 'Stonfi', 'Osmosis']:
+                        aggregator_object_sell = aggregator(
+                            src_token=src_token["blockchains"][network.name],
+                            dest_token=dest_token[network.name],
+                            name=name,
+                            network=network
+                        )
+                        tasks_dex_sell.append(
+                            ((name, network.name), aggregator_object_sell.get_price(session=session)))
+
+                        aggregator_object_buy = aggregator(
+                            src_token=dest_token[network.name],
+                            dest_token=src_token["blockchains"][network.name],
+                            name=name,
+                            network=network
+                        )
+                        tasks_dex_buy.append(
+                            ((name, network.name), aggregator_object_buy.get_price(session=session)))
                     else:
-                        aggregator_price_info = {"aggregator_sell": result_dex_sell["aggregator"],
-                                                 "network_sell": result_dex_sell["network"],
-                                                 "src_sell_address": result_dex_sell["src_address"],
-                                                 "dest_sell_address": result_dex_sell["dest_address"],
-                                                 "price_sell": float(result_dex_sell["price"]),
-                                                 "dex_sell": result_dex_sell["dex"],
-                                                 "data_sell": ""}
+                        aggregator_object_sell = aggregator(
+                            src_token=src_token["blockchains"][network.name],
+                            dest_token=dest_token[network.name],
+                            name=name,
+                            network=network
+                        )
+                        tasks_dex_sell.append(
+                            ((name, network.name), aggregator_object_sell.get_price(session=session)))
+                        tasks_dex_buy.append(
+                            ((name, network.name), aggregator_object_sell.get_price(session=session)))
+
+    return tasks_dex_sell, tasks_dex_buy
+
+
+def dex_sell_info(result_dex_sell) -> dict | None:
+    if result_dex_sell and result_dex_sell["price"] != 0 and result_dex_sell["price"] != None:
+        return {"aggregator_sell": result_dex_sell["aggregator"],
+                "network_sell": result_dex_sell["network"],
+                "src_sell_address": result_dex_sell["src_address"],
+                "dest_sell_address": result_dex_sell["dest_address"],
+                "price_sell": float(result_dex_sell["price"]),
+                "dex_sell": result_dex_sell["dex"],
+                "data_sell": result_dex_sell.get("data", "")}
+    return None
+
+
+def dex_buy_info(result_dex_buy) -> dict | None:
+    if result_dex_buy and result_dex_buy["price"] != 0 and result_dex_buy["price"] != None:
+        if result_dex_buy["aggregator"] in ['Dexscreener', 'Stonfi', 'Osmosis']:
+            price_buy = float(result_dex_buy["price"])
+        else:
+            price_buy = 1 / float(result_dex_buy["price"])
+        return {"aggregator_buy": result_dex_buy["aggregator"],
+                "network_buy": result_dex_buy["network"],
+                "src_buy_address": result_dex_buy["src_address"],
+                "dest_buy_address": result_dex_buy["dest_address"],
+                "price_buy": price_buy,
+                "dex_buy": result_dex_buy["dex"],
+                "data_buy": result_dex_buy.get("data", "")}
+    return None
+
+
+async def dex_prices(src_token, dest_token, session=None, deadline=None, missing=None):
+    if session is None:
+        async with session_manager as session:
+            return await dex_prices(src_token, dest_token, session, deadline, missing)
+
+    tasks_dex_sell, tasks_dex_buy = dex_price_tasks(src_token, dest_token, session)
+    (results_dex_sell, late_sell), (results_dex_buy, late_buy) = await asyncio.gather(
+        gather_within(tasks_dex_sell, deadline), gather_within(tasks_dex_buy, deadline))
+    if missing is not None:
+        missing += list(dict.fromkeys(late_sell + late_buy))
+
+    print(
+        f"\n*********RESULTS DEX SELL: {results_dex_sell}\n\n*********RESULTS DEX BUY: {results_dex_buy}\n\n")
+
+    aggregator_price_list = []
+    for result_dex_sell in results_dex_sell:
+        print(f"\n*********RESULT DEX SELL: {result_dex_sell}\n\n")
+        aggregator_price_info = dex_sell_info(result_dex_sell)
+        if aggregator_price_info:
             aggregator_price_list.append(aggregator_price_info)
-        for result_dex_buy in results_dex_buy:
-            print(f"\n*********RESULT DEX BUY: {result_dex_buy}\n\n")
-            if result_dex_buy:
-                if result_dex_buy["price"] != 0 and result_dex_buy["price"] != None:
-                    if result_dex_buy["aggregator"] in ['Dexscreener', 'Stonfi', 'Osmosis']:
-                        if "data" in result_dex_buy:
-                            aggregator_price_info = {"aggregator_buy": result_dex_buy["aggregator"],
-                                                     "network_buy": result_dex_buy["network"],
-                                                     "src_buy_address": result_dex_buy["src_address"],
-                                                     "dest_buy_address": result_dex_buy["dest_address"],
-                                                     "price_buy": float(result_dex_buy["price"]),
-                                                     "dex_buy": result_dex_buy["dex"],
-                                                     "data_buy": result_dex_buy["data"]}
-                        else:
-                            aggregator_price_info = {"aggregator_buy": result_dex_buy["aggregator"],
-                                                     "network_buy": result_dex_buy["network"],
-                                                     "src_buy_address": result_dex_buy["src_address"],
-                                                     "dest_buy_address": result_dex_buy["dest_address"],
-                                                     "price_buy": float(result_dex_buy["price"]),
-                                                     "dex_buy": result_dex_buy["dex"],
-                                                     "data_buy": ""}
-                    else:
-                        if "data" in result_dex_buy:
-                            aggregator_price_info = {"aggregator_buy": result_dex_buy["aggregator"],
-                                                     "network_buy": result_dex_buy["network"],
-                                                     "src_buy_address": result_dex_buy["src_address"],
-                                                     "dest_buy_address": result_dex_buy["dest_address"],
-                                                     "price_buy": 1 / float(result_dex_buy["price"]),
-                                                     "dex_buy": result_dex_buy["dex"],
-                                                     "data_buy": result_dex_buy["data"]}
-                        else:
-                            aggregator_price_info = {"aggregator_buy": result_dex_buy["aggregator"],
-                                                     "network_buy": result_dex_buy["network"],
-                                                     "src_buy_address": result_dex_buy["src_address"],
-                                                     "dest_buy_address": result_dex_buy["dest_address"],
-                                                     "price_buy": 1 / float(result_dex_buy["price"]),
-                                                     "dex_buy": result_dex_buy["dex"],
-                                                     "data_buy": ""}
+    for result_dex_buy in results_dex_buy:
+        print(f"\n*********RESULT DEX BUY: {result_dex_buy}\n\n")
+        aggregator_price_info = dex_buy_info(result_dex_buy)
+        if aggregator_price_info:
             aggregator_price_list.append(aggregator_price_info)
-        logging.info(f"EXIT PRICE LIST:\n{aggregator_price_list}\n")
-        return aggregator_price_list
-
-
-async def find_spread(part_of_files: str) -> None:
-    coins_info = json.load(
-        open(f"./tokens_coins_info/coins_info_{part_of_files}.json"))
-    for src_token in coins_info:
-        print("***************************")
-        print(f"USDT - {src_token}")
-        exchanges = await cex_prices(src_token, dest_token="USDT")
-        print(f"!!!!!!!!!!!!!!!!!!!!!!!CEX{exchanges}")
-        aggregators = await dex_prices(src_token, dest_token="USDT")
-        print(f"!!!!!!!!!!!!!!!!!!!!!!!DEX{aggregators}")
-        calculate_spread(exchanges, aggregators, part_of_files)
+    logging.info(f"EXIT PRICE LIST:\n{aggregator_price_list}\n")
+    return aggregator_price_list
+
+
+async def _tagged(push, coro):
+    return push, await coro
+
+
+def signal_text(signal, title, current_time) -> str:
+    '''A QuoteState/SpreadMatrix signal as written to the signal files'''
+    signal_output = (
+        f"\n\n-------------------------------------------------\n\n"
+        f"Timestamp: {current_time}\n"
+        f"{signal['token']}/{signal['dest_token']} {title}\n"
+        f"Buy: {signal['buy']}, price: {signal['buy_price']}\n"
+        f"Sell: {signal['sell']}, price: {signal['sell_price']}\n"
+        f"Amount: {signal['amount']}\n"
+        f"Spread: {signal['spread']}%\n"
+    )
+    if signal["kind"] != "cex_cex":
+        signal_output += (
+            f"Data buy: {signal['buy_data']}\n"
+            f"Data sell: {signal['sell_data']}\n\n"
+            f"Buy token address {signal['buy_address']}, sell token address {signal['sell_address']}\n"
+        )
+    return signal_output + f"\n\n-------------------------------------------------\n\n"
+
+
+def print_early_signal(signal) -> None:
+    print(f"**********EARLY SIGNAL**********")
+    print(signal_text(signal, f"{signal['kind']} after {signal['elapsed']:.2f}s",
+                      time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())))
+
+
+def write_early_signals(state, written, part_of_files) -> None:
+    '''
+    Writes the early signals of a QuoteState the final calculate_spread pass did not write
+    (signal_key() not in written), i.e. pairings a later quote outbid before the token was done
+    '''
+    current_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+    for signal in state.signals:
+        if signal_key(signal) in written:
+            continue
+        signal_output = signal_text(signal, f"{signal['kind']} after {signal['elapsed']:.2f}s", current_time)
+        if signal["kind"] != "cex_cex":
+            signal_output += f"All data: {state.aggregators}\n\n"
+        result_writer.write(f'./results/async_early_signals_{part_of_files}.txt', signal_output)
+
+
+def write_batch_signals(matrix, part_of_files) -> None:
+    current_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+    for signal in matrix.evaluate():
+        exchanges, aggregators = matrix.quotes.get(signal['row'], ([], []))
+        signal_output = signal_text(signal, signal['kind'], current_time)
+        tables = partial(quote_tables, exchanges)
+        if signal["kind"] != "cex_cex":
+            signal_output += f"All data: {aggregators}\n\n"
+            tables = partial(quote_tables, exchanges, aggregators)
+        if signal['levels']:
+            print(f"**********SIGNAL**********")
+            print(signal_output)
+        for level in signal['levels']:
+            result_writer.write(f'./results/async_signals_{part_of_files}{level}.txt', signal_output, tables)
+        result_writer.write(f'./results/async_results_{part_of_files}.txt', signal_output)
+
+
+async def stream_prices(src_token, dest_token, session, snapshot=None, streams=None, universe=None,
+                        deadline=None, missing=None, on_signal=None) -> QuoteState:
+    '''
+    Requests CEX and DEX quotes of one token at once and pushes each into a QuoteState
+    as it lands, so on_signal fires on the first provable opportunity instead of after
+    the slowest venue.
+    '''
+    state = QuoteState(src_token["name"], dest_token, on_signal)
+    ready, cex_tasks = cex_price_tasks(src_token, dest_token, session, snapshot, streams, universe)
+    for result in ready:
+        state.push_cex(result)
+    tasks_dex_sell, tasks_dex_buy = dex_price_tasks(src_token, dest_token, session)
+    pushes = [(state.push_cex, cex_tasks),
+              (lambda result: state.push_dex_sell(dex_sell_info(result)), tasks_dex_sell),
+              (lambda result: state.push_dex_buy(dex_buy_info(result)), tasks_dex_buy)]
+    labelled_coros = [(label, _tagged(push, coro)) for push, tasks in pushes for label, coro in tasks]
+    late = []
+    async for label, (push, result) in as_completed_within(labelled_coros, deadline, late):
+        push(result)
+    if missing is not None:
+        missing += list(dict.fromkeys(late))
+    return state
+
+
+def stream_symbols(coins_info, streams, snapshot) -> dict:
+    exchanges = {
+        Binance_exchange.name: Binance_exchange,
+        Bybit_exchange.name: Bybit_exchange,
+        Okx_exchange.name: Okx_exchange,
+        Gateio_exchange.name: Gateio_exchange,
+        Kucoin_exchange.name: Kucoin_exchange
+    }
+    symbols = {}
+    for name in streams.streams:
+        cex = exchanges[name]
+        pairs = []
+        for src_token in coins_info:
+            for dest_token in ["USDT", "USDC"]:
+                pair = cex.prepare_pair(src_token["name"], dest_token)
+                if not snapshot.covers(name) or snapshot.get_price(name, pair):
+                    pairs.append(pair)
+        symbols[name] = list(dict.fromkeys(pairs))
+    return symbols
+
+
+async def scan_token(src_token, part_of_files, session, snapshot, streams, universe, budget=None,
+                     matrices=None, history=None, row=None) -> None:
+    '''
+    budget: seconds each dest token may take before slow venues are dropped
+    matrices: SpreadMatrix per dest token, in batch mode the quotes only go there
+    row: index of src_token in coins_info, its row in matrices
+    history: QuoteHistory every quote is recorded in
+    '''
+    scan_key.set(src_token["name"])
+    await snapshot.refresh_if_stale(session)
+    await universe.refresh_if_stale(session)
+    for dest_token in ["USDT", "USDC"]:
         print("***************************")
-        print(f"USDC - {src_token}")
-        exchanges = await cex_prices(src_token, dest_token="USDC")
+        print(f"{dest_token} - {src_token}")
+        deadline = asyncio.get_running_loop().time() + budget if budget else None
+        missing = []
+        on_signal = print_early_signal if matrices is None else None
+        state = await stream_prices(src_token, dest_token, session, snapshot, streams, universe,
+                                    deadline, missing, on_signal)
+        exchanges, aggregators = state.exchanges, state.aggregators
+        if history is not None:
+            history.record_state(state)
         print(f"!!!!!!!!!!!!!!!!!!!!!!!CEX{exchanges}")
-        aggregators = await dex_prices(src_token, dest_token="USDC")
         print(f"!!!!!!!!!!!!!!!!!!!!!!!DEX{aggregators}")
-        calculate_spread(exchanges, aggregators, part_of_files)
+        if missing:
+            logging.info(f"{src_token['name']}/{dest_token}: over the {budget}s budget, without "
+                         f"{', '.join(venue_label(venue, network) for venue, network in missing)}")
+            for venue, network in missing:
+                venue_metrics.deadline_miss(venue, network=network)
+        if matrices is not None:
+            matrices[dest_token].load(row, state)
+        else:
+            written = calculate_spread(exchanges, aggregators, part_of_files)
+            write_early_signals(state, written, part_of_files)
+
+
+async def find_spread(part_of_files: str, streaming: bool = False, concurrency: int = 8,
+                      budget: float | None = None, batch: bool = False, history: bool = True) -> None:
+    '''
+    concurrency: how many tokens are scanned at once in this event loop
+    budget: per token latency budget in seconds (e.g. 1.5), None waits for every venue
+    batch: collect the quotes of all tokens and find the spreads in one SpreadMatrix pass at the end
+    history: record every quote in quote_history
+    '''
+    coins_info = json.load(
+        open(f"./tokens_coins_info/coins_info_{part_of_files}.json"))
+    snapshot = BookTickerSnapshot()
+    streams = OrderBookStreams() if streaming else None
+    universe = MarketUniverse()
+    universe.load()
+    semaphore = asyncio.Semaphore(concurrency)
+    matrices = None
+    if batch:
+        tokens = [src_token["name"] for src_token in coins_info]
+        matrices = {dest_token: SpreadMatrix(tokens, dest_token) for dest_token in ["USDT", "USDC"]}
+    async with result_writer, session_manager as session, web3_providers:
+        await universe.refresh_if_stale(session)
+        if streams:
+            await snapshot.refresh(session)
+            await streams.start(session, stream_symbols(coins_info, streams, snapshot))
+
+        async def scan(row, src_token):
+            async with semaphore:
+                await scan_token(src_token, part_of_files, session, snapshot, streams, universe, budget, matrices,
+                                 quote_history if history else None, row)
+                logging.info(session.report())
+                venue_metrics.summary_if_due()
+                logging.info(f"Unlisted pairs skipped: {universe.skipped}")
+                if streams:
+                    logging.info(streams.report())
+
+        await asyncio.gather(*[scan(row, src_token) for row, src_token in enumerate(coins_info)])
+        if matrices:
+            for matrix in matrices.values():
+                write_batch_signals(matrix, part_of_files)
+        if streams:
+            await streams.stop()
+        await token_store.drain()
+    if history:
+        quote_history.flush()
+    logging.info(multicall.report())
+    logging.info(web3_providers.report())
+    logging.info(token_store.report())
+    logging.info(f"Venue telemetry:\n{venue_metrics.summary()}")
@@ -1,5 +1,4 @@
 import asyncio
-import aiohttp
 import ujson as json
 import pandas as pd
 import logging
@@ -24,7 +23,9 @@ from dexs.exchanges.osmosis import OsmosisApi
 from dexs.exchanges.stonfi import StonFiApi
 from dexs.networks import Ethereum, BinanceSmartChain, Arbitrum, Optimism, Polygon, Avalanche, Solana, Osmosis, Base, \
     TON
-from aiohttp import ClientTimeout
+from dexs.web3_providers import web3_providers
+from storage.token_store import token_store
+from transport.session_manager import session_manager
 
 logging.basicConfig(level=logging.INFO)
 
@@ -575,12 +576,10 @@ async def cex_prices(src_token, dest_token):
     cexs_price_list = []
     cex_price_info = {}
     if src_token not in ["USDT", "USDC"]:
-        async with aiohttp.ClientSession(timeout=ClientTimeout(total=10)) as session:
+        async with session_manager as session:
             tasks = []
             for cex, obj in cexs.items():
-                cex.src_token = src_token["name"]
-                cex.dest_token = dest_token
-                exchange = obj(exchange=cex)
+                exchange = obj(exchange=cex.spec(src_token["name"], dest_token))
                 tasks.append(exchange.get_price(session=session))
 
             results = await asyncio.gather(*tasks)
@@ -628,7 +627,7 @@ async def dex_prices(src_token, dest_token):
         print(f"Not USDT or USDC")
     aggregator_price_info = {}
     aggregator_price_list = []
-    async with aiohttp.ClientSession(timeout=ClientTimeout(total=10)) as session:
+    async with session_manager as session, web3_providers:
         tasks_dex_sell = []
         tasks_dex_buy = []
         for name, aggregator in aggregators.items():
@@ -667,6 +666,7 @@ async def dex_prices(src_token, dest_token):
 
         results_dex_sell = await asyncio.gather(*tasks_dex_sell)
         results_dex_buy = await asyncio.gather(*tasks_dex_buy)
+        await token_store.drain()
 
         print(
             f"\n*********RESULTS DEX SELL: {results_dex_sell}\n\n*********RESULTS DEX BUY: {results_dex_buy}\n\n")
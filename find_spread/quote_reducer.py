@@ -0,0 +1,134 @@
+class CexQuote:
+    __slots__ = ("exchange", "pair", "price", "volumes")
+
+    def __init__(self, exchange, pair, price, volumes):
+        self.exchange = exchange
+        self.pair = pair
+        self.price = price
+        self.volumes = volumes
+
+
+class DexQuote:
+    __slots__ = ("aggregator", "network", "price", "dex", "data", "src_address", "dest_address")
+
+    def __init__(self, aggregator, network, price, dex, data, src_address, dest_address):
+        self.aggregator = aggregator
+        self.network = network
+        self.price = price
+        self.dex = dex
+        self.data = data
+        self.src_address = src_address
+        self.dest_address = dest_address
+
+
+class BestQuotes:
+    __slots__ = ("min_ask", "max_bid", "dex_sell", "dex_buy")
+
+    def __init__(self, min_ask=None, max_bid=None, dex_sell=None, dex_buy=None):
+        self.min_ask = min_ask
+        self.max_bid = max_bid
+        self.dex_sell = dex_sell
+        self.dex_buy = dex_buy
+
+
+def _valid(price) -> bool:
+    return price is not None and price != ""
+
+
+def reduce_quotes(exchanges, aggregators) -> BestQuotes:
+    '''
+    One pass over the cex_prices/dex_prices lists: cheapest CEX ask, highest CEX bid
+    (TICKET_SIZE fill prices, a book too thin to fill it is left out on that side),
+    highest DEX sell and cheapest DEX buy.
+    Ties keep the first quote, like idxmin/idxmax did. Only the four winners are
+    turned into records.
+    '''
+    min_ask = max_bid = min_ask_item = max_bid_item = None
+    for item in exchanges:
+        data = item.get('data')
+        if not data:
+            continue
+        ask = data.get('asks_fill_price')
+        if _valid(ask) and (min_ask is None or ask < min_ask):
+            min_ask, min_ask_item = ask, item
+        bid = data.get('bids_fill_price')
+        if _valid(bid) and (max_bid is None or bid > max_bid):
+            max_bid, max_bid_item = bid, item
+
+    dex_sell = dex_buy = dex_sell_item = dex_buy_item = None
+    for item in aggregators:
+        price_sell = item.get('price_sell')
+        if price_sell and (dex_sell is None or price_sell > dex_sell):
+            dex_sell, dex_sell_item = price_sell, item
+        price_buy = item.get('price_buy')
+        if price_buy and (dex_buy is None or price_buy < dex_buy):
+            dex_buy, dex_buy_item = price_buy, item
+
+    best = BestQuotes()
+    if min_ask_item is not None:
+        data = min_ask_item['data']
+        best.min_ask = CexQuote(min_ask_item['exchange'], data.get('pair', ''), min_ask, data.get('asks_volumes', ''))
+    if max_bid_item is not None:
+        data = max_bid_item['data']
+        best.max_bid = CexQuote(max_bid_item['exchange'], data.get('pair', ''), max_bid, data.get('bids_volumes', ''))
+    if dex_sell_item is not None:
+        item = dex_sell_item
+        best.dex_sell = DexQuote(item.get('aggregator_sell', ''), item.get('network_sell', ''), dex_sell,
+                                 item.get('dex_sell', ''), item.get('data_sell', ''),
+                                 item.get('src_sell_address', ''), item.get('dest_sell_address', ''))
+    if dex_buy_item is not None:
+        item = dex_buy_item
+        best.dex_buy = DexQuote(item.get('aggregator_buy', ''), item.get('network_buy', ''), dex_buy,
+                                item.get('dex_buy', ''), item.get('data_buy', ''),
+                                item.get('src_buy_address', ''), item.get('dest_buy_address', ''))
+    return best
+
+
+def quote_tables(exchanges, aggregators=None) -> str:
+    '''The CEX (and DEX) quote tables appended to signal files, rendered with pandas only when a signal fires'''
+    import pandas as pd
+
+    frames = [
+        pd.DataFrame([
+            {
+                'exchange': d['exchange'],
+                'pair': d['data'].get('pair', ''),
+                'min_asks_price': d['data']['asks_fill_price'],
+                'asks_volumes': d['data'].get('asks_volumes', '')
+            } for d in exchanges if d.get('data') and _valid(d['data'].get('asks_fill_price'))
+        ]),
+        pd.DataFrame([
+            {
+                'exchange': d['exchange'],
+                'pair': d['data'].get('pair', ''),
+                'max_bids_price': d['data']['bids_fill_price'],
+                'bids_volumes': d['data'].get('bids_volumes', '')
+            } for d in exchanges if d.get('data') and _valid(d['data'].get('bids_fill_price'))
+        ])
+    ]
+    if aggregators is not None:
+        frames += [
+            pd.DataFrame([
+                {
+                    'aggregator_sell': d.get('aggregator_sell', ''),
+                    'network_sell': d.get('network_sell', ''),
+                    'price_sell': d.get('price_sell', ''),
+                    'dex_sell': d.get('dex_sell', ''),
+                    'data_sell': d.get('data_sell', ''),
+                    'src_sell_address': d.get('src_sell_address', ''),
+                    'dest_sell_address': d.get('dest_sell_address', '')
+                } for d in aggregators if d.get('price_sell')
+            ]),
+            pd.DataFrame([
+                {
+                    'aggregator_buy': d.get('aggregator_buy', ''),
+                    'network_buy': d.get('network_buy', ''),
+                    'price_buy': d.get('price_buy', ''),
+                    'dex_buy': d.get('dex_buy', ''),
+                    'data_buy': d.get('data_buy', ''),
+                    'src_buy_address': d.get('src_buy_address', ''),
+                    'dest_buy_address': d.get('dest_buy_address', '')
+                } for d in aggregators if d.get('price_buy')
+            ])
+        ]
+    return "".join(frame.to_string(index=False) + '\n\n' for frame in frames)
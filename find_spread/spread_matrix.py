@@ -0,0 +1,201 @@
+import numpy as np
+
+from find_spread.spread_rules import (ETHEREUM_CEX_DEX_AMOUNT, ETHEREUM_CEX_DEX_SPREAD, ETHEREUM_DEX_DEX_SPREAD,
+                                      SIGNAL_AMOUNT, SIGNAL_AMOUNT_30, SIGNAL_SPREAD, SIGNAL_SPREAD_30)
+
+
+class SpreadMatrix:
+    '''
+    Quotes of every token of a cycle against one dest token, as tokens x venues NumPy matrices
+    (CEX bid, ask, bid size, ask size; DEX sell, DEX buy). evaluate() finds the best quotes and
+    applies the calculate_spread evaluation (see spread_spread_signals) to all tokens in one
+    vectorized pass. A row is the index of its token in coins_info, names are not unique there.
+    Venue columns are added the first time a venue quotes.
+    '''
+
+    def __init__(self, tokens: list, dest_token: str = "", capacity: int = 32):
+        '''tokens: the token names, in coins_info order'''
+        self.tokens = list(tokens)
+        self.dest_token = dest_token
+        self.quotes = {}
+        self.dex_info = {}
+        self.venues = []
+        self.venue_columns = {}
+        self.dex_venues = []
+        self.dex_columns = {}
+        shape = (len(self.tokens), capacity)
+        self.bid = np.full(shape, np.nan)
+        self.ask = np.full(shape, np.nan)
+        self.bid_size = np.full(shape, np.nan)
+        self.ask_size = np.full(shape, np.nan)
+        self.dex_sell = np.full(shape, np.nan)
+        self.dex_buy = np.full(shape, np.nan)
+        self.dex_ethereum = np.zeros(capacity, dtype=bool)
+
+    @staticmethod
+    def _grow(matrix, columns):
+        extra = np.full((matrix.shape[0], max(columns, matrix.shape[1])), np.nan, dtype=matrix.dtype)
+        return np.concatenate([matrix, extra], axis=1)
+
+    def _venue_column(self, venue: str) -> int:
+        if venue not in self.venue_columns:
+            if len(self.venues) == self.bid.shape[1]:
+                self.bid, self.ask, self.bid_size, self.ask_size = (
+                    self._grow(matrix, 1) for matrix in (self.bid, self.ask, self.bid_size, self.ask_size))
+            self.venue_columns[venue] = len(self.venues)
+            self.venues.append(venue)
+        return self.venue_columns[venue]
+
+    def _dex_column(self, aggregator: str, network: str) -> int:
+        key = (aggregator, network)
+        if key not in self.dex_columns:
+            if len(self.dex_venues) == self.dex_sell.shape[1]:
+                self.dex_sell, self.dex_buy = self._grow(self.dex_sell, 1), self._grow(self.dex_buy, 1)
+                self.dex_ethereum = np.concatenate([self.dex_ethereum, np.zeros_like(self.dex_ethereum)])
+            self.dex_columns[key] = len(self.dex_venues)
+            self.dex_venues.append(f"{aggregator} {network}")
+            self.dex_ethereum[self.dex_columns[key]] = network == "Ethereum"
+        return self.dex_columns[key]
+
+    @staticmethod
+    def _price(value) -> float:
+        try:
+            price = float(value)
+        except (TypeError, ValueError):
+            return np.nan
+        return price if price > 0 else np.nan
+
+    def set_cex(self, row: int, result: dict) -> None:
+        '''result: CexPrice.get_price() output, a side whose book cannot fill TICKET_SIZE stays empty'''
+        column = self._venue_column(result["exchange"])
+        self.bid[row, column] = self._price(result.get("bids_fill_price"))
+        self.ask[row, column] = self._price(result.get("asks_fill_price"))
+        self.bid_size[row, column] = self._price(result.get("bids_volumes"))
+        self.ask_size[row, column] = self._price(result.get("asks_volumes"))
+
+    def set_dex_sell(self, row: int, info: dict) -> None:
+        '''info: dex_sell_info() output'''
+        column = self._dex_column(info["aggregator_sell"], info["network_sell"])
+        self.dex_sell[row, column] = self._price(info["price_sell"])
+        self.dex_info[(row, "sell", column)] = info
+
+    def set_dex_buy(self, row: int, info: dict) -> None:
+        '''info: dex_buy_info() output'''
+        column = self._dex_column(info["aggregator_buy"], info["network_buy"])
+        self.dex_buy[row, column] = self._price(info["price_buy"])
+        self.dex_info[(row, "buy", column)] = info
+
+    def load(self, row: int, state) -> None:
+        '''Copies the quotes a QuoteState collected for the token of row'''
+        self.quotes[row] = (state.exchanges, state.aggregators)
+        for exchange in state.exchanges:
+            self.set_cex(row, exchange["data"])
+        for info in state.aggregators:
+            if "price_sell" in info:
+                self.set_dex_sell(row, info)
+            else:
+                self.set_dex_buy(row, info)
+
+    def clear(self) -> None:
+        self.quotes = {}
+        self.dex_info = {}
+        for matrix in (self.bid, self.ask, self.bid_size, self.ask_size, self.dex_sell, self.dex_buy):
+            matrix.fill(np.nan)
+
+    @staticmethod
+    def _best(matrix, lowest: bool) -> tuple:
+        '''Column and value of the best quote of every row, first venue on ties, NaN for rows without quotes'''
+        if matrix.shape[1] == 0:
+            return np.zeros(matrix.shape[0], dtype=int), np.full(matrix.shape[0], np.nan)
+        filled = np.where(np.isnan(matrix), np.inf if lowest else -np.inf, matrix)
+        columns = filled.argmin(axis=1) if lowest else filled.argmax(axis=1)
+        values = filled[np.arange(matrix.shape[0]), columns]
+        return columns, np.where(np.isfinite(values), values, np.nan)
+
+    def evaluate(self) -> list:
+        '''
+        Every spread of every token in one pass, in the QuoteState signal format; like
+        spread_signals, empty levels mean a spread for the results file only
+        '''
+        if not self.tokens:
+            return []
+        rows = np.arange(len(self.tokens))
+        venues, dex_venues = len(self.venues), len(self.dex_venues)
+        ask_column, ask = self._best(self.ask[:, :venues], lowest=True)
+        bid_column, bid = self._best(self.bid[:, :venues], lowest=False)
+        sell_column, sell = self._best(self.dex_sell[:, :dex_venues], lowest=False)
+        buy_column, buy = self._best(self.dex_buy[:, :dex_venues], lowest=True)
+        ask_amount = ask * self.ask_size[rows, ask_column]
+        bid_amount = bid * self.bid_size[rows, bid_column]
+        sell_ethereum = self.dex_ethereum[sell_column]
+        buy_ethereum = self.dex_ethereum[buy_column]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cex_quotes = ~np.isnan(ask) & ~np.isnan(bid)
+            all_quotes = cex_quotes & ~np.isnan(sell) & ~np.isnan(buy)
+            branches = {
+                "cex_cex": cex_quotes,
+                "cex_dex": all_quotes & (sell > bid) & (buy > ask) & (ask != 0),
+                "dex_cex": all_quotes & (sell < bid) & (buy < ask),
+                "dex_dex": all_quotes & (sell > bid) & (buy < ask)
+            }
+            spreads = {
+                "cex_cex": bid / ask * 100 - 100,
+                "cex_dex": sell / ask * 100 - 100,
+                "dex_cex": bid / buy * 100 - 100,
+                "dex_dex": sell / buy * 100 - 100
+            }
+            cex_cex = spreads["cex_cex"]
+            levels = {
+                "cex_cex": ((cex_cex >= SIGNAL_SPREAD) & (ask_amount >= SIGNAL_AMOUNT)
+                            & (bid_amount >= SIGNAL_AMOUNT),
+                            (cex_cex >= SIGNAL_SPREAD_30) & (ask_amount >= SIGNAL_AMOUNT_30)
+                            & (bid_amount >= SIGNAL_AMOUNT_30)),
+                "cex_dex": self._cex_dex_levels(spreads["cex_dex"], ask_amount, sell_ethereum),
+                "dex_cex": self._cex_dex_levels(spreads["dex_cex"], bid_amount, buy_ethereum),
+                "dex_dex": self._dex_dex_levels(spreads["dex_dex"], sell_ethereum | buy_ethereum)
+            }
+        amounts = {"cex_cex": np.fmin(ask_amount, bid_amount), "cex_dex": ask_amount,
+                   "dex_cex": bid_amount, "dex_dex": np.full(len(rows), np.nan)}
+        sides = {
+            "cex_cex": (self.venues, ask_column, ask, self.venues, bid_column, bid),
+            "cex_dex": (self.venues, ask_column, ask, self.dex_venues, sell_column, sell),
+            "dex_cex": (self.dex_venues, buy_column, buy, self.venues, bid_column, bid),
+            "dex_dex": (self.dex_venues, buy_column, buy, self.dex_venues, sell_column, sell)
+        }
+
+        signals = []
+        for kind, (level, level_30) in levels.items():
+            buy_names, buy_columns, buy_prices, sell_names, sell_columns, sell_prices = sides[kind]
+            for row in np.nonzero(branches[kind])[0]:
+                signal = {
+                    "token": self.tokens[row], "dest_token": self.dest_token, "row": int(row), "kind": kind,
+                    "buy": buy_names[buy_columns[row]], "buy_price": float(buy_prices[row]),
+                    "sell": sell_names[sell_columns[row]], "sell_price": float(sell_prices[row]),
+                    "spread": float(spreads[kind][row]),
+                    "amount": None if kind == "dex_dex" else float(amounts[kind][row]),
+                    "levels": [""] * bool(level[row]) + ["_30"] * bool(level_30[row])
+                }
+                signal["buy_address"], signal["buy_data"] = (
+                    self._dex_side(row, "buy", buy_columns[row]) if kind.startswith("dex") else (None, None))
+                signal["sell_address"], signal["sell_data"] = (
+                    self._dex_side(row, "sell", sell_columns[row]) if kind.endswith("dex") else (None, None))
+                signals.append(signal)
+        return signals
+
+    def _dex_side(self, row: int, side: str, column: int) -> tuple:
+        '''(token address, data) of the DEX quote of row in column'''
+        info = self.dex_info.get((row, side, column), {})
+        return info.get(f"src_{side}_address"), info.get(f"data_{side}")
+
+    @staticmethod
+    def _cex_dex_levels(spread, amount, ethereum) -> tuple:
+        level = np.where(ethereum,
+                         (spread >= ETHEREUM_CEX_DEX_SPREAD) & (amount >= ETHEREUM_CEX_DEX_AMOUNT),
+                         (spread >= SIGNAL_SPREAD) & (amount >= SIGNAL_AMOUNT))
+        return level, ~ethereum & (spread >= SIGNAL_SPREAD_30) & (amount >= SIGNAL_AMOUNT_30)
+
+    @staticmethod
+    def _dex_dex_levels(spread, ethereum) -> tuple:
+        return (np.where(ethereum, spread >= ETHEREUM_DEX_DEX_SPREAD, spread >= SIGNAL_SPREAD),
+                ~ethereum & (spread >= SIGNAL_SPREAD_30))
@@ -0,0 +1,109 @@
+'''
+Signal thresholds and spread evaluation of calculate_spread, shared with QuoteState and
+SpreadMatrix. Each *_levels function returns the suffixes of the signal files a spread goes
+to: "" for async_signals_N.txt, "_30" for async_signals_N_30.txt. SpreadMatrix applies the
+same constants to whole columns, so a threshold is tuned here for every mode.
+'''
+
+# async_signals_N.txt: spread in %, USD amount at the CEX best level
+SIGNAL_SPREAD = 3
+SIGNAL_AMOUNT = 50
+# async_signals_N_30.txt
+SIGNAL_SPREAD_30 = 30
+SIGNAL_AMOUNT_30 = 200
+# a DEX side on Ethereum (gas): async_signals_N.txt only, with these instead
+ETHEREUM_CEX_DEX_SPREAD = 10
+ETHEREUM_CEX_DEX_AMOUNT = 100
+ETHEREUM_DEX_DEX_SPREAD = 15
+
+
+def dex_dex_levels(percents_spread: float, ethereum: bool) -> list:
+    if ethereum:
+        return [""] if percents_spread >= ETHEREUM_DEX_DEX_SPREAD else []
+    levels = []
+    if percents_spread >= SIGNAL_SPREAD:
+        levels.append("")
+    if percents_spread >= SIGNAL_SPREAD_30:
+        levels.append("_30")
+    return levels
+
+
+def cex_dex_levels(percents_spread: float, amount: float, ethereum: bool) -> list:
+    if ethereum:
+        return [""] if percents_spread >= ETHEREUM_CEX_DEX_SPREAD and amount >= ETHEREUM_CEX_DEX_AMOUNT else []
+    levels = []
+    if percents_spread >= SIGNAL_SPREAD and amount >= SIGNAL_AMOUNT:
+        levels.append("")
+    if percents_spread >= SIGNAL_SPREAD_30 and amount >= SIGNAL_AMOUNT_30:
+        levels.append("_30")
+    return levels
+
+
+def cex_cex_levels(percents_spread: float, asks_amount: float, bids_amount: float) -> list:
+    levels = []
+    if percents_spread >= SIGNAL_SPREAD and asks_amount >= SIGNAL_AMOUNT and bids_amount >= SIGNAL_AMOUNT:
+        levels.append("")
+    if percents_spread >= SIGNAL_SPREAD_30 and asks_amount >= SIGNAL_AMOUNT_30 and bids_amount >= SIGNAL_AMOUNT_30:
+        levels.append("_30")
+    return levels
+
+
+def quote_amount(price, volumes) -> float:
+    try:
+        return float(price) * float(volumes)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _cex_side(quote) -> tuple:
+    return quote.exchange, quote.price, None, None
+
+
+def _dex_side(quote) -> tuple:
+    return f"{quote.aggregator} {quote.network}", quote.price, quote.src_address, quote.data
+
+
+def _signal(kind, buy, sell, percents_spread, amount, levels) -> dict:
+    signal = {"kind": kind, "spread": percents_spread, "amount": amount, "levels": levels}
+    for side, (venue, price, address, data) in (("buy", buy), ("sell", sell)):
+        signal.update({side: venue, f"{side}_price": price, f"{side}_address": address, f"{side}_data": data})
+    return signal
+
+
+def spread_signals(best) -> list:
+    '''
+    Every spread calculate_spread reports for the best quotes of reduce_quotes, as dicts with
+    kind, buy/sell venue, price, token address and data, spread, amount and levels. The DEX
+    kinds need all four best quotes and DEX prices on the right side of the CEX bid and ask;
+    cex_cex needs the CEX bid and ask. Empty levels: a spread for the results file only.
+    '''
+    signals = []
+    min_ask, max_bid, sell, buy = best.min_ask, best.max_bid, best.dex_sell, best.dex_buy
+    if min_ask and max_bid and sell and buy:
+        if sell.price > max_bid.price and buy.price < min_ask.price:
+            percents_spread = float(sell.price) / float(buy.price) * 100 - 100
+            ethereum = buy.network == "Ethereum" or sell.network == "Ethereum"
+            signals.append(_signal("dex_dex", _dex_side(buy), _dex_side(sell), percents_spread, None,
+                                   dex_dex_levels(percents_spread, ethereum)))
+        if sell.price > max_bid.price and buy.price > min_ask.price and min_ask.price != 0:
+            percents_spread = float(sell.price) / float(min_ask.price) * 100 - 100
+            amount = quote_amount(min_ask.price, min_ask.volumes)
+            signals.append(_signal("cex_dex", _cex_side(min_ask), _dex_side(sell), percents_spread, amount,
+                                   cex_dex_levels(percents_spread, amount, sell.network == "Ethereum")))
+        if sell.price < max_bid.price and buy.price < min_ask.price:
+            percents_spread = float(max_bid.price) / float(buy.price) * 100 - 100
+            amount = quote_amount(max_bid.price, max_bid.volumes)
+            signals.append(_signal("dex_cex", _dex_side(buy), _cex_side(max_bid), percents_spread, amount,
+                                   cex_dex_levels(percents_spread, amount, buy.network == "Ethereum")))
+    if min_ask and max_bid:
+        percents_spread = float(max_bid.price) / float(min_ask.price) * 100 - 100
+        asks_amount = quote_amount(min_ask.price, min_ask.volumes)
+        bids_amount = quote_amount(max_bid.price, max_bid.volumes)
+        signals.append(_signal("cex_cex", _cex_side(min_ask), _cex_side(max_bid), percents_spread,
+                               min(asks_amount, bids_amount),
+                               cex_cex_levels(percents_spread, asks_amount, bids_amount)))
+    return signals
+
+
+def signal_key(signal) -> tuple:
+    return signal["kind"], signal["buy"], signal["sell"]
@@ -0,0 +1,57 @@
+import time
+
+from find_spread.quote_reducer import reduce_quotes
+from find_spread.spread_rules import signal_key, spread_signals
+
+
+class QuoteState:
+    '''
+    Every CEX and DEX quote of one token against one dest token, in the format
+    calculate_spread expects, evaluated again as each quote lands. The evaluation is the
+    one calculate_spread uses (reduce_quotes and spread_rules.spread_signals), so each
+    kind/buy/sell pairing is reported once, as soon as calculate_spread would write it
+    as a signal.
+    '''
+
+    def __init__(self, token: str, dest_token: str, on_signal=None):
+        self.token = token
+        self.dest_token = dest_token
+        self.on_signal = on_signal
+        self.started_at = time.monotonic()
+        self.exchanges = []
+        self.aggregators = []
+        self.emitted = set()
+        self.signals = []
+
+    def push_cex(self, result) -> list:
+        if not result:
+            return []
+        self.exchanges.append({"exchange": result["exchange"], "data": result})
+        return self._evaluate()
+
+    def push_dex_sell(self, info) -> list:
+        if not info:
+            return []
+        self.aggregators.append(info)
+        return self._evaluate()
+
+    def push_dex_buy(self, info) -> list:
+        if not info:
+            return []
+        self.aggregators.append(info)
+        return self._evaluate()
+
+    def _evaluate(self) -> list:
+        signals = []
+        for signal in spread_signals(reduce_quotes(self.exchanges, self.aggregators)):
+            key = signal_key(signal)
+            if not signal["levels"] or key in self.emitted:
+                continue
+            self.emitted.add(key)
+            signal.update({"token": self.token, "dest_token": self.dest_token,
+                           "elapsed": time.monotonic() - self.started_at})
+            signals.append(signal)
+            self.signals.append(signal)
+            if self.on_signal:
+                self.on_signal(signal)
+        return signals
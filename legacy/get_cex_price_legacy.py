@@ -4,7 +4,7 @@ import requests
 class CexPrice:
     def __init__(self, exchange):
         self.exchange = exchange
-        self.pair = self.exchange.prepare_pair()
+        self.pair = self.exchange.pair
 
     def get_exchange_data(self) -> dict:
         url = self.exchange.url
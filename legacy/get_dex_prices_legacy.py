@@ -9,6 +9,8 @@ from pathlib import Path
 from web3 import Web3
 from dotenv import load_dotenv
 
+from dexs.dex_registry import DexRegistry
+
 load_dotenv()
 
 
@@ -19,11 +21,14 @@ class DexPrice:
         _ROOT_DIR = Path(__file__).parent.parent.absolute()
 
     _BOT_DIR = os.path.join(_ROOT_DIR, "dexs")
-    _DEX_CONTRACTS_PATH = os.path.join(_BOT_DIR, "dex_contracts.json")
-    _TOKEN_INFO_PATH = os.path.join(_BOT_DIR, "tokens_info.json")
-    _DEFAULT_FACTORY_PATH = os.path.join(_BOT_DIR, "default_factory_abi.json")
-    _DEFAULT_V2_POOL_PATH = os.path.join(_BOT_DIR, "default_v2_pool_abi.json")
-    _DEFAULT_V3_POOL_PATH = os.path.join(_BOT_DIR, "default_v3_pool_abi.json")
+    _DEX_CONTRACTS_PATH = os.path.join(_BOT_DIR, "abi/dex_contracts.json")
+    _TOKEN_INFO_PATH = os.path.join(_BOT_DIR, "abi/tokens_info.json")
+    _DEFAULT_FACTORY_PATH = os.path.join(_BOT_DIR, "abi/default_factory_abi.json")
+    _DEFAULT_V2_POOL_PATH = os.path.join(_BOT_DIR, "abi/default_v2_pool_abi.json")
+    _DEFAULT_V3_POOL_PATH = os.path.join(_BOT_DIR, "abi/default_v3_pool_abi.json")
+    if not os.path.exists(_DEX_CONTRACTS_PATH):
+        # generated from dexs/abi/dex_contracts/, see dexs/dex_registry.py
+        DexRegistry(os.path.join(_BOT_DIR, "abi/dex_contracts")).join(_DEX_CONTRACTS_PATH)
     _dex_contracts = json.load(open(_DEX_CONTRACTS_PATH))
     _tokens_info = json.load(open(_TOKEN_INFO_PATH))
 
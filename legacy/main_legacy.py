@@ -214,9 +214,7 @@ def cex_prices(src_token, dest_token):
     cex_price_info = {}
     if src_token not in ["USDT", "USDC"]:
         for cex, obj in cexs.items():
-            cex.src_token = src_token["name"]
-            cex.dest_token = dest_token
-            exchange = obj(exchange=cex)
+            exchange = obj(exchange=cex.spec(src_token["name"], dest_token))
             price_info = exchange.get_price()
             if price_info:
                 cex_price_info = {"exchange": cex.name, "data": price_info}
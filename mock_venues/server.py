@@ -0,0 +1,748 @@
+'''
+Local stand-in for every venue the scanner talks to, for load tests on one machine.
+
+    python -m mock_venues.server --port 8780 --latency 40 --jitter 0.6 --error-rate 0.01 --rate-limit 50
+    MOCK_VENUES_URL=http://127.0.0.1:8780 python async_main_1.py
+
+SessionManager sends https://<host>/<path> to MOCK_VENUES_URL/<host>/<path>, so the server
+answers by host and path with the response shape each parser in cexs/async_get_cex_price.py
+and dexs/aggregators, dexs/exchanges reads. It also serves every bulk ticker of
+cexs/book_tickers.py, every market list of cexs/market_universe.py, explorer getabi, and
+JSON-RPC eth_call for decimals()/symbol(), on their own or inside a Multicall3 aggregate3.
+
+The depth streams of cexs/ws_order_books.py are served too: SessionManager.route sends
+wss://<host>/<path> to the same server over ws://, where the Binance, Gate and Kucoin feeds
+push sequenced diffs every --ws-interval seconds against the sequence their REST snapshot
+returns, and the Bybit and Okx feeds push a snapshot after subscribe, then deltas. --gap-rate
+of the pushes skip a sequence number, so clients go through their resync path.
+
+Prices come from one model: every token has a fair price drifting around a value derived
+from its name, each venue quotes it with a small fixed offset, and --signal-rate of the
+(token, venue) pairs are 8% off so the scanner finds spreads. DEX token addresses are mapped
+back to names through tokens_coins_info, decimals through dexs/abi/tokens_info.json (18 otherwise).
+
+Per host behaviour (--config JSON {"default": {...}, "api.binance.com": {...}}, keys as VenueProfile):
+latency median in ms with lognormal jitter, error_rate of 500s, timeout_rate of requests that
+hang for timeout_seconds, and a token bucket of rate_limit req/s answered with 429 and Retry-After,
+then 418 after ban_after 429s in a row.
+'''
+import argparse
+import asyncio
+import hashlib
+import math
+import os
+import random
+import re
+import time
+from pathlib import Path
+
+import ujson as json
+from aiohttp import WSMsgType, web
+from eth_abi import decode, encode
+
+_ROOT_DIR = Path(__file__).parent.parent.absolute()
+COINS_INFO_DIR = os.path.join(_ROOT_DIR, "tokens_coins_info")
+TOKENS_INFO_PATH = os.path.join(_ROOT_DIR, "dexs/abi/tokens_info.json")
+
+QUOTES = ["PERPETUAL", "USDT", "USDC", "USD"]
+STABLECOINS = {"USDT", "USDC", "USD", "PERPETUAL"}
+DECIMALS_SELECTOR = "0x313ce567"
+SYMBOL_SELECTOR = "0x95d89b41"
+AGGREGATE3_SELECTOR = "0x82ad56cb"
+
+# WebSocket host: (feed style, host whose REST book and sequence the feed follows)
+WS_FEEDS = {
+    "stream.binance.com": ("binance", "api.binance.com"),
+    "api.gateio.ws": ("gateio", "api.gateio.ws"),
+    "ws-api-spot.kucoin.com": ("kucoin", "api.kucoin.com"),
+    "stream.bybit.com": ("bybit", "api.bybit.com"),
+    "ws.okx.com": ("okx", "www.okx.com"),
+}
+WS_LEVELS = 5
+
+
+def _unit(*parts) -> float:
+    '''Stable pseudo random number in [0, 1) for the given parts'''
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class VenueProfile:
+    def __init__(self,
+                 latency: float = 40,
+                 jitter: float = 0.5,
+                 error_rate: float = 0.0,
+                 timeout_rate: float = 0.0,
+                 timeout_seconds: float = 30,
+                 rate_limit: float | None = None,
+                 burst: float | None = None,
+                 retry_after: float = 1,
+                 ban_after: int = 20):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.rate_limit = rate_limit
+        self.burst = burst or (rate_limit * 2 if rate_limit else None)
+        self.retry_after = retry_after
+        self.ban_after = ban_after
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.throttled_in_row = 0
+
+    def delay(self, rnd: random.Random) -> float:
+        return self.latency / 1000 * math.exp(rnd.gauss(0, self.jitter)) if self.latency else 0
+
+    def take(self) -> bool:
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate_limit)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.throttled_in_row = 0
+            return True
+        self.throttled_in_row += 1
+        return False
+
+
+class PriceModel:
+    def __init__(self, signal_rate: float = 0.01, levels: int = 20):
+        self.signal_rate = signal_rate
+        self.levels = levels
+        self.names = set()
+        self.addresses = {}
+        self.decimals = {}
+        self._load_tokens()
+
+    def _load_tokens(self) -> None:
+        if os.path.isdir(COINS_INFO_DIR):
+            for file_name in os.listdir(COINS_INFO_DIR):
+                path = os.path.join(COINS_INFO_DIR, file_name)
+                if file_name.startswith("coins_info"):
+                    for coin in json.load(open(path)):
+                        self.names.add(coin["name"].upper())
+                        for address in coin.get("blockchains", {}).values():
+                            self.addresses[str(address).lower()] = coin["name"].upper()
+                elif file_name.endswith("_adresses.json"):
+                    name = file_name.split("_")[0].upper()
+                    for address in json.load(open(path)).values():
+                        self.addresses[str(address).lower()] = name
+        if os.path.exists(TOKENS_INFO_PATH):
+            for network, tokens in json.load(open(TOKENS_INFO_PATH)).items():
+                if isinstance(tokens, dict):
+                    for address, info in tokens.items():
+                        if isinstance(info, dict) and "decimals" in info:
+                            self.decimals[address.lower()] = info["decimals"]
+
+    def token(self, address: str) -> str:
+        return self.addresses.get(address.lower(), address)
+
+    def fair(self, name: str) -> float:
+        name = name.upper()
+        if name in STABLECOINS:
+            return 1.0
+        base = 10 ** (_unit("price", name) * 8 - 4)
+        return base * (1 + 0.002 * math.sin(time.time() / 60 + _unit("phase", name) * 6.28))
+
+    def price(self, base: str, quote: str, venue: str) -> float:
+        offset = (_unit("offset", venue, base) - 0.5) * 0.006
+        if _unit("signal", venue, base) < self.signal_rate:
+            offset += 0.08
+        return self.fair(base) / self.fair(quote) * (1 + offset)
+
+    def book(self, symbol: str, venue: str) -> tuple:
+        base, quote = split_symbol(symbol)
+        mid = self.price(base, quote, venue)
+        rnd = random.Random(f"{venue}{symbol}{int(time.time())}")
+        bids, asks = [], []
+        for level in range(self.levels):
+            step = 0.0005 * (level + 1)
+            bids.append((mid * (1 - step), rnd.uniform(50, 5000) / mid))
+            asks.append((mid * (1 + step), rnd.uniform(50, 5000) / mid))
+        return bids, asks
+
+    def token_decimals(self, address: str) -> int:
+        return self.decimals.get(address.lower(), 18)
+
+
+def split_symbol(symbol: str) -> tuple:
+    '''PEPEUSDT, pepe_usdt, PEPE-USDT, ETH-PERPETUAL, tPEPEUSD -> (base, quote)'''
+    name = re.sub(r"[-_/]", "", symbol).upper()
+    for quote in QUOTES:
+        if name.endswith(quote) and len(name) > len(quote):
+            base = name[:-len(quote)]
+            return ("BTC" if base == "XBT" else base), quote
+    return name, "USDT"
+
+
+def _levels(levels, formatter=lambda price, size: [f"{price:.10g}", f"{size:.10g}"]):
+    return [formatter(price, size) for price, size in levels]
+
+
+def _dicts(levels, price_key, size_key):
+    return [{price_key: f"{price:.10g}", size_key: f"{size:.10g}"} for price, size in levels]
+
+
+class MockVenues:
+    def __init__(self, model: PriceModel, default_options: dict, profiles: dict, seed: int = 0,
+                 ws_interval: float = 0.1, gap_rate: float = 0.01):
+        self.model = model
+        self.default_options = default_options
+        self.profiles = profiles
+        self.rnd = random.Random(seed)
+        self.ws_interval = ws_interval
+        self.gap_rate = gap_rate
+        self.bitmex_assets = {}
+        self.sequences = {}
+        self.served = 0
+        self.pushed = 0
+        self.post_routes = [
+            ("api.kucoin.com", r"/api/v1/bullet-public", self.kucoin_bullet),
+        ]
+        self.routes = [
+            ("api.binance.com", r"/api/v3/depth", self.plain_depth),
+            ("api.mexc.com", r"/api/v3/depth", self.plain_depth),
+            ("api.binance.com", r"/api/v3/ticker/bookTicker", self.book_tickers),
+            ("api.mexc.com", r"/api/v3/ticker/bookTicker", self.book_tickers),
+            ("api.binance.com", r"/api/v3/exchangeInfo", self.exchange_info),
+            ("api.mexc.com", r"/api/v3/exchangeInfo", self.exchange_info),
+            ("api.bybit.com", r"/v5/market/tickers", self.bybit_tickers),
+            ("www.okx.com", r"/api/v5/market/tickers", self.okx_tickers),
+            ("api.gateio.ws", r"/api/v4/spot/tickers", self.gateio_tickers),
+            ("api.kucoin.com", r"/api/v1/market/allTickers", self.kucoin_tickers),
+            ("api.bitget.com", r"/api/v2/spot/market/tickers", self.bitget_tickers),
+            ("api.huobi.pro", r"/market/tickers", self.huobi_tickers),
+            ("api.poloniex.com", r"/markets/ticker24h", self.poloniex_tickers),
+            ("api.bybit.com", r"/v5/market/instruments-info", self.bybit_markets),
+            ("www.okx.com", r"/api/v5/public/instruments", self.okx_markets),
+            ("api.gateio.ws", r"/api/v4/spot/currency_pairs", self.gateio_markets),
+            ("api.kucoin.com", r"/api/v2/symbols", self.kucoin_markets),
+            ("api.bitget.com", r"/api/v2/spot/public/symbols", self.bitget_markets),
+            ("api.huobi.pro", r"/v1/common/symbols", self.huobi_markets),
+            ("api.poloniex.com", r"/markets", self.poloniex_markets),
+            ("api.kraken.com", r"/0/public/AssetPairs", self.kraken_markets),
+            ("api.exchange.coinbase.com", r"/products", self.coinbase_markets),
+            ("api.crypto.com", r"/v2/public/get-instruments", self.cryptocom_markets),
+            ("api.bitfinex.com", r"/v1/symbols", self.symbol_list),
+            ("api.gemini.com", r"/v1/symbols", self.symbol_list),
+            ("open-api.bingx.com", r"/openApi/spot/v1/common/symbols", self.bingx_markets),
+            ("api.coinex.com", r"/v2/spot/market", self.coinex_markets),
+            ("api.backpack.exchange", r"/api/v1/markets", self.backpack_markets),
+            ("api.bybit.com", r"/v5/market/orderbook", self.bybit),
+            ("open-api.bingx.com", r"/openApi/spot/v1/market/depth", self.data_depth),
+            ("api.bitget.com", r"/data/v1/market/depth", self.data_depth),
+            ("api.coinw.com", r"/api/v1/public", self.data_depth),
+            ("api.kucoin.com", r"/api/v1/market/orderbook/level2_20", self.data_depth),
+            ("api.kucoin.com", r"/api/v1/market/orderbook/level2_100", self.data_depth),
+            ("trade.cex.io", r"/api/spot/rest-public/get_order_book", self.data_depth),
+            ("api.lbank.info", r"/v2/depth\.do", self.data_depth),
+            ("api.bitfinex.com", r"/v1/book/(?P<symbol>[^/]+)", self.price_amount),
+            ("api.gemini.com", r"/v1/book/(?P<symbol>[^/]+)", self.price_amount),
+            ("www.bitmex.com", r"/api/v1/orderBook/L2", self.bitmex),
+            ("www.bitmex.com", r"/api/v1/wallet/assets", self.bitmex_wallet_assets),
+            ("www.bitstamp.net", r"/api/v2/order_book/(?P<symbol>[^/]+)", self.plain_depth),
+            ("api.exchange.coinbase.com", r"/products/(?P<symbol>[^/]+)/book", self.plain_depth),
+            ("api.gateio.ws", r"/api/v4/spot/order_book", self.gateio_depth),
+            ("api.backpack.exchange", r"/api/v1/depth", self.plain_depth),
+            ("api.bittrex.com", r"/v3/markets/(?P<symbol>[^/]+)/orderbook", self.bittrex),
+            ("api.crypto.com", r"/v2/public/get-book", self.cryptocom),
+            ("www.deribit.com", r"/api/v2/public/get_order_book", self.deribit),
+            ("api.dydx.exchange", r"/v3/orderbook/(?P<symbol>[^/]+)", self.dydx),
+            ("garantex.org", r"/api/v2/depth", self.garantex),
+            ("api.huobi.pro", r"/market/depth", self.huobi),
+            ("api.kine.exchange", r"/market/api/price/(?P<symbol>[^/]+)", self.kine),
+            ("api.kraken.com", r"/0/public/Depth", self.kraken),
+            ("www.okx.com", r"/api/v5/market/books", self.okx),
+            ("api.phemex.com", r"/md/orderbook", self.phemex),
+            ("api.poloniex.com", r"/markets/(?P<symbol>[^/]+)/orderBook", self.poloniex),
+            ("yobit.net", r"/api/3/depth/(?P<symbol>[^/]+)", self.yobit),
+            ("api.coinex.com", r"/v2/spot/depth", self.coinex),
+            ("api.dexscreener.com", r"/latest/dex/tokens/(?P<tokens>[^/]+)", self.dexscreener),
+            ("aggregator-api.kyberswap.com", r"/(?P<chain>[^/]+)/route/encode", self.kyberswap),
+            ("api.1inch.dev", r"/swap/v5\.2/(?P<chain>\d+)/quote", self.oneinch),
+            ("open-api.openocean.finance", r"/v3/(?P<chain>\d+)/gasPrice", self.openocean_gas),
+            ("open-api.openocean.finance", r"/v3/(?P<chain>\d+)/quote", self.openocean),
+            ("api.paraswap.io", r"/prices/?", self.paraswap),
+            ("price.jup.ag", r"/v6/price", self.jupyter),
+            ("data.osmosis.zone", r"/tokens/v2/all", self.osmosis),
+            ("api.ston.fi", r"/v1/assets/(?P<address>[^/]+)", self.stonfi),
+            (None, r"/api", self.explorer_abi)
+        ]
+        self.routes = [(host, re.compile(pattern + "$"), handler) for host, pattern, handler in self.routes]
+        self.post_routes = [(host, re.compile(pattern + "$"), handler) for host, pattern, handler in self.post_routes]
+
+    def profile(self, host: str) -> VenueProfile:
+        if host not in self.profiles:
+            self.profiles[host] = VenueProfile(**self.default_options)
+        return self.profiles[host]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        host = request.match_info["host"]
+        path = "/" + request.match_info["path"]
+        profile = self.profile(host)
+        await asyncio.sleep(profile.delay(self.rnd))
+        if request.headers.get("Upgrade", "").lower() == "websocket" and host in WS_FEEDS:
+            return await self.depth_feed(request, host)
+        if not profile.take():
+            status = 418 if profile.throttled_in_row > profile.ban_after else 429
+            retry_after = profile.retry_after * (2 if status == 418 else 1)
+            return web.json_response({"code": -1003, "msg": "Too many requests"}, status=status,
+                                     headers={"Retry-After": f"{retry_after:g}"})
+        if self.rnd.random() < profile.timeout_rate:
+            await asyncio.sleep(profile.timeout_seconds)
+        if self.rnd.random() < profile.error_rate:
+            return web.json_response({"msg": "Internal error"}, status=500)
+        routes = self.routes
+        if request.method == "POST":
+            routes = self.post_routes
+            if not any(route_host == host and pattern.match(path) for route_host, pattern, _ in routes):
+                return await self.json_rpc(request)
+        for route_host, pattern, handler in routes:
+            if route_host is not None and route_host != host:
+                continue
+            match = pattern.match(path)
+            if match:
+                self.served += 1
+                return web.json_response(handler(request, host, **match.groupdict()))
+        return web.json_response({"msg": f"Unknown endpoint {host}{path}"}, status=404)
+
+    @staticmethod
+    def _symbol(request, symbol=None) -> str:
+        return symbol or next((request.query[name] for name in
+                               ["symbol", "instrument_name", "market", "pair", "instId", "currency_pair"]
+                               if name in request.query), "")
+
+    def _book(self, request, host, symbol=None):
+        return self.model.book(self._symbol(request, symbol), host)
+
+    def sequence(self, host: str, symbol: str, step: int = 0) -> int:
+        '''Update id of the book of symbol on host, moved on by step; REST snapshots and depth feeds share it'''
+        key = (host, split_symbol(symbol))
+        self.sequences[key] = self.sequences.get(key, int(time.time() * 1000)) + step
+        return self.sequences[key]
+
+    def plain_depth(self, request, host, symbol=None):
+        bids, asks = self._book(request, host, symbol)
+        return {"lastUpdateId": self.sequence(host, self._symbol(request, symbol)),
+                "bids": _levels(bids), "asks": _levels(asks)}
+
+    def gateio_depth(self, request, host):
+        bids, asks = self._book(request, host)
+        return {"id": self.sequence(host, self._symbol(request)), "current": int(time.time() * 1000),
+                "bids": _levels(bids), "asks": _levels(asks)}
+
+    def book_tickers(self, request, host):
+        tickers = []
+        for name in sorted(self.model.names):
+            for quote in ["USDT", "USDC"]:
+                bids, asks = self.model.book(name + quote, host)
+                tickers.append({"symbol": name + quote,
+                                "bidPrice": f"{bids[0][0]:.10g}", "bidQty": f"{bids[0][1]:.10g}",
+                                "askPrice": f"{asks[0][0]:.10g}", "askQty": f"{asks[0][1]:.10g}"})
+        return tickers
+
+    def exchange_info(self, request, host):
+        return {"symbols": [{"symbol": name + quote, "status": "TRADING"}
+                            for name in sorted(self.model.names) for quote in ["USDT", "USDC"]]}
+
+    def _pairs(self, separator: str = "", lower: bool = False) -> list:
+        '''Every pair the model quotes, written the way the venue does'''
+        pairs = [f"{name}{separator}{quote}" for name in sorted(self.model.names) for quote in ["USDT", "USDC"]]
+        return [pair.lower() for pair in pairs] if lower else pairs
+
+    def _tops(self, host: str, separator: str = "", lower: bool = False):
+        '''(symbol, bid, bid size, ask, ask size) of every pair, as strings'''
+        for symbol in self._pairs(separator, lower):
+            bids, asks = self.model.book(symbol, host)
+            yield symbol, f"{bids[0][0]:.10g}", f"{bids[0][1]:.10g}", f"{asks[0][0]:.10g}", f"{asks[0][1]:.10g}"
+
+    def bybit_tickers(self, request, host):
+        return {"retCode": 0, "result": {"category": "spot", "list": [
+            {"symbol": symbol, "bid1Price": bid, "bid1Size": bid_size, "ask1Price": ask, "ask1Size": ask_size}
+            for symbol, bid, bid_size, ask, ask_size in self._tops(host)]}}
+
+    def okx_tickers(self, request, host):
+        return {"code": "0", "data": [
+            {"instId": symbol, "bidPx": bid, "bidSz": bid_size, "askPx": ask, "askSz": ask_size}
+            for symbol, bid, bid_size, ask, ask_size in self._tops(host, "-")]}
+
+    def gateio_tickers(self, request, host):
+        return [{"currency_pair": symbol, "highest_bid": bid, "highest_size": bid_size,
+                 "lowest_ask": ask, "lowest_size": ask_size}
+                for symbol, bid, bid_size, ask, ask_size in self._tops(host, "_")]
+
+    def kucoin_tickers(self, request, host):
+        return {"code": "200000", "data": {"time": int(time.time() * 1000), "ticker": [
+            {"symbol": symbol, "buy": bid, "bestBidSize": bid_size, "sell": ask, "bestAskSize": ask_size}
+            for symbol, bid, bid_size, ask, ask_size in self._tops(host, "-")]}}
+
+    def bitget_tickers(self, request, host):
+        return {"code": "00000", "data": [
+            {"symbol": symbol, "bidPr": bid, "bidSz": bid_size, "askPr": ask, "askSz": ask_size}
+            for symbol, bid, bid_size, ask, ask_size in self._tops(host)]}
+
+    def huobi_tickers(self, request, host):
+        return {"status": "ok", "data": [
+            {"symbol": symbol, "bid": float(bid), "bidSize": float(bid_size), "ask": float(ask), "askSize": float(ask_size)}
+            for symbol, bid, bid_size, ask, ask_size in self._tops(host, lower=True)]}
+
+    def poloniex_tickers(self, request, host):
+        return [{"symbol": symbol, "bid": bid, "bidQuantity": bid_size, "ask": ask, "askQuantity": ask_size}
+                for symbol, bid, bid_size, ask, ask_size in self._tops(host, "_")]
+
+    def bybit_markets(self, request, host):
+        return {"retCode": 0, "result": {"category": "spot", "list": [{"symbol": symbol, "status": "Trading"}
+                                                                      for symbol in self._pairs()]}}
+
+    def okx_markets(self, request, host):
+        return {"code": "0", "data": [{"instId": symbol, "state": "live"} for symbol in self._pairs("-")]}
+
+    def gateio_markets(self, request, host):
+        return [{"id": symbol, "trade_status": "tradable"} for symbol in self._pairs("_")]
+
+    def kucoin_markets(self, request, host):
+        return {"code": "200000", "data": [{"symbol": symbol, "enableTrading": True} for symbol in self._pairs("-")]}
+
+    def bitget_markets(self, request, host):
+        return {"code": "00000", "data": [{"symbol": symbol, "status": "online"} for symbol in self._pairs()]}
+
+    def huobi_markets(self, request, host):
+        return {"status": "ok", "data": [{"symbol": symbol, "state": "online"} for symbol in self._pairs(lower=True)]}
+
+    def poloniex_markets(self, request, host):
+        return [{"symbol": symbol, "state": "NORMAL"} for symbol in self._pairs("_")]
+
+    def kraken_markets(self, request, host):
+        return {"error": [], "result": {symbol: {"altname": symbol} for symbol in self._pairs()}}
+
+    def coinbase_markets(self, request, host):
+        return [{"id": symbol, "status": "online"} for symbol in self._pairs("-")]
+
+    def cryptocom_markets(self, request, host):
+        return {"code": 0, "result": {"instruments": [{"instrument_name": symbol} for symbol in self._pairs("_")]}}
+
+    def symbol_list(self, request, host):
+        return self._pairs(lower=True)
+
+    def bingx_markets(self, request, host):
+        return {"code": 0, "data": {"symbols": [{"symbol": symbol, "status": 1} for symbol in self._pairs("-")]}}
+
+    def coinex_markets(self, request, host):
+        return {"code": 0, "data": [{"market": symbol} for symbol in self._pairs()]}
+
+    def backpack_markets(self, request, host):
+        return [{"symbol": symbol} for symbol in self._pairs("_")]
+
+    def bybit(self, request, host):
+        bids, asks = self._book(request, host)
+        return {"retCode": 0, "result": {"s": request.query.get("symbol"), "b": _levels(bids), "a": _levels(asks)}}
+
+    def data_depth(self, request, host):
+        bids, asks = self._book(request, host)
+        return {"code": 0, "data": {"sequence": str(self.sequence(host, self._symbol(request))),
+                                    "bids": _levels(bids), "asks": _levels(asks)}}
+
+    def kucoin_bullet(self, request, host):
+        return {"code": "200000", "data": {"token": "mock", "instanceServers": [
+            {"endpoint": "wss://ws-api-spot.kucoin.com/", "protocol": "websocket", "encrypt": True,
+             "pingInterval": 18000, "pingTimeout": 10000}]}}
+
+    def price_amount(self, request, host, symbol):
+        bids, asks = self._book(request, host, symbol)
+        return {"bids": _dicts(bids, "price", "amount"), "asks": _dicts(asks, "price", "amount")}
+
+    def bitmex(self, request, host):
+        symbol = request.query.get("symbol", "")
+        base, _ = split_symbol(symbol)
+        self.bitmex_assets["XBT" if base == "BTC" else base] = 6
+        bids, asks = self._book(request, host)
+        return [{"symbol": symbol, "side": "Sell", "size": int(asks[0][1] * 10 ** 6), "price": asks[0][0]},
+                {"symbol": symbol, "side": "Buy", "size": int(bids[0][1] * 10 ** 6), "price": bids[0][0]}]
+
+    def bitmex_wallet_assets(self, request, host):
+        return [{"asset": asset, "scale": scale} for asset, scale in self.bitmex_assets.items()] + \
+            [{"asset": "USDT", "scale": 6}]
+
+    def bittrex(self, request, host, symbol):
+        bids, asks = self._book(request, host, symbol)
+        return {"bid": _dicts(bids, "rate", "quantity"), "ask": _dicts(asks, "rate", "quantity")}
+
+    def cryptocom(self, request, host):
+        bids, asks = self._book(request, host)
+        return {"code": 0, "result": {"data": [{"bids": _levels(bids), "asks": _levels(asks)}]}}
+
+    def deribit(self, request, host):
+        bids, asks = self._book(request, host)
+        return {"result": {"bids": [list(level) for level in bids], "asks": [list(level) for level in asks]}}
+
+    def dydx(self, request, host, symbol):
+        bids, asks = self._book(request, host, symbol)
+        return {"bids": _dicts(bids, "price", "size"), "asks": _dicts(asks, "price", "size")}
+
+    def garantex(self, request, host):
+        bids, asks = self._book(request, host)
+        return {"bids": _dicts(bids, "price", "volume"), "asks": _dicts(asks, "price", "volume")}
+
+    def huobi(self, request, host):
+        bids, asks = self._book(request, host)
+        return {"status": "ok", "tick": {"bids": [list(level) for level in bids], "asks": [list(level) for level in asks]}}
+
+    def kine(self, request, host, symbol):
+        base, quote = split_symbol(symbol)
+        return {"data": {"price": self.model.price(base, quote, host)}}
+
+    def kraken(self, request, host):
+        pair = request.query.get("pair", "")
+        bids, asks = self._book(request, host)
+        now = int(time.time())
+        return {"error": [], "result": {pair: {"bids": _levels(bids, lambda p, s: [f"{p:.10g}", f"{s:.10g}", now]),
+                                               "asks": _levels(asks, lambda p, s: [f"{p:.10g}", f"{s:.10g}", now])}}}
+
+    def okx(self, request, host):
+        bids, asks = self._book(request, host)
+        level = lambda p, s: [f"{p:.10g}", f"{s:.10g}", "0", "1"]
+        return {"code": "0", "data": [{"bids": _levels(bids, level), "asks": _levels(asks, level)}]}
+
+    def phemex(self, request, host):
+        bids, asks = self._book(request, host)
+        scaled = lambda p, s: [int(p * 10000), int(s * 10000)]
+        return {"error": None, "result": {"book": {"bids": _levels(bids, scaled), "asks": _levels(asks, scaled)}}}
+
+    def poloniex(self, request, host, symbol):
+        bids, asks = self._book(request, host, symbol)
+        return {"bids": [value for level in _levels(bids) for value in level],
+                "asks": [value for level in _levels(asks) for value in level]}
+
+    def yobit(self, request, host, symbol):
+        bids, asks = self._book(request, host, symbol)
+        return {symbol: {"bids": [list(level) for level in bids], "asks": [list(level) for level in asks]}}
+
+    def coinex(self, request, host):
+        bids, asks = self._book(request, host)
+        return {"code": 0, "data": {"depth": {"bids": _levels(bids), "asks": _levels(asks)}}}
+
+    def _dex_price(self, src_address, dest_address, venue):
+        return self.model.price(self.model.token(src_address), self.model.token(dest_address), venue)
+
+    def dexscreener(self, request, host, tokens):
+        src_address, dest_address = (tokens.split(",") + [""])[:2]
+        return {"pairs": [{"dexId": "uniswap",
+                           "priceUsd": f"{self._dex_price(src_address, dest_address, host):.10g}",
+                           "baseToken": {"address": src_address},
+                           "quoteToken": {"address": dest_address},
+                           "volume": {"h1": 100000}}]}
+
+    def _amount_out(self, src_address, dest_address, amount_in, venue):
+        price = self._dex_price(src_address, dest_address, venue)
+        src_decimals = self.model.token_decimals(src_address)
+        dest_decimals = self.model.token_decimals(dest_address)
+        return int(float(amount_in) / 10 ** src_decimals * price * 10 ** dest_decimals)
+
+    def kyberswap(self, request, host, chain):
+        token_in, token_out = request.query["tokenIn"], request.query["tokenOut"]
+        amount_in = request.query["amountIn"]
+        return {"swaps": [[{"tokenIn": token_in, "tokenOut": token_out, "swapAmount": amount_in,
+                            "amountOut": str(self._amount_out(token_in, token_out, amount_in, host)),
+                            "exchange": "uniswapv3", "poolExtra": {"fee": 500}}]],
+                "gasUsd": "0.5"}
+
+    def oneinch(self, request, host, chain):
+        return {"toAmount": str(self._amount_out(request.query["src"], request.query["dst"],
+                                                 request.query["amount"], host))}
+
+    def openocean_gas(self, request, host, chain):
+        return {"without_decimals": {"base": "20", "standard": "1"}}
+
+    def openocean(self, request, host, chain):
+        token_in, token_out = request.query["inTokenAddress"], request.query["outTokenAddress"]
+        decimals = self.model.token_decimals(token_out)
+        price = self._dex_price(token_in, token_out, host)
+        return {"code": 200, "data": {"outAmount": str(int(float(request.query["amount"]) * price * 10 ** decimals)),
+                                      "outToken": {"decimals": decimals}, "estimatedGas": "150000"}}
+
+    def paraswap(self, request, host):
+        src, dest = request.query["srcToken"], request.query["destToken"]
+        dest_decimals = int(request.query.get("destDecimals", self.model.token_decimals(dest)))
+        src_decimals = int(request.query.get("srcDecimals", self.model.token_decimals(src)))
+        price = self._dex_price(src, dest, host)
+        dest_amount = int(float(request.query["amount"]) / 10 ** src_decimals * price * 10 ** dest_decimals)
+        return {"priceRoute": {"bestRoute": [{"swaps": [{"swapExchanges": [{"exchange": "UniswapV3"}]}]}],
+                               "destAmount": str(dest_amount), "destDecimals": dest_decimals, "gasCostUSD": "0.4"}}
+
+    def jupyter(self, request, host):
+        ids, vs_token = request.query["ids"], request.query.get("vsToken", "")
+        return {"data": {ids: {"id": ids, "price": self._dex_price(ids, vs_token, host)}}}
+
+    def osmosis(self, request, host):
+        return [{"denom": address, "symbol": name, "price": self.model.price(name, "USD", host), "volume_24h": 100000}
+                for address, name in self.model.addresses.items() if address.startswith("ibc/") or "/" in address]
+
+    def stonfi(self, request, host, address):
+        return {"asset": {"contract_address": address,
+                          "dex_price_usd": f"{self.model.price(self.model.token(address), 'USD', host):.10g}"}}
+
+    def explorer_abi(self, request, host):
+        return {"status": "0", "message": "NOTOK", "result": "Contract source code not verified"}
+
+    async def depth_feed(self, request, host) -> web.WebSocketResponse:
+        '''A depth stream of WS_FEEDS, pushing every ws_interval seconds to the symbols subscribed'''
+        style, book_host = WS_FEEDS[host]
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscribed = {}
+        pusher = asyncio.create_task(self._push_depth(ws, style, book_host, subscribed))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                if message.data == "ping":
+                    await ws.send_str("pong")
+                    continue
+                for symbol, subscribe in self._subscriptions(style, json.loads(message.data)):
+                    if subscribe:
+                        # snapshot feeds start over with a snapshot
+                        subscribed[symbol] = None
+                    else:
+                        subscribed.pop(symbol, None)
+        finally:
+            pusher.cancel()
+        return ws
+
+    @staticmethod
+    def _subscriptions(style: str, message: dict) -> list:
+        '''(symbol, subscribe) pairs of a subscribe/unsubscribe message, [] for pings and the rest'''
+        if style == "binance" and message.get("method") in ("SUBSCRIBE", "UNSUBSCRIBE"):
+            return [(param.split("@")[0].upper(), message["method"] == "SUBSCRIBE") for param in message["params"]]
+        if style == "gateio" and message.get("channel") == "spot.order_book_update":
+            return [(message["payload"][0], message.get("event") == "subscribe")]
+        if style == "kucoin" and message.get("type") in ("subscribe", "unsubscribe"):
+            symbols = message["topic"].split(":", 1)[1].split(",")
+            return [(symbol, message["type"] == "subscribe") for symbol in symbols]
+        if style == "bybit" and message.get("op") in ("subscribe", "unsubscribe"):
+            return [(arg.split(".")[-1], message["op"] == "subscribe") for arg in message["args"]]
+        if style == "okx" and message.get("op") in ("subscribe", "unsubscribe"):
+            return [(arg["instId"], message["op"] == "subscribe") for arg in message["args"]]
+        return []
+
+    async def _push_depth(self, ws, style: str, book_host: str, subscribed: dict) -> None:
+        while not ws.closed:
+            await asyncio.sleep(self.ws_interval)
+            for symbol, last in list(subscribed.items()):
+                is_snapshot = last is None and style in ("bybit", "okx")
+                # a lost push: the client sees the sequence jump and resyncs
+                step = 2 if not is_snapshot and self.rnd.random() < self.gap_rate else 1
+                sequence = self.sequence(book_host, symbol, step)
+                subscribed[symbol] = sequence
+                bids, asks = self.model.book(symbol, book_host)
+                if not is_snapshot:
+                    bids, asks = bids[:WS_LEVELS], asks[:WS_LEVELS]
+                await ws.send_str(json.dumps(self._depth_message(style, symbol, is_snapshot, sequence, bids, asks)))
+                self.pushed += 1
+
+    @staticmethod
+    def _depth_message(style: str, symbol: str, is_snapshot: bool, sequence: int, bids, asks) -> dict:
+        now = int(time.time() * 1000)
+        if style == "binance":
+            return {"e": "depthUpdate", "E": now, "s": symbol, "U": sequence, "u": sequence,
+                    "b": _levels(bids), "a": _levels(asks)}
+        if style == "gateio":
+            return {"time": now // 1000, "channel": "spot.order_book_update", "event": "update",
+                    "result": {"t": now, "s": symbol, "U": sequence, "u": sequence,
+                               "b": _levels(bids), "a": _levels(asks)}}
+        if style == "kucoin":
+            level = lambda p, s: [f"{p:.10g}", f"{s:.10g}", str(sequence)]
+            return {"type": "message", "topic": f"/market/level2:{symbol}", "subject": "trade.l2update",
+                    "data": {"symbol": symbol, "sequenceStart": sequence, "sequenceEnd": sequence,
+                             "changes": {"bids": _levels(bids, level), "asks": _levels(asks, level)}}}
+        if style == "bybit":
+            return {"topic": f"orderbook.50.{symbol}", "type": "snapshot" if is_snapshot else "delta", "ts": now,
+                    "data": {"s": symbol, "b": _levels(bids), "a": _levels(asks), "u": sequence, "seq": sequence}}
+        level = lambda p, s: [f"{p:.10g}", f"{s:.10g}", "0", "1"]
+        return {"arg": {"channel": "books", "instId": symbol}, "action": "snapshot" if is_snapshot else "update",
+                "data": [{"bids": _levels(bids, level), "asks": _levels(asks, level), "ts": str(now),
+                          "seqId": sequence, "prevSeqId": -1 if is_snapshot else sequence - 1}]}
+
+    async def json_rpc(self, request) -> web.Response:
+        body = await request.json(loads=json.loads)
+        calls = body if isinstance(body, list) else [body]
+        results = [self._rpc_call(call) for call in calls]
+        return web.json_response(results if isinstance(body, list) else results[0])
+
+    def _eth_call(self, to: str, data: bytes) -> bytes:
+        selector = "0x" + data[:4].hex()
+        if selector == DECIMALS_SELECTOR:
+            return encode(["uint8"], [self.model.token_decimals(to)])
+        if selector == SYMBOL_SELECTOR:
+            return encode(["string"], [self.model.token(to)[:32]])
+        if selector == AGGREGATE3_SELECTOR:
+            (calls,) = decode(["(address,bool,bytes)[]"], data[4:])
+            return encode(["(bool,bytes)[]"], [[(True, self._eth_call(target, call_data))
+                                                 for target, _, call_data in calls]])
+        return bytes(32)
+
+    def _rpc_call(self, call: dict) -> dict:
+        method, params = call.get("method"), call.get("params") or []
+        result = None
+        if method == "eth_chainId":
+            result = "0x1"
+        elif method == "net_version":
+            result = "1"
+        elif method == "eth_blockNumber":
+            result = hex(int(time.time()))
+        elif method == "eth_call":
+            to, data = params[0].get("to", ""), params[0].get("data") or params[0].get("input", "")
+            result = "0x" + self._eth_call(to, bytes.fromhex(data[2:])).hex()
+        self.served += 1
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+
+def make_app(profiles: dict | None = None, signal_rate: float = 0.01, seed: int = 0,
+             ws_interval: float = 0.1, gap_rate: float = 0.01) -> web.Application:
+    '''profiles: {"default": {VenueProfile options}, "<host>": {...}}'''
+    profiles = profiles or {}
+    options = profiles.get("default", {})
+    venues = MockVenues(PriceModel(signal_rate), options,
+                        {host: VenueProfile(**options | host_options)
+                         for host, host_options in profiles.items() if host != "default"},
+                        seed, ws_interval, gap_rate)
+    app = web.Application()
+    app["venues"] = venues
+    app.router.add_route("*", "/{host}/{path:.*}", venues.handle)
+    return app
+
+
+async def start(host: str = "127.0.0.1", port: int = 8780, **options) -> web.AppRunner:
+    '''Runs the mock venues inside the current event loop, stop with `await runner.cleanup()`'''
+    runner = web.AppRunner(make_app(**options), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock exchanges and aggregators for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--latency", type=float, default=40, help="median latency, ms")
+    parser.add_argument("--jitter", type=float, default=0.5, help="lognormal sigma of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests per second per host")
+    parser.add_argument("--signal-rate", type=float, default=0.01, help="share of (token, venue) quotes 8% off")
+    parser.add_argument("--ws-interval", type=float, default=0.1, help="seconds between depth stream pushes")
+    parser.add_argument("--gap-rate", type=float, default=0.01, help="share of depth stream pushes that skip a sequence")
+    parser.add_argument("--config", help="JSON with per host VenueProfile options")
+    args = parser.parse_args()
+    profiles = json.load(open(args.config)) if args.config else {}
+    profiles["default"] = {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+                           "timeout_rate": args.timeout_rate, "rate_limit": args.rate_limit} | \
+        profiles.get("default", {})
+    web.run_app(make_app(profiles, args.signal_rate, ws_interval=args.ws_interval, gap_rate=args.gap_rate),
+                host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import ujson as json
+
+logging.basicConfig(level=logging.INFO)
+
+_ROOT_DIR = Path(__file__).parent.parent.absolute()
+HISTORY_DIR = os.path.join(_ROOT_DIR, "results/quote_history")
+
+CEX, DEX_SELL, DEX_BUY = 0, 1, 2
+KINDS = {CEX: "cex", DEX_SELL: "dex_sell", DEX_BUY: "dex_buy"}
+
+# DEX quotes go to bid (price_sell) or ask (price_buy), the rest stays NaN
+COLUMNS = {
+    "ts": np.float64,
+    "token": np.int32,
+    "dest_token": np.int32,
+    "venue": np.int32,
+    "network": np.int32,
+    "kind": np.int8,
+    "bid": np.float64,
+    "ask": np.float64,
+    "bid_size": np.float64,
+    "ask_size": np.float64,
+    "bid_fill": np.float64,
+    "ask_fill": np.float64,
+    "bid_depth": np.float64,
+    "ask_depth": np.float64
+}
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class Symbols:
+    '''Names of tokens, venues and networks <-> the int ids stored in the columns'''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.names = {"token": [], "venue": [], "network": [""]}
+        if os.path.exists(path):
+            with open(path) as file:
+                self.names.update(json.load(file))
+        self.ids = {column: {name: number for number, name in enumerate(names)}
+                    for column, names in self.names.items()}
+        self.changed = False
+
+    def id(self, column: str, name: str) -> int:
+        ids = self.ids[column]
+        if name not in ids:
+            ids[name] = len(self.names[column])
+            self.names[column].append(name)
+            self.changed = True
+        return ids[name]
+
+    def name(self, column: str, number: int) -> str:
+        return self.names[column][number]
+
+    def save(self) -> None:
+        if self.changed:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w") as file:
+                json.dump(self.names, file)
+            self.changed = False
+
+
+class Segment:
+    '''
+    One day of quotes: a memmap file per column, used as a ring buffer of capacity rows.
+    written counts every row ever appended, the oldest ones are overwritten once it passes capacity.
+    '''
+
+    def __init__(self, directory: str, capacity: int):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, "meta.json")
+        os.makedirs(directory, exist_ok=True)
+        self.capacity = capacity
+        self.written = 0
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as file:
+                meta = json.load(file)
+            self.capacity, self.written = meta["capacity"], meta["written"]
+        self.columns = {}
+        for column, dtype in COLUMNS.items():
+            path = os.path.join(directory, f"{column}.bin")
+            mode = "r+" if os.path.exists(path) else "w+"
+            self.columns[column] = np.memmap(path, dtype=dtype, mode=mode, shape=(self.capacity,))
+
+    def append(self, row: dict) -> None:
+        position = self.written % self.capacity
+        for column, values in self.columns.items():
+            values[position] = row.get(column, np.nan if values.dtype.kind == "f" else 0)
+        self.written += 1
+
+    def order(self) -> np.ndarray | slice:
+        '''Row positions from the oldest to the newest kept row'''
+        if self.written <= self.capacity:
+            return slice(0, self.written)
+        start = self.written % self.capacity
+        return np.concatenate([np.arange(start, self.capacity), np.arange(0, start)])
+
+    def flush(self) -> None:
+        for values in self.columns.values():
+            values.flush()
+        with open(self.meta_path, "w") as file:
+            json.dump({"capacity": self.capacity, "written": self.written}, file)
+
+
+class QuoteHistory:
+    '''
+    Append-only history of every CEX book (top of book, fill prices, depth) and DEX quote
+    with its timestamp, in columnar day segments under HISTORY_DIR/YYYY-MM-DD.
+    read() filters on the token/venue/ts columns first and only then gathers the other
+    columns, so a range read touches the pages of the rows it returns.
+    '''
+
+    def __init__(self,
+                 directory: str = HISTORY_DIR,
+                 capacity: int = 1_000_000,
+                 flush_seconds: float = 10):
+        self.directory = directory
+        self.capacity = capacity
+        self.flush_seconds = flush_seconds
+        self.symbols = Symbols(os.path.join(directory, "symbols.json"))
+        self.segments = {}
+        self.flushed_at = time.monotonic()
+
+    @staticmethod
+    def day(ts: float) -> str:
+        return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+    def segment(self, day: str, create: bool = True) -> Segment | None:
+        if day not in self.segments:
+            directory = os.path.join(self.directory, day)
+            if not create and not os.path.exists(os.path.join(directory, "ts.bin")):
+                return None
+            self.segments[day] = Segment(directory, self.capacity)
+        return self.segments[day]
+
+    def days(self) -> list:
+        if not os.path.exists(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if os.path.isdir(os.path.join(self.directory, name)))
+
+    def _append(self, row: dict) -> None:
+        self.segment(self.day(row["ts"])).append(row)
+        if time.monotonic() - self.flushed_at >= self.flush_seconds:
+            self.flush()
+
+    def record_cex(self, token: str, dest_token: str, result: dict, ts: float | None = None) -> None:
+        '''result: CexPrice.get_price() output'''
+        self._append({
+            "ts": ts or time.time(),
+            "token": self.symbols.id("token", token),
+            "dest_token": self.symbols.id("token", dest_token),
+            "venue": self.symbols.id("venue", result["exchange"]),
+            "kind": CEX,
+            "bid": _float(result.get("max_bids_price")),
+            "ask": _float(result.get("min_asks_price")),
+            "bid_size": _float(result.get("bids_volumes")),
+            "ask_size": _float(result.get("asks_volumes")),
+            "bid_fill": _float(result.get("bids_fill_price")),
+            "ask_fill": _float(result.get("asks_fill_price")),
+            "bid_depth": _float(result.get("bids_depth")),
+            "ask_depth": _float(result.get("asks_depth"))
+        })
+
+    def record_dex(self, token: str, dest_token: str, info: dict, ts: float | None = None) -> None:
+        '''info: dex_sell_info() or dex_buy_info() output'''
+        side = "sell" if "price_sell" in info else "buy"
+        self._append({
+            "ts": ts or time.time(),
+            "token": self.symbols.id("token", token),
+            "dest_token": self.symbols.id("token", dest_token),
+            "venue": self.symbols.id("venue", info[f"aggregator_{side}"]),
+            "network": self.symbols.id("network", info[f"network_{side}"]),
+            "kind": DEX_SELL if side == "sell" else DEX_BUY,
+            "bid" if side == "sell" else "ask": _float(info[f"price_{side}"])
+        })
+
+    def record_state(self, state, ts: float | None = None) -> None:
+        '''Every quote a QuoteState collected'''
+        ts = ts or time.time()
+        for exchange in state.exchanges:
+            self.record_cex(state.token, state.dest_token, exchange["data"], ts)
+        for info in state.aggregators:
+            self.record_dex(state.token, state.dest_token, info, ts)
+
+    def read(self,
+             token: str | None = None,
+             venue: str | None = None,
+             start: float | None = None,
+             end: float | None = None,
+             columns: list | None = None) -> dict:
+        '''
+        Rows of token and/or venue with start <= ts < end (unix seconds), oldest first,
+        as {column: array}. token/venue/network come back as ids, see Symbols.name().
+        '''
+        columns = columns or list(COLUMNS)
+        token_id = self.symbols.ids["token"].get(token) if token else None
+        venue_id = self.symbols.ids["venue"].get(venue) if venue else None
+        if (token and token_id is None) or (venue and venue_id is None):
+            return {column: np.empty(0, dtype=COLUMNS[column]) for column in columns}
+        first_day = self.day(start) if start else None
+        last_day = self.day(end) if end else None
+        parts = {column: [] for column in columns}
+        for day in self.days():
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            segment = self.segment(day, create=False)
+            if segment is None or not segment.written:
+                continue
+            order = segment.order()
+            mask = np.ones(min(segment.written, segment.capacity), dtype=bool)
+            if token_id is not None:
+                mask &= segment.columns["token"][order] == token_id
+            if venue_id is not None:
+                mask &= segment.columns["venue"][order] == venue_id
+            if start or end:
+                ts = segment.columns["ts"][order]
+                if start:
+                    mask &= ts >= start
+                if end:
+                    mask &= ts < end
+            rows = np.arange(segment.capacity)[order][mask]
+            for column in columns:
+                parts[column].append(np.asarray(segment.columns[column][rows]))
+        return {column: np.concatenate(values) if values else np.empty(0, dtype=COLUMNS[column])
+                for column, values in parts.items()}
+
+    def compact(self, day: str, path: str | None = None) -> str | None:
+        '''Writes a day to Parquet (needs pyarrow or fastparquet), returns the file'''
+        segment = self.segment(day, create=False)
+        if segment is None:
+            return None
+        try:
+            import pandas as pd
+            order = segment.order()
+            frame = pd.DataFrame({column: np.asarray(values[order]) for column, values in segment.columns.items()})
+            for column in ["token", "dest_token"]:
+                frame[column] = [self.symbols.name("token", number) for number in frame[column]]
+            frame["venue"] = [self.symbols.name("venue", number) for number in frame["venue"]]
+            frame["network"] = [self.symbols.name("network", number) for number in frame["network"]]
+            frame["kind"] = frame["kind"].map(KINDS)
+            path = path or os.path.join(self.directory, f"{day}.parquet")
+            frame.to_parquet(path, index=False)
+            return path
+        except ImportError as e:
+            logging.error(f"Parquet compaction of {day} needs pyarrow or fastparquet: {e}")
+            return None
+
+    def flush(self) -> None:
+        for segment in self.segments.values():
+            segment.flush()
+        self.symbols.save()
+        self.flushed_at = time.monotonic()
+
+
+quote_history = QuoteHistory()
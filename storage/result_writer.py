@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import time
+
+logging.basicConfig(level=logging.INFO)
+
+
+class ResultWriter:
+    '''
+    One task that owns the results/*.txt handles. write() only puts the record on a queue,
+    so signals never wait for the disk: the task collects up to max_batch records or
+    flush_seconds worth, then appends and flushes them in a worker thread. Parts of a record
+    may be callables (e.g. quote tables), they are rendered there too. A file is rotated to
+    name.YYYYmmdd-HHMMSS.txt when it reaches max_bytes or its day is over.
+    Used as `async with result_writer:`, like session_manager. Outside of it write() appends at once.
+    '''
+
+    def __init__(self,
+                 max_batch: int = 200,
+                 flush_seconds: float = 1.0,
+                 max_bytes: int = 50 * 1024 * 1024,
+                 rotate_daily: bool = True):
+        self.max_batch = max_batch
+        self.flush_seconds = flush_seconds
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.files = {}
+        self.written = 0
+        self.batches = 0
+        self.rotations = 0
+        self._queue = None
+        self._task = None
+        self._users = 0
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+            self._queue = None
+        self._close_files()
+        logging.info(self.report())
+
+    async def __aenter__(self):
+        self._users += 1
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._users -= 1
+        if self._users <= 0:
+            self._users = 0
+            await self.stop()
+
+    def write(self, path: str, *parts) -> None:
+        if self._queue is None:
+            self._write_batch([(path, parts)])
+            return
+        self._queue.put_nowait((path, parts))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            record = await self._queue.get()
+            if record is None:
+                break
+            batch = [record]
+            flush_at = loop.time() + self.flush_seconds
+            while len(batch) < self.max_batch:
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), max(flush_at - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            try:
+                await loop.run_in_executor(None, self._write_batch, batch)
+            except Exception as e:
+                logging.error(f"Error writing {len(batch)} results: {e}")
+
+    def _write_batch(self, batch) -> None:
+        touched = set()
+        for path, parts in batch:
+            text = "".join(part() if callable(part) else part for part in parts)
+            file = self._file(path)
+            file.write(text)
+            touched.add(path)
+        for path in touched:
+            self.files[path][0].flush()
+        self.written += len(batch)
+        self.batches += 1
+
+    def _file(self, path: str):
+        today = time.strftime("%Y-%m-%d")
+        if path in self.files:
+            file, day = self.files[path]
+            if file.tell() < self.max_bytes and (not self.rotate_daily or day == today):
+                return file
+            file.close()
+            del self.files[path]
+            self._rotate(path)
+        elif os.path.exists(path) and self._needs_rotation(path, today):
+            self._rotate(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.files[path] = (open(path, 'a'), today)
+        return self.files[path][0]
+
+    def _needs_rotation(self, path: str, today: str) -> bool:
+        if os.path.getsize(path) >= self.max_bytes:
+            return True
+        return self.rotate_daily and time.strftime("%Y-%m-%d", time.localtime(os.path.getmtime(path))) != today
+
+    def _rotate(self, path: str) -> None:
+        stem, suffix = os.path.splitext(path)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(os.path.getmtime(path)))
+        rotated = f"{stem}.{stamp}{suffix}"
+        number = 1
+        while os.path.exists(rotated):
+            rotated = f"{stem}.{stamp}-{number}{suffix}"
+            number += 1
+        os.replace(path, rotated)
+        self.rotations += 1
+        logging.info(f"Rotated {path} to {rotated}")
+
+    def _close_files(self) -> None:
+        for file, _ in self.files.values():
+            file.close()
+        self.files = {}
+
+    def report(self) -> str:
+        return f"Result writer: {self.written} records in {self.batches} batches, {self.rotations} rotations"
+
+
+result_writer = ResultWriter()
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import ujson as json
+
+logging.basicConfig(level=logging.INFO)
+
+_ROOT_DIR = Path(__file__).parent.parent.absolute()
+TOKEN_STORE_PATH = os.path.join(_ROOT_DIR, "dexs/abi/tokens_info.db")
+TOKEN_INFO_PATH = os.path.join(_ROOT_DIR, "dexs/abi/tokens_info.json")
+
+
+class TokenStore:
+    '''
+    Symbol, decimals and ABI of every token DexPrice has looked up, keyed by (network,
+    address), in SQLite (WAL) with an in-memory LRU of lru_size tokens in front. A hit is a
+    dict lookup, only a miss reads the database. put() stores in the LRU at once and
+    commits in one transaction per commit_every tokens or commit_seconds, in a worker thread
+    when an event loop is running; flush() commits the rest. The database is opened on
+    first use and, when empty, filled from tokens_info.json (seed_path).
+    '''
+
+    def __init__(self,
+                 path: str = TOKEN_STORE_PATH,
+                 seed_path: str | None = TOKEN_INFO_PATH,
+                 lru_size: int = 20000,
+                 commit_every: int = 100,
+                 commit_seconds: float = 5):
+        self.path = path
+        self.seed_path = seed_path
+        self.lru_size = lru_size
+        self.commit_every = commit_every
+        self.commit_seconds = commit_seconds
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.committed_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.commits = 0
+        self._connection = None
+        self._lock = threading.RLock()
+        self._commits = set()
+
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS tokens (network TEXT NOT NULL, address TEXT NOT NULL, "
+                "symbol TEXT, decimals INTEGER NOT NULL, abi TEXT, PRIMARY KEY (network, address)) WITHOUT ROWID")
+            self._connection.commit()
+            if self._connection.execute("SELECT 1 FROM tokens LIMIT 1").fetchone() is None:
+                self._seed()
+        return self._connection
+
+    def _seed(self) -> None:
+        '''Imports the tokens of tokens_info.json, the file DexPrice used to rewrite'''
+        if not self.seed_path or not os.path.exists(self.seed_path):
+            return
+        try:
+            with open(self.seed_path) as file:
+                tokens_info = json.load(file)
+        except Exception as e:
+            logging.error(f"Error reading {self.seed_path} to seed the token store: {e}")
+            return
+        rows = [self._row(network, address, token["symbol"], token["decimals"], token.get("abi"))
+                for network, tokens in tokens_info.items() if isinstance(tokens, dict)
+                for address, token in tokens.items()]
+        if rows:
+            self._commit(rows)
+            logging.info(f"Token store {self.path} seeded with {len(rows)} tokens from {self.seed_path}")
+
+    @staticmethod
+    def _row(network: str, address: str, symbol, decimals, abi) -> tuple:
+        return network, address, symbol, int(decimals), abi if abi is None or isinstance(abi, str) else json.dumps(abi)
+
+    def get(self, network: str, address: str) -> dict | None:
+        '''{"symbol", "decimals"} of a known token, None if it was never stored'''
+        key = (network, address)
+        token = self.cache.get(key)
+        if token is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return token
+        self.misses += 1
+        if key in self.pending:
+            token = {"symbol": self.pending[key][2], "decimals": self.pending[key][3]}
+        else:
+            with self._lock:
+                row = self.connection().execute("SELECT symbol, decimals FROM tokens WHERE network = ? AND address = ?",
+                                                key).fetchone()
+            if row is None:
+                return None
+            token = {"symbol": row[0], "decimals": row[1]}
+        self._remember(key, token)
+        return token
+
+    def abi(self, network: str, address: str):
+        '''The stored ABI of a token (a JSON string as the explorer returns it), not kept in the LRU'''
+        key = (network, address)
+        if key in self.pending:
+            return self.pending[key][4]
+        with self._lock:
+            row = self.connection().execute("SELECT abi FROM tokens WHERE network = ? AND address = ?", key).fetchone()
+        return row[0] if row else None
+
+    def addresses(self, network: str) -> set:
+        '''Every address of network in the store, pending ones included'''
+        with self._lock:
+            rows = self.connection().execute("SELECT address FROM tokens WHERE network = ?", (network,)).fetchall()
+        return {row[0] for row in rows} | {address for name, address in self.pending if name == network}
+
+    def put(self, network: str, address: str, symbol, decimals, abi=None) -> None:
+        key = (network, address)
+        row = self._row(network, address, symbol, decimals, abi)
+        self._remember(key, {"symbol": row[2], "decimals": row[3]})
+        self.pending[key] = row
+        if len(self.pending) >= self.commit_every or time.monotonic() - self.committed_at >= self.commit_seconds:
+            self._schedule_commit()
+
+    def _remember(self, key: tuple, token: dict) -> None:
+        self.cache[key] = token
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.lru_size:
+            self.cache.popitem(last=False)
+
+    def _schedule_commit(self) -> None:
+        rows, self.pending = list(self.pending.values()), {}
+        self.committed_at = time.monotonic()
+        if not rows:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._commit(rows)
+            return
+        commit = loop.run_in_executor(None, self._commit, rows)
+        self._commits.add(commit)
+        commit.add_done_callback(self._commits.discard)
+
+    def _commit(self, rows: list) -> None:
+        try:
+            with self._lock:
+                connection = self.connection()
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO tokens VALUES (?, ?, ?, ?, ?)", rows)
+            self.commits += 1
+        except Exception as e:
+            logging.error(f"Error committing {len(rows)} tokens to {self.path}: {e}")
+
+    def flush(self) -> None:
+        '''Commits the pending tokens now, in this thread'''
+        rows, self.pending = list(self.pending.values()), {}
+        self.committed_at = time.monotonic()
+        if rows:
+            self._commit(rows)
+
+    async def drain(self) -> None:
+        '''Commits the pending tokens and waits for every commit running in a worker thread'''
+        self._schedule_commit()
+        if self._commits:
+            await asyncio.gather(*list(self._commits))
+
+    def close(self) -> None:
+        self.flush()
+        if self._connection is not None:
+            with self._lock:
+                self._connection.close()
+            self._connection = None
+
+    def report(self) -> str:
+        return f"Token store: {self.hits} hits, {self.misses} misses, {self.commits} commits"
+
+
+token_store = TokenStore()
@@ -0,0 +1,207 @@
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+
+import aiohttp
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+
+_ROOT_DIR = Path(__file__).parent.parent.absolute()
+METRICS_PATH = os.path.join(_ROOT_DIR, "results/venue_metrics.prom")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class VenueStats:
+    '''Counters of one (venue, endpoint, network)'''
+
+    def __init__(self, samples: int = 1024):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0
+        self.latency_count = 0
+        self.latencies = deque(maxlen=samples)
+        self.bytes = 0
+        self.decode_sum = 0
+        self.decode_count = 0
+        self.statuses = defaultdict(int)
+        self.timeouts = 0
+        self.errors = 0
+        self.parse_failures = 0
+        self.deadline_misses = 0
+
+    def observe_latency(self, seconds: float) -> None:
+        index = 0
+        while index < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.latency_sum += seconds
+        self.latency_count += 1
+        self.latencies.append(seconds)
+
+    def percentiles(self) -> tuple:
+        if not self.latencies:
+            return None, None, None
+        return tuple(np.percentile(np.fromiter(self.latencies, dtype=float), [50, 95, 99]))
+
+
+class InstrumentedResponse:
+    '''Proxy of an aiohttp response that records body size and read/decode time'''
+
+    def __init__(self, response, metrics, key):
+        self._response = response
+        self._metrics = metrics
+        self._key = key
+        self._counted = False
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def __repr__(self):
+        return repr(self._response)
+
+    async def _decode(self, decode=None):
+        start = time.perf_counter()
+        stats = self._metrics.stats(*self._key)
+        try:
+            body = await self._response.read()
+            if not self._counted:
+                self._counted = True
+                stats.bytes += len(body)
+            return await decode() if decode else body
+        except TimeoutError:
+            stats.timeouts += 1
+            raise
+        except (ValueError, aiohttp.ContentTypeError):
+            stats.parse_failures += 1
+            raise
+        finally:
+            stats.decode_sum += time.perf_counter() - start
+            stats.decode_count += 1
+
+    async def read(self):
+        return await self._decode()
+
+    async def text(self, *args, **kwargs):
+        return await self._decode(lambda: self._response.text(*args, **kwargs))
+
+    async def json(self, *args, **kwargs):
+        return await self._decode(lambda: self._response.json(*args, **kwargs))
+
+
+class VenueMetrics:
+    '''
+    Per venue, endpoint and network: latency histogram with p50/p95/p99 of recent
+    requests, bytes received, read/decode time, status codes, timeouts and parse
+    failures. Exported as Prometheus text and as a summary table.
+    '''
+
+    def __init__(self, path: str = METRICS_PATH, summary_interval: float = 60):
+        self.path = path
+        self.summary_interval = summary_interval
+        self.venues = {}
+        self.gauges = {}
+        self._last_summary = time.monotonic()
+
+    def stats(self, venue: str, endpoint: str = "", network: str = "") -> VenueStats:
+        key = (venue, endpoint, network)
+        if key not in self.venues:
+            self.venues[key] = VenueStats()
+        return self.venues[key]
+
+    def observe(self, venue, endpoint, network, seconds: float, status: int | str) -> None:
+        stats = self.stats(venue, endpoint, network)
+        stats.observe_latency(seconds)
+        stats.statuses[str(status)] += 1
+
+    def timeout(self, venue: str, endpoint: str = "", network: str = "") -> None:
+        self.stats(venue, endpoint, network).timeouts += 1
+
+    def error(self, venue: str, endpoint: str = "", network: str = "") -> None:
+        self.stats(venue, endpoint, network).errors += 1
+
+    def parse_failure(self, venue: str, endpoint: str = "", network: str = "") -> None:
+        self.stats(venue, endpoint, network).parse_failures += 1
+
+    def deadline_miss(self, venue: str, endpoint: str = "", network: str = "") -> None:
+        self.stats(venue, endpoint, network).deadline_misses += 1
+
+    def set_gauge(self, name: str, labels: dict, value: float) -> None:
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def instrument(self, response, venue, endpoint, network) -> InstrumentedResponse:
+        return InstrumentedResponse(response, self, (venue, endpoint, network))
+
+    @staticmethod
+    def _labels(venue, endpoint, network, **extra) -> str:
+        labels = {"venue": venue, "endpoint": endpoint, "network": network, **extra}
+        return ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in labels.items())
+
+    def prometheus(self) -> str:
+        lines = ["# HELP venue_request_latency_seconds Time to response headers per venue request",
+                 "# TYPE venue_request_latency_seconds histogram"]
+        for key, stats in sorted(self.venues.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+                cumulative += count
+                lines.append(f"venue_request_latency_seconds_bucket{{{self._labels(*key, le=bound)}}} {cumulative}")
+            lines.append(f"venue_request_latency_seconds_sum{{{self._labels(*key)}}} {stats.latency_sum}")
+            lines.append(f"venue_request_latency_seconds_count{{{self._labels(*key)}}} {stats.latency_count}")
+        counters = [("venue_response_bytes_total", "Bytes of response bodies", "bytes"),
+                    ("venue_decode_seconds_total", "Time spent reading and decoding bodies", "decode_sum"),
+                    ("venue_timeouts_total", "Requests that timed out", "timeouts"),
+                    ("venue_errors_total", "Requests that failed with a client error", "errors"),
+                    ("venue_parse_failures_total", "Responses that could not be parsed", "parse_failures"),
+                    ("venue_deadline_misses_total", "Quotes dropped by the per-token budget", "deadline_misses")]
+        for name, help_text, attribute in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for key, stats in sorted(self.venues.items()):
+                lines.append(f"{name}{{{self._labels(*key)}}} {getattr(stats, attribute)}")
+        lines += ["# HELP venue_responses_total Responses per status code", "# TYPE venue_responses_total counter"]
+        for key, stats in sorted(self.venues.items()):
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f"venue_responses_total{{{self._labels(*key, status=status)}}} {count}")
+        gauge_name = None
+        for (name, labels), value in sorted(self.gauges.items()):
+            if name != gauge_name:
+                gauge_name = name
+                lines.append(f"# TYPE {name} gauge")
+            label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+            lines.append(f"{name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str | None = None) -> None:
+        '''Writes the Prometheus text atomically, for the node_exporter textfile collector'''
+        path = path or self.path
+        with open(path + ".tmp", "w") as file:
+            file.write(self.prometheus())
+        os.replace(path + ".tmp", path)
+
+    def summary(self) -> str:
+        header = f"{'venue':<14}{'endpoint':<34}{'network':<22}{'reqs':>6}{'p50':>8}{'p95':>8}{'p99':>8}" \
+                 f"{'KB':>9}{'decode':>8}{'non200':>7}{'tmout':>6}{'parse':>6}{'late':>6}"
+        lines = [header]
+        rows = sorted(self.venues.items(), key=lambda item: -(item[1].percentiles()[1] or 0))
+        for (venue, endpoint, network), stats in rows:
+            p50, p95, p99 = (f"{value:.3f}" if value is not None else "-" for value in stats.percentiles())
+            non_200 = sum(count for status, count in stats.statuses.items() if status != "200")
+            decode = stats.decode_sum / stats.decode_count if stats.decode_count else 0
+            lines.append(f"{venue[:13]:<14}{endpoint[:33]:<34}{network[:21]:<22}{stats.latency_count:>6}"
+                         f"{p50:>8}{p95:>8}{p99:>8}{stats.bytes / 1024:>9.1f}{decode:>8.4f}"
+                         f"{non_200:>7}{stats.timeouts:>6}{stats.parse_failures:>6}{stats.deadline_misses:>6}")
+        return "\n".join(lines)
+
+    def summary_if_due(self) -> None:
+        if time.monotonic() - self._last_summary < self.summary_interval:
+            return
+        self._last_summary = time.monotonic()
+        logging.info(f"Venue telemetry:\n{self.summary()}")
+        try:
+            self.export()
+        except OSError as e:
+            logging.error(f"Error exporting venue metrics to {self.path}: {e}")
+
+
+venue_metrics = VenueMetrics()
@@ -0,0 +1,125 @@
+import logging
+import time
+
+import aiohttp
+
+logging.basicConfig(level=logging.INFO)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def venue_label(venue: str, network: str = "") -> str:
+    return f"{venue} ({network})" if network else venue
+
+
+class VenueUnavailable(aiohttp.ClientError):
+    '''Raised instead of sending a request to a venue whose circuit is open'''
+
+
+class Circuit:
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.open_seconds = 0
+        self.probe_in_flight = False
+        self.opens = 0
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    '''
+    Per (venue, network) circuit: closed until failure_threshold failures in a row
+    (timeouts, connection errors, 5xx, 403/451 geo-blocks), then open and every request
+    is rejected at once. After open_seconds one probe is let through (half-open):
+    success closes the circuit, failure opens it again for twice as long, up to max_open_seconds.
+    '''
+
+    def __init__(self,
+                 failure_threshold: int = 3,
+                 open_seconds: float = 30,
+                 max_open_seconds: float = 600,
+                 metrics=None):
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.metrics = metrics
+        self.circuits = {}
+
+    def circuit(self, venue: str, network: str = "") -> Circuit:
+        key = (venue, network)
+        if key not in self.circuits:
+            self.circuits[key] = Circuit()
+        return self.circuits[key]
+
+    def _set_state(self, venue, network, circuit, state):
+        if circuit.state != state:
+            logging.info(f"Circuit of {venue_label(venue, network)}: {circuit.state} -> {state}")
+        circuit.state = state
+        if self.metrics is not None:
+            self.metrics.set_gauge("venue_circuit_state", {"venue": venue, "network": network}, STATE_VALUES[state])
+            self.metrics.set_gauge("venue_circuit_opens", {"venue": venue, "network": network}, circuit.opens)
+
+    def allow(self, venue: str, network: str = "") -> bool:
+        circuit = self.circuit(venue, network)
+        if circuit.state == OPEN and time.monotonic() - circuit.opened_at >= circuit.open_seconds:
+            self._set_state(venue, network, circuit, HALF_OPEN)
+        if circuit.state == CLOSED:
+            return True
+        if circuit.state == HALF_OPEN and not circuit.probe_in_flight:
+            circuit.probe_in_flight = True
+            return True
+        circuit.rejected += 1
+        return False
+
+    def is_available(self, venue: str, network: str = "") -> bool:
+        '''Whether a request would be let through, without taking the half-open probe'''
+        circuit = self.circuits.get((venue, network))
+        if circuit is None or circuit.state == CLOSED:
+            return True
+        if circuit.state == HALF_OPEN:
+            return not circuit.probe_in_flight
+        return time.monotonic() - circuit.opened_at >= circuit.open_seconds
+
+    @staticmethod
+    def is_failure(status: int) -> bool:
+        return status >= 500 or status in (403, 451)
+
+    def record_success(self, venue: str, network: str = "") -> None:
+        circuit = self.circuit(venue, network)
+        circuit.failures = 0
+        circuit.probe_in_flight = False
+        circuit.open_seconds = 0
+        if circuit.state != CLOSED:
+            self._set_state(venue, network, circuit, CLOSED)
+
+    def record_failure(self, venue: str, network: str = "") -> None:
+        circuit = self.circuit(venue, network)
+        circuit.failures += 1
+        if circuit.state == OPEN:
+            return
+        if circuit.state == HALF_OPEN or circuit.failures >= self.failure_threshold:
+            circuit.probe_in_flight = False
+            circuit.opened_at = time.monotonic()
+            circuit.open_seconds = min(max(circuit.open_seconds * 2, self.base_open_seconds), self.max_open_seconds)
+            circuit.opens += 1
+            self._set_state(venue, network, circuit, OPEN)
+
+    def record_status(self, venue: str, network: str, status: int) -> None:
+        if self.is_failure(status):
+            self.record_failure(venue, network)
+        else:
+            self.record_success(venue, network)
+
+    def release(self, venue: str, network: str = "") -> None:
+        '''The request ended without an outcome (cancelled or a local error), give the probe back'''
+        self.circuit(venue, network).probe_in_flight = False
+
+    def report(self) -> str:
+        lines = ["Circuits:"]
+        for (venue, network), circuit in sorted(self.circuits.items()):
+            if circuit.state != CLOSED or circuit.opens:
+                lines.append(f"    {venue_label(venue, network)}: {circuit.state}, opened {circuit.opens} times, "
+                             f"rejected {circuit.rejected}")
+        return "\n".join(lines)
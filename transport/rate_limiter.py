@@ -0,0 +1,221 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+
+from yarl import URL
+
+logging.basicConfig(level=logging.INFO)
+
+# host: (budget refilled per second, burst). Budgets are in the venue's own units:
+# request weight for Binance/Kucoin, plain requests everywhere else.
+HOST_LIMITS = {
+    "api.binance.com": (80, 400),
+    "api.kucoin.com": (50, 100),
+    "api.bybit.com": (50, 100),
+    "www.okx.com": (10, 20),
+    "api.gateio.ws": (15, 30),
+    "api.mexc.com": (15, 30),
+    "api.bitget.com": (10, 20),
+    "api.huobi.pro": (10, 20),
+    "api.kraken.com": (1, 3),
+    "api.exchange.coinbase.com": (8, 15),
+    "api.bitfinex.com": (1.5, 5),
+    "api.gemini.com": (2, 5),
+    "www.bitmex.com": (0.5, 3),
+    "api.1inch.dev": (1, 1),
+    "api.paraswap.io": (2, 4),
+    "aggregator-api.kyberswap.com": (10, 20),
+    "open-api.openocean.finance": (2, 4),
+    "api.dexscreener.com": (5, 10),
+    "price.jup.ag": (10, 20),
+    "api.etherscan.io": (5, 5),
+    "api-optimistic.etherscan.io": (5, 5),
+    "api.bscscan.com": (5, 5),
+    "api.arbiscan.io": (5, 5),
+    "api.polygonscan.com": (5, 5),
+    "api.snowtrace.io": (5, 5),
+    "api.basescan.org": (5, 5),
+}
+DEFAULT_HOST_LIMIT = (10, 20)
+
+
+def binance_depth_weight(query) -> float:
+    '''Weight of Binance /api/v3/depth for its limit parameter (default 100)'''
+    try:
+        limit = int(query.get("limit", 100))
+    except ValueError:
+        limit = 100
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+# (host, path prefix): weight of one request, or a function of the query parameters for
+# endpoints whose weight depends on them; everything else costs 1
+ENDPOINT_WEIGHTS = {
+    ("api.binance.com", "/api/v3/depth"): binance_depth_weight,
+    ("api.binance.com", "/api/v3/ticker/bookTicker"): 4,
+    ("api.binance.com", "/api/v3/exchangeInfo"): 20,
+    ("api.kucoin.com", "/api/v1/market/orderbook/level2_20"): 2,
+    ("api.kucoin.com", "/api/v1/market/allTickers"): 15,
+    ("api.kucoin.com", "/api/v2/symbols"): 4,
+}
+
+# who is asking: find_spread sets the token being scanned so the global queue is shared fairly
+scan_key = contextvars.ContextVar("scan_key", default=None)
+
+
+class FairGovernor:
+    '''
+    Cap of requests in flight (global, or 1 for a bucket's turn). Waiters are grouped by scan_key and served
+    round-robin, so one token with many venues cannot starve the others.
+    '''
+
+    def __init__(self, max_in_flight: int = 64):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.queues = OrderedDict()
+
+    async def acquire(self, key=None) -> None:
+        if self.in_flight < self.max_in_flight and not self.queues:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(key, deque()).append(future)
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.in_flight < self.max_in_flight and self.queues:
+            key, queue = self.queues.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                self.queues[key] = queue
+            if future.cancelled():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0
+        self._turn = FairGovernor(1)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, weight: float = 1, key=None) -> float:
+        '''Waits until weight is available, returns the time spent waiting'''
+        weight = min(weight, self.capacity)
+        start = time.monotonic()
+        await self._turn.acquire(key)
+        try:
+            while True:
+                now = time.monotonic()
+                if self.blocked_until > now:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return now - start
+                await asyncio.sleep((weight - self.tokens) / self.rate)
+        finally:
+            self._turn.release()
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class RateLimiter:
+    '''
+    Per-host token buckets in front of the shared session plus the global governor.
+    A 429/418 blocks the host for Retry-After seconds.
+    '''
+
+    def __init__(self,
+                 host_limits: dict | None = None,
+                 endpoint_weights: dict | None = None,
+                 max_in_flight: int = 64,
+                 default_retry_after: float = 5):
+        self.host_limits = host_limits if host_limits is not None else HOST_LIMITS
+        self.endpoint_weights = endpoint_weights if endpoint_weights is not None else ENDPOINT_WEIGHTS
+        self.governor = FairGovernor(max_in_flight)
+        self.default_retry_after = default_retry_after
+        self.buckets = {}
+        self.stats = defaultdict(lambda: defaultdict(float))
+
+    def bucket(self, host: str) -> TokenBucket:
+        if host not in self.buckets:
+            rate, capacity = self.host_limits.get(host, DEFAULT_HOST_LIMIT)
+            self.buckets[host] = TokenBucket(rate, capacity)
+        return self.buckets[host]
+
+    def weight(self, url: URL, params=None) -> float:
+        for (host, path), weight in self.endpoint_weights.items():
+            if url.host == host and url.path.startswith(path):
+                if callable(weight):
+                    query = dict(url.query)
+                    query.update(params or {})
+                    return weight(query)
+                return weight
+        return 1
+
+    @asynccontextmanager
+    async def slot(self, url, weight: float | None = None, params=None):
+        url = URL(url)
+        weight = weight if weight is not None else self.weight(url, params)
+        key = scan_key.get()
+        waited = await self.bucket(url.host).acquire(weight, key)
+        await self.governor.acquire(key)
+        self.stats[url.host]["requests"] += 1
+        self.stats[url.host]["weight"] += weight
+        self.stats[url.host]["waited"] += waited
+        try:
+            yield
+        finally:
+            self.governor.release()
+
+    def observe(self, url, response) -> None:
+        if response.status not in (418, 429):
+            return
+        host = URL(url).host
+        try:
+            retry_after = float(response.headers.get("Retry-After", self.default_retry_after))
+        except ValueError:
+            retry_after = self.default_retry_after
+        self.bucket(host).block(retry_after)
+        self.stats[host]["throttled"] += 1
+        logging.info(f"{host} answered {response.status}, pausing it for {retry_after}s")
+
+    def report(self) -> str:
+        lines = [f"Rate limiter: in flight {self.governor.in_flight}/{self.governor.max_in_flight}"]
+        for host, host_stats in sorted(self.stats.items(), key=lambda item: -item[1]["requests"]):
+            lines.append(f"    {host}: requests {int(host_stats['requests'])}, "
+                         f"weight {host_stats['weight']:.0f}, "
+                         f"waited {host_stats['waited']:.2f}s, "
+                         f"throttled {int(host_stats['throttled'])}")
+        return "\n".join(lines)
@@ -0,0 +1,149 @@
+import asyncio
+import base64
+import gzip
+import hashlib
+import logging
+import os
+from collections import defaultdict
+
+import aiohttp
+import ujson as json
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+logging.basicConfig(level=logging.INFO)
+
+# query params that change on every call and would make every key unique
+VOLATILE_PARAMS = {"timestamp", "_", "nonce", "ts"}
+
+
+def _items(params) -> list:
+    if not params:
+        return []
+    return list(params.items() if isinstance(params, dict) else params)
+
+
+def request_key(method: str, url, params=None, json_body=None, data=None) -> str:
+    '''Same method, URL, params (in any order) and body -> same key'''
+    parsed = URL(str(url))
+    query = list(parsed.query.items())
+    query += [(str(key), str(value)) for key, value in _items(params)]
+    query = sorted((key, value) for key, value in query if key not in VOLATILE_PARAMS)
+    body = json.dumps(json_body, sort_keys=True) if json_body is not None else (data or "")
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    canonical = f"{method.upper()} {parsed.with_query(None)} {query} {body}"
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+class Recorder:
+    '''Appends every response to a gzip JSONL archive: key, request, status, headers, body, latency'''
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self.recorded = 0
+
+    def record(self, method: str, url, kwargs: dict, status: int, headers, body: bytes, latency: float) -> None:
+        entry = {
+            "key": request_key(method, url, kwargs.get("params"), kwargs.get("json"), kwargs.get("data")),
+            "method": method.upper(),
+            "url": str(url),
+            "params": [[str(key), str(value)] for key, value in _items(kwargs.get("params"))],
+            "status": status,
+            "headers": {"Content-Type": headers.get("Content-Type", "")},
+            "latency": latency
+        }
+        try:
+            entry["text"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body"] = base64.b64encode(body).decode()
+        self._file.write(json.dumps(entry) + "\n")
+        self.recorded += 1
+
+    def close(self) -> None:
+        self._file.close()
+        logging.info(f"Recorded {self.recorded} responses to {self.path}")
+
+
+class ReplayResponse:
+    '''The parts of aiohttp.ClientResponse the price parsers use, served from the archive'''
+
+    def __init__(self, entry: dict):
+        self.method = entry["method"]
+        self.url = URL(entry["url"])
+        self.status = entry["status"]
+        self.headers = CIMultiDictProxy(CIMultiDict(entry["headers"]))
+        self.content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+        self._body = entry["text"].encode() if "text" in entry else base64.b64decode(entry["body"])
+
+    def __repr__(self):
+        return f"<ReplayResponse({self.url}) [{self.status}]>"
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: str | None = None, errors: str = "strict") -> str:
+        return self._body.decode(encoding or "utf-8", errors)
+
+    async def json(self, *, encoding: str | None = None, loads=json.loads, content_type: str | None = "application/json"):
+        if content_type and content_type not in self.content_type and "json" not in self.content_type:
+            request_info = aiohttp.RequestInfo(self.url, self.method, self.headers, self.url)
+            raise aiohttp.ContentTypeError(request_info, (), status=self.status,
+                                           message=f"Attempt to decode JSON with unexpected mimetype: {self.content_type}")
+        text = self._body.decode(encoding or "utf-8").strip()
+        return loads(text) if text else None
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            request_info = aiohttp.RequestInfo(self.url, self.method, self.headers, self.url)
+            raise aiohttp.ClientResponseError(request_info, (), status=self.status, headers=self.headers)
+
+    def release(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+
+class Replayer:
+    '''
+    Serves an archive back instead of the network. Responses of the same key come back
+    in recorded order (the last one repeats), after their recorded latency divided by
+    speed (0 answers at once). Unknown requests fail like a connection error.
+    '''
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self.path = path
+        self.speed = speed
+        self.entries = defaultdict(list)
+        self.served = defaultdict(int)
+        self.misses = 0
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["key"]].append(entry)
+        logging.info(f"Replaying {sum(len(entries) for entries in self.entries.values())} responses from {path}")
+
+    async def request(self, method: str, url, **kwargs) -> ReplayResponse:
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("json"), kwargs.get("data"))
+        entries = self.entries.get(key)
+        if not entries:
+            self.misses += 1
+            raise aiohttp.ClientConnectionError(f"No recorded response for {method.upper()} {url}")
+        entry = entries[min(self.served[key], len(entries) - 1)]
+        self.served[key] += 1
+        if self.speed:
+            await asyncio.sleep(entry["latency"] / self.speed)
+        return ReplayResponse(entry)
+
+    def report(self) -> str:
+        return f"Replay of {self.path}: served {sum(self.served.values())}, misses {self.misses}"
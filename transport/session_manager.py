@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+
+import aiohttp
+from aiohttp import ClientTimeout
+from yarl import URL
+
+from telemetry.venue_metrics import VenueMetrics, venue_metrics
+from transport.circuit_breaker import CircuitBreaker, VenueUnavailable, venue_label
+from transport.rate_limiter import RateLimiter
+from transport.record_replay import Recorder, Replayer
+
+logging.basicConfig(level=logging.INFO)
+
+
+class SessionManager:
+    '''
+    One aiohttp session shared by the whole scan: per-host connection pools,
+    DNS cache and keep-alive, with counters of new connections (TLS handshakes)
+    and reused ones. Every request waits for its host budget in rate_limiter and
+    is recorded in metrics under venue/endpoint/network (host and path by default).
+    Venues whose circuit is open in breaker are rejected with VenueUnavailable.
+    record()/replay() (or RECORD_ARCHIVE / REPLAY_ARCHIVE, REPLAY_SPEED in .env) save every
+    response to an archive or serve them from one instead of the network. With mock_url
+    (MOCK_VENUES_URL) requests go to mock_venues.server instead of the real hosts.
+    '''
+
+    def __init__(self,
+                 limit: int = 400,
+                 limit_per_host: int = 20,
+                 dns_cache_ttl: int = 600,
+                 keepalive_timeout: float = 75,
+                 timeout: int = 10,
+                 rate_limiter: RateLimiter | None = None,
+                 metrics: VenueMetrics | None = None,
+                 breaker: CircuitBreaker | None = None,
+                 mock_url: str | None = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.metrics = metrics if metrics is not None else venue_metrics
+        self.breaker = breaker if breaker is not None else CircuitBreaker(metrics=self.metrics)
+        self.stats = defaultdict(lambda: defaultdict(int))
+        self.recorder = None
+        self.replayer = None
+        self.mock_url = mock_url if mock_url is not None else os.getenv("MOCK_VENUES_URL")
+        self._session = None
+        self._users = 0
+
+    def route(self, url) -> str:
+        '''
+        https://host/path?query -> mock_url/host/path?query when mock venues are on,
+        wss://host/path -> the same with mock_url as ws://
+        '''
+        if not self.mock_url:
+            return url
+        parsed = URL(str(url))
+        mock_url = self.mock_url.rstrip('/')
+        if parsed.scheme in ("ws", "wss"):
+            mock_url = "ws" + mock_url[len("http"):]
+        return f"{mock_url}/{parsed.host}{parsed.raw_path_qs}"
+
+    def record(self, path: str) -> None:
+        self.recorder = Recorder(path)
+
+    def replay(self, path: str, speed: float = 1.0) -> None:
+        self.replayer = Replayer(path, speed)
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        trace_config.on_dns_resolvehost_end.append(self._on_dns_resolvehost_end)
+        trace_config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        return trace_config
+
+    async def _on_request_start(self, session, ctx, params):
+        ctx.host = params.url.host
+        ctx.is_ssl = params.url.scheme == "https"
+        self.stats[ctx.host]["requests"] += 1
+
+    async def _on_connection_create_end(self, session, ctx, params):
+        self.stats[ctx.host]["connections_created"] += 1
+        if ctx.is_ssl:
+            self.stats[ctx.host]["tls_handshakes"] += 1
+
+    async def _on_connection_reuseconn(self, session, ctx, params):
+        self.stats[ctx.host]["connections_reused"] += 1
+
+    async def _on_dns_resolvehost_end(self, session, ctx, params):
+        self.stats[params.host]["dns_resolves"] += 1
+
+    async def _on_dns_cache_hit(self, session, ctx, params):
+        self.stats[params.host]["dns_cache_hits"] += 1
+
+    async def open(self):
+        if self.replayer is None and os.getenv("REPLAY_ARCHIVE"):
+            self.replay(os.getenv("REPLAY_ARCHIVE"), float(os.getenv("REPLAY_SPEED", 1)))
+        elif self.recorder is None and os.getenv("RECORD_ARCHIVE"):
+            self.record(os.getenv("RECORD_ARCHIVE"))
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             limit_per_host=self.limit_per_host,
+                                             use_dns_cache=True,
+                                             ttl_dns_cache=self.dns_cache_ttl,
+                                             keepalive_timeout=self.keepalive_timeout,
+                                             enable_cleanup_closed=True)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=ClientTimeout(total=self.timeout),
+                                                  trace_configs=[self._trace_config()])
+            logging.info(f"Shared HTTP session opened: limit {self.limit}, per host {self.limit_per_host}")
+        return self
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logging.info(f"Shared HTTP session closed\n{self.report()}")
+        self._session = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    async def __aenter__(self):
+        self._users += 1
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._users -= 1
+        if self._users <= 0:
+            self._users = 0
+            await self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    async def request(self, method: str, url, weight: float | None = None, venue: str | None = None,
+                      endpoint: str | None = None, network: str = "", **kwargs):
+        parsed = URL(url)
+        venue = venue or parsed.host
+        endpoint = endpoint or parsed.path
+        if not self.breaker.allow(venue, network):
+            raise VenueUnavailable(f"{venue_label(venue, network)} is sidelined by its circuit breaker")
+        recorded = False
+        try:
+            async with self.rate_limiter.slot(url, weight, kwargs.get("params")):
+                start = time.perf_counter()
+                try:
+                    if self.replayer is not None:
+                        response = await self.replayer.request(method, url, **kwargs)
+                    else:
+                        response = await self._session.request(method, self.route(url), **kwargs)
+                    if self.recorder is not None:
+                        body = await response.read()
+                        self.recorder.record(method, url, kwargs, response.status, response.headers, body,
+                                             time.perf_counter() - start)
+                except asyncio.TimeoutError:
+                    self.metrics.timeout(venue, endpoint, network)
+                    self.breaker.record_failure(venue, network)
+                    recorded = True
+                    raise
+                except aiohttp.ClientError:
+                    self.metrics.error(venue, endpoint, network)
+                    self.breaker.record_failure(venue, network)
+                    recorded = True
+                    raise
+                self.metrics.observe(venue, endpoint, network, time.perf_counter() - start, response.status)
+            self.breaker.record_status(venue, network, response.status)
+            recorded = True
+        finally:
+            if not recorded:
+                # cancelled, or failed in routing, the limiter or the recorder: give the half-open probe back
+                self.breaker.release(venue, network)
+        self.rate_limiter.observe(url, response)
+        return self.metrics.instrument(response, venue, endpoint, network)
+
+    async def get(self, url, weight: float | None = None, **kwargs):
+        return await self.request("GET", url, weight, **kwargs)
+
+    async def post(self, url, weight: float | None = None, **kwargs):
+        return await self.request("POST", url, weight, **kwargs)
+
+    def totals(self) -> dict:
+        totals = defaultdict(int)
+        for host_stats in self.stats.values():
+            for key, value in host_stats.items():
+                totals[key] += value
+        return dict(totals)
+
+    def report(self) -> str:
+        totals = self.totals()
+        requests = totals.get("requests", 0)
+        reused = totals.get("connections_reused", 0)
+        reuse_ratio = reused / requests * 100 if requests else 0
+        lines = [
+            f"HTTP pool: requests {requests}, "
+            f"connections created {totals.get('connections_created', 0)}, "
+            f"TLS handshakes {totals.get('tls_handshakes', 0)}, "
+            f"reused {reused} ({reuse_ratio:.1f}%), "
+            f"DNS resolves {totals.get('dns_resolves', 0)}, "
+            f"DNS cache hits {totals.get('dns_cache_hits', 0)}"
+        ]
+        for host, host_stats in sorted(self.stats.items(), key=lambda item: -item[1]["requests"]):
+            lines.append(f"    {host}: requests {host_stats['requests']}, "
+                         f"handshakes {host_stats['tls_handshakes']}, "
+                         f"reused {host_stats['connections_reused']}")
+        lines.append(self.rate_limiter.report())
+        lines.append(self.breaker.report())
+        if self.replayer is not None:
+            lines.append(self.replayer.report())
+        return "\n".join(lines)
+
+
+session_manager = SessionManager()